@@ -1,36 +1,46 @@
 % Use the ODBC library for database connectivity.
 :- use_module(library(odbc)).
 
-% Establishes a connection to the database.
-connect_to_database(Connection) :-
-    odbc_connect('AirSystem', Connection, [user('root'), password(''), open(once)]).
+% Pooled connections and cached prepared statements.
+:- ensure_loaded(odbc_pool).
 
 % Determines the most popular airline based on reservation counts.
 most_popular_airline(Airline) :-
-    connect_to_database(Connection),
-    odbc_prepare(Connection,
-                 'SELECT airline_name, COUNT(*) AS count FROM flights JOIN reservations ON flights.flight_id = reservations.flight_id GROUP BY airline_name ORDER BY count DESC LIMIT 1',
-                 [], Statement),
-    odbc_execute(Statement, [], row(Airline, _)),
-    odbc_free_statement(Statement),
-    odbc_disconnect(Connection).
+    pooled_execute('SELECT airline_name, COUNT(*) AS count FROM flights JOIN reservations ON flights.flight_id = reservations.flight_id WHERE reservations.booking_status <> "cancelled" GROUP BY airline_name ORDER BY count DESC LIMIT 1',
+                   [], [], row(Airline, _)).
+
+% Lists every airline with its reservation count as [Airline, Count] pairs, most booked first.
+airline_popularity(Ranking) :-
+    with_pooled_connection(Connection,
+        (
+            pooled_statement(Connection,
+                             'SELECT airline_name, COUNT(*) AS count FROM flights JOIN reservations ON flights.flight_id = reservations.flight_id WHERE reservations.booking_status <> "cancelled" GROUP BY airline_name ORDER BY count DESC',
+                             [], Statement),
+            findall([Airline, Count], odbc_execute(Statement, [], row(Airline, Count)), Ranking)
+        )).
+
+% Finds the airline of the flight a reservation is booked on.
+reservation_airline(ReservationID, Airline) :-
+    pooled_execute('SELECT f.airline_name FROM reservations r JOIN flights f ON f.flight_id = r.flight_id WHERE r.reservation_id = ?',
+                   [integer], [ReservationID], row(Airline)).
 
 % -- ADD --
 
-% Makes a reservation if the flight has capacity.
+% Makes a reservation if the flight has capacity, counting the seat against the flight.
 make_reservation(PassengerID, FlightID, SeatNumber, Success) :-
     can_book_flight(FlightID, CanBook),
     (
         CanBook = true ->
         (
-            connect_to_database(Connection),
-            odbc_prepare(Connection, 
-                         'INSERT INTO Reservations (passenger_id, flight_id, seat_number, booking_status) VALUES (?, ?, ?, "confirmed")', 
-                         [integer, integer, varchar], 
-                         InsertStatement),
-            odbc_execute(InsertStatement, [PassengerID, FlightID, SeatNumber]),
-            odbc_free_statement(InsertStatement),
-            odbc_disconnect(Connection),
+            with_pooled_transaction(Connection,
+                (
+                    pooled_statement(Connection,
+                                     'INSERT INTO Reservations (passenger_id, flight_id, seat_number, booking_status) VALUES (?, ?, ?, "confirmed")',
+                                     [integer, integer, varchar], InsertStatement),
+                    odbc_execute(InsertStatement, [PassengerID, FlightID, SeatNumber], _),
+                    pooled_statement(Connection, 'UPDATE Flights SET seats_booked = seats_booked + 1 WHERE flight_id = ?', [integer], CountStatement),
+                    odbc_execute(CountStatement, [FlightID], _)
+                )),
             Success = true
         )
         ;
@@ -39,16 +49,28 @@ make_reservation(PassengerID, FlightID, SeatNumber, Success) :-
 
 % -- UPDATE --
 
-% Edits an existing reservation in the database.
+% Edits an existing reservation in the database, moving its seat between the flight counters.
+% Cancelled reservations are not edited.
+edit_reservation(ReservationID, _, _, false) :-
+    pooled_execute('SELECT COUNT(*) FROM reservations WHERE reservation_id = ? AND booking_status = "cancelled"',
+                   [integer], [ReservationID], row(Cancelled)),
+    Cancelled > 0,
+    !.
 edit_reservation(ReservationID, NewFlightID, NewSeatNumber, Success) :-
-    connect_to_database(Connection),
-    odbc_prepare(Connection,
-                 'UPDATE Reservations SET flight_id = ?, seat_number = ? WHERE reservation_id = ?',
-                 [integer, varchar, integer],
-                 Statement),
-    odbc_execute(Statement, [NewFlightID, NewSeatNumber, ReservationID]),
-    odbc_free_statement(Statement),
-    odbc_disconnect(Connection),
+    with_pooled_transaction(Connection,
+        (
+            pooled_statement(Connection,
+                             'UPDATE Flights f JOIN Reservations r ON r.flight_id = f.flight_id SET f.seats_booked = f.seats_booked - 1 WHERE r.reservation_id = ?',
+                             [integer], ReleaseStatement),
+            odbc_execute(ReleaseStatement, [ReservationID], _),
+            pooled_statement(Connection, 'UPDATE Reservations SET flight_id = ?, seat_number = ? WHERE reservation_id = ?',
+                             [integer, varchar, integer], UpdateStatement),
+            odbc_execute(UpdateStatement, [NewFlightID, NewSeatNumber, ReservationID], _),
+            pooled_statement(Connection,
+                             'UPDATE Flights f JOIN Reservations r ON r.flight_id = f.flight_id SET f.seats_booked = f.seats_booked + 1 WHERE r.reservation_id = ?',
+                             [integer], TakeStatement),
+            odbc_execute(TakeStatement, [ReservationID], _)
+        )),
     Success = true.
 
 % -- DELETE --
@@ -59,68 +81,54 @@ delete_reservation(ReservationID, Success) :-
     (
         Exists = true ->
         (
-            connect_to_database(Connection),
-            odbc_prepare(Connection, 'DELETE FROM reservations WHERE reservation_id = ?', [integer], DeleteStatement),
-            odbc_execute(DeleteStatement, [ReservationID], _),
-            odbc_free_statement(DeleteStatement),
-            odbc_disconnect(Connection),
+            with_pooled_transaction(Connection,
+                (
+                    pooled_statement(Connection,
+                                     'UPDATE Flights f JOIN Reservations r ON r.flight_id = f.flight_id SET f.seats_booked = f.seats_booked - 1 WHERE r.reservation_id = ? AND r.booking_status <> "cancelled"',
+                                     [integer], ReleaseStatement),
+                    odbc_execute(ReleaseStatement, [ReservationID], _),
+                    pooled_statement(Connection, 'DELETE FROM reservations WHERE reservation_id = ?', [integer], DeleteStatement),
+                    odbc_execute(DeleteStatement, [ReservationID], _)
+                )),
             Success = true
         )
         ;
         Success = false
     ).
 
-% Deletes a flight given its ID.
+% Deletes a flight given its ID. Only a flight without reservations is deleted (flight_cancellation.py
+% rebooks or cancels them first); Success is true only if the flight row was actually removed.
 delete_flight(FlightID, Success) :-
-    connect_to_database(Connection),
-    odbc_prepare(Connection, 'DELETE FROM Flights WHERE flight_id = ?', [integer], Statement),
-    odbc_execute(Statement, [FlightID], _),
-    odbc_free_statement(Statement),
-    odbc_disconnect(Connection),
-    Success = true.
+    pooled_execute('SELECT COUNT(*) FROM reservations WHERE flight_id = ?', [integer], [FlightID], row(Reservations)),
+    (   Reservations =:= 0,
+        catch(pooled_execute('DELETE FROM Flights WHERE flight_id = ?', [integer], [FlightID], affected(1)), _, fail)
+    ->  Success = true
+    ;   Success = false
+    ).
 
 % -- VALIDATIONS --
 
 % Checks if a flight ID exists in the system.
 flight_id_exists(FlightID, Exists) :-
-    connect_to_database(Connection),
-    odbc_prepare(Connection, 'SELECT COUNT(*) FROM Flights WHERE flight_id = ?', [integer], Statement),
-    odbc_execute(Statement, [FlightID], row(Count)),
-    odbc_free_statement(Statement),
-    odbc_disconnect(Connection),
+    pooled_execute('SELECT COUNT(*) FROM Flights WHERE flight_id = ?', [integer], [FlightID], row(Count)),
     (Count > 0 -> Exists = true; Exists = false).
 
 % Checks if a seat number for a given flight is available.
 seat_number_available(FlightID, SeatNumber, Available) :-
-    connect_to_database(Connection),
-    odbc_prepare(Connection, 'SELECT COUNT(*) FROM Reservations WHERE flight_id = ? AND seat_number = ?', [integer, varchar], Statement),
-    odbc_execute(Statement, [FlightID, SeatNumber], row(Count)),
-    odbc_free_statement(Statement),
-    odbc_disconnect(Connection),
+    pooled_execute('SELECT COUNT(*) FROM Reservations WHERE flight_id = ? AND seat_number = ? AND booking_status <> "cancelled"', [integer, varchar], [FlightID, SeatNumber], row(Count)),
     (Count = 0 -> Available = true; Available = false).
 
 % Determines if booking is allowed for a given flight based on its capacity.
 can_book_flight(FlightID, CanBook) :-
-    connect_to_database(Connection),
-    % Query to get the current number of reservations for the flight.
-    odbc_prepare(Connection, 'SELECT COUNT(*) FROM reservations WHERE flight_id = ?', [integer], CountStatement),
-    odbc_execute(CountStatement, [FlightID], row(ReservationCount)),
-    % Query to get the maximum capacity of the flight.
-    odbc_prepare(Connection, 'SELECT max_capacity FROM flights WHERE flight_id = ?', [integer], CapacityStatement),
-    odbc_execute(CapacityStatement, [FlightID], row(MaxCapacity)),
-    odbc_free_statement(CountStatement),
-    odbc_free_statement(CapacityStatement),
-    odbc_disconnect(Connection),
+    % The flight row carries its own reservation counter; unexpired seat holds count as taken too,
+    % and are found through the SeatHolds (flight_id, seat_number) key.
+    pooled_execute('SELECT seats_booked + (SELECT COUNT(*) FROM SeatHolds h WHERE h.flight_id = f.flight_id AND h.expires_at > NOW()), max_capacity FROM flights f WHERE f.flight_id = ?', [integer], [FlightID], row(ReservationCount, MaxCapacity)),
     % Determine booking availability.
     (ReservationCount < MaxCapacity -> CanBook = true ; CanBook = false).
 
 % Checks if a given reservation ID exists in the system.
 reservation_exists(ReservationID, Exists) :-
-    connect_to_database(Connection),
-    odbc_prepare(Connection, 'SELECT COUNT(*) FROM reservations WHERE reservation_id = ?', [integer], Statement),
-    odbc_execute(Statement, [ReservationID], row(Count)),
-    odbc_free_statement(Statement),
-    odbc_disconnect(Connection),
+    pooled_execute('SELECT COUNT(*) FROM reservations WHERE reservation_id = ?', [integer], [ReservationID], row(Count)),
     (Count > 0 -> Exists = true; Exists = false).
 
 
@@ -0,0 +1,136 @@
+import argparse
+import datetime
+import random
+import time
+import mysql.connector
+import db
+from flight_search import search_flights, date_bounds, FLIGHT_COLUMNS
+
+# Benchmark for search_flights: seeds a scratch database with a synthetic schedule, then times
+# random route searches through the (departure_airport, arrival_airport, departure_datetime)
+# index against the same query forced to scan the whole table.
+
+AIRLINES = ["Delta", "United", "American", "Southwest", "JetBlue", "Alaska", "Spirit", "Frontier"]
+
+
+def connect(database):
+    return mysql.connector.connect(**dict(db.DB_CONFIG, database=database))
+
+
+def create_bench_database(database):
+    connection = mysql.connector.connect(**{k: v for k, v in db.DB_CONFIG.items() if k != "database"})
+    cursor = connection.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{database}`;")
+    connection.close()
+
+
+def seed_flights(connection, count, airports, start_day, days, batch_size=5000):
+    # Replaces the Flights table with `count` random flights between `airports` airports.
+    cursor = connection.cursor()
+    cursor.execute("DROP TABLE IF EXISTS Flights;")
+    cursor.execute("""
+    CREATE TABLE Flights (
+        flight_id INT AUTO_INCREMENT PRIMARY KEY,
+        airline_name VARCHAR(100) NOT NULL,
+        flight_number VARCHAR(20) NOT NULL,
+        departure_airport VARCHAR(100) NOT NULL,
+        arrival_airport VARCHAR(100) NOT NULL,
+        departure_datetime DATETIME NOT NULL,
+        arrival_datetime DATETIME NOT NULL,
+        max_capacity INT NOT NULL,
+        seats_booked INT NOT NULL DEFAULT 0
+    );
+    """)
+    codes = [f"A{i:03d}" for i in range(airports)]
+    query = """
+    INSERT INTO Flights (airline_name, flight_number, departure_airport, arrival_airport,
+                         departure_datetime, arrival_datetime, max_capacity)
+    VALUES (%s, %s, %s, %s, %s, %s, %s);
+    """
+    rows = []
+    for number in range(count):
+        origin, destination = random.sample(codes, 2)
+        departure = start_day + datetime.timedelta(minutes=random.randrange(days * 24 * 60))
+        arrival = departure + datetime.timedelta(minutes=random.randint(45, 600))
+        rows.append((random.choice(AIRLINES), f"FL{number}", origin, destination,
+                     departure.strftime("%Y-%m-%d %H:%M:%S"), arrival.strftime("%Y-%m-%d %H:%M:%S"), 180))
+        if len(rows) == batch_size:
+            cursor.executemany(query, rows)
+            connection.commit()
+            rows = []
+    if rows:
+        cursor.executemany(query, rows)
+        connection.commit()
+    cursor.execute("CREATE INDEX idx_flights_route ON Flights (departure_airport, arrival_airport, departure_datetime);")
+    cursor.execute("CREATE INDEX idx_flights_departure ON Flights (departure_datetime, flight_id);")
+    return codes
+
+
+def full_scan_search(connection, origin, destination, date_range):
+    # The same search with every secondary index disabled, i.e. what a query without the route index costs.
+    start, end = date_bounds(date_range)
+    cursor = connection.cursor()
+    cursor.execute(f"""
+    SELECT {", ".join(FLIGHT_COLUMNS)} FROM Flights IGNORE INDEX (idx_flights_route, idx_flights_departure)
+    WHERE departure_airport = %s AND arrival_airport = %s
+      AND departure_datetime >= %s AND departure_datetime < %s
+    ORDER BY departure_datetime, flight_id;
+    """, (origin, destination, start, end))
+    return cursor.fetchall()
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def time_searches(search, connection, searches):
+    latencies = []
+    for origin, destination, date_range in searches:
+        start = time.perf_counter()
+        for _ in search(connection, origin, destination, date_range):
+            pass
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+    return {"queries": len(latencies), "p50_ms": round(percentile(latencies, 0.50), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3), "max_ms": round(latencies[-1], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark indexed route search against a full table scan.")
+    parser.add_argument("--database", default="Air_Reserve_Bench", help="scratch database to seed (it is overwritten)")
+    parser.add_argument("--flights", type=int, default=1_000_000)
+    parser.add_argument("--airports", type=int, default=200)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--scan-queries", type=int, default=50, help="full scans are slow, so fewer are timed")
+    parser.add_argument("--skip-seed", action="store_true", help="reuse the schedule from a previous run")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    start_day = datetime.datetime(2025, 1, 1)
+    create_bench_database(args.database)
+    connection = connect(args.database)
+    codes = [f"A{i:03d}" for i in range(args.airports)]
+    if not args.skip_seed:
+        started = time.perf_counter()
+        seed_flights(connection, args.flights, args.airports, start_day, args.days)
+        print(f"Seeded {args.flights} flights in {time.perf_counter() - started:.1f}s")
+
+    searches = []
+    for _ in range(max(args.queries, args.scan_queries)):
+        origin, destination = random.sample(codes, 2)
+        first_day = (start_day + datetime.timedelta(days=random.randrange(args.days))).date()
+        searches.append((origin, destination, (first_day, first_day + datetime.timedelta(days=6))))
+
+    indexed = time_searches(search_flights, connection, searches[:args.queries])
+    scanned = time_searches(full_scan_search, connection, searches[:args.scan_queries])
+    print(f"Flights: {args.flights}")
+    print(f"Indexed search:   p50 {indexed['p50_ms']} ms, p99 {indexed['p99_ms']} ms over {indexed['queries']} queries")
+    print(f"Full table scan:  p50 {scanned['p50_ms']} ms, p99 {scanned['p99_ms']} ms over {scanned['queries']} queries")
+    connection.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import argparse
+import datetime
+import threading
+import time
+import db
+
+# Result codes returned by book_seat, change_reservation and remove_reservation.
+BOOKED = "booked"
+UPDATED = "updated"
+DELETED = "deleted"
+NO_SUCH_FLIGHT = "no_such_flight"
+NO_SUCH_RESERVATION = "no_such_reservation"
+RESERVATION_CANCELLED = "reservation_cancelled"
+SEAT_TAKEN = "seat_taken"
+SEAT_HELD = "seat_held"
+FLIGHT_FULL = "flight_full"
+FAILED = "failed"
+
+
+def begin_transaction(connection):
+    # Starts a READ COMMITTED transaction, first ending the implicit one left open by
+    # earlier reads on a connection that is not in autocommit mode.
+    if connection.in_transaction:
+        connection.commit()
+    connection.start_transaction(isolation_level="READ COMMITTED")
+
+
+def hold_clock():
+    # Current time as stored in SeatHolds.expires_at (whole seconds, local time like the schedule).
+    return datetime.datetime.now().replace(microsecond=0)
+
+
+def held_by_others(cursor, flight_id, seat_number, holder=None):
+    # Returns (holds, seat_held): how many unexpired seat holds of other holders the flight has, and
+    # whether one of them is on seat_number. Both count as taken for everyone but their holder.
+    cursor.execute("""
+    SELECT COUNT(*), COALESCE(SUM(CASE WHEN seat_number = %s THEN 1 ELSE 0 END), 0)
+    FROM SeatHolds
+    WHERE flight_id = %s AND expires_at > %s AND holder <> %s;
+    """, (seat_number, flight_id, hold_clock(), holder or ""))
+    holds, seat_held = cursor.fetchone()
+    return int(holds), int(seat_held) > 0
+
+
+def book_seat(connection, passenger_id, flight_id, seat_number, holder=None):
+    # Books a seat in a single transaction and returns (result_code, reservation_id).
+    # The flight row is locked first, so concurrent bookings for the same flight are
+    # serialised by the database. Capacity is read from the flight's seats_booked counter
+    # and the insert is conditional on the seat being free, so it can neither overbook
+    # nor double-assign a seat. Seats held by anyone but `holder` count as taken; the
+    # holder's own hold on the seat is consumed by the booking.
+    cursor = connection.cursor()
+    try:
+        begin_transaction(connection)
+        cursor.execute("SELECT seats_booked, max_capacity FROM Flights WHERE flight_id = %s FOR UPDATE;", (flight_id,))
+        flight = cursor.fetchone()
+        if flight is None:
+            connection.rollback()
+            return NO_SUCH_FLIGHT, None
+        seats_booked, max_capacity = flight
+        holds, seat_held = held_by_others(cursor, flight_id, seat_number, holder)
+        if seats_booked + holds >= max_capacity:
+            connection.rollback()
+            return FLIGHT_FULL, None
+        if seat_held:
+            connection.rollback()
+            return SEAT_HELD, None
+
+        cursor.execute("""
+        INSERT INTO Reservations (passenger_id, flight_id, seat_number, booking_status)
+        SELECT %s, %s, %s, 'confirmed'
+        FROM Flights
+        WHERE flight_id = %s
+          AND NOT EXISTS (SELECT 1 FROM Reservations WHERE flight_id = %s AND seat_number = %s);
+        """, (passenger_id, flight_id, seat_number, flight_id, flight_id, seat_number))
+        if cursor.rowcount != 1:
+            connection.rollback()
+            return SEAT_TAKEN, None
+        reservation_id = cursor.lastrowid
+        cursor.execute("UPDATE Flights SET seats_booked = seats_booked + 1 WHERE flight_id = %s;", (flight_id,))
+        if holder:
+            cursor.execute("DELETE FROM SeatHolds WHERE flight_id = %s AND seat_number = %s AND holder = %s;",
+                           (flight_id, seat_number, holder))
+        connection.commit()
+        return BOOKED, reservation_id
+    except Exception as e:
+        connection.rollback()
+        print(f"Failed to book seat. Database Error: {e}")
+        return FAILED, None
+
+
+def change_reservation(connection, reservation_id, new_flight_id, new_seat_number, holder=None):
+    # Moves a reservation to another flight and/or seat in one transaction and returns a result code.
+    # Both flight rows are locked in flight_id order so two opposite moves cannot deadlock, and
+    # the seats_booked counters of the old and new flight are adjusted together with the update.
+    # Cancelled reservations are not moved.
+    cursor = connection.cursor()
+    try:
+        begin_transaction(connection)
+        cursor.execute("SELECT flight_id, booking_status FROM Reservations WHERE reservation_id = %s;", (reservation_id,))
+        reservation = cursor.fetchone()
+        if reservation is None:
+            connection.rollback()
+            return NO_SUCH_RESERVATION
+        if reservation[1] == "cancelled":
+            connection.rollback()
+            return RESERVATION_CANCELLED
+        old_flight_id = reservation[0]
+        new_flight_id = int(new_flight_id)
+
+        flights = {}
+        for flight_id in sorted({old_flight_id, new_flight_id}):
+            cursor.execute("SELECT seats_booked, max_capacity FROM Flights WHERE flight_id = %s FOR UPDATE;", (flight_id,))
+            flights[flight_id] = cursor.fetchone()
+        if flights[new_flight_id] is None:
+            connection.rollback()
+            return NO_SUCH_FLIGHT
+
+        # Re-read under the locks: the reservation may have moved or vanished in the meantime.
+        cursor.execute("SELECT flight_id, booking_status FROM Reservations WHERE reservation_id = %s FOR UPDATE;",
+                       (reservation_id,))
+        reservation = cursor.fetchone()
+        if reservation is None:
+            connection.rollback()
+            return NO_SUCH_RESERVATION
+        if reservation[1] == "cancelled":
+            connection.rollback()
+            return RESERVATION_CANCELLED
+        if reservation[0] != old_flight_id:
+            connection.rollback()
+            return FAILED
+
+        seats_booked, max_capacity = flights[new_flight_id]
+        holds, seat_held = held_by_others(cursor, new_flight_id, new_seat_number, holder)
+        if new_flight_id != old_flight_id and seats_booked + holds >= max_capacity:
+            connection.rollback()
+            return FLIGHT_FULL
+        if seat_held:
+            connection.rollback()
+            return SEAT_HELD
+        cursor.execute("SELECT COUNT(*) FROM Reservations WHERE flight_id = %s AND seat_number = %s AND reservation_id <> %s;",
+                       (new_flight_id, new_seat_number, reservation_id))
+        if cursor.fetchone()[0] > 0:
+            connection.rollback()
+            return SEAT_TAKEN
+
+        cursor.execute("UPDATE Reservations SET flight_id = %s, seat_number = %s WHERE reservation_id = %s;",
+                       (new_flight_id, new_seat_number, reservation_id))
+        if new_flight_id != old_flight_id:
+            cursor.execute("UPDATE Flights SET seats_booked = seats_booked - 1 WHERE flight_id = %s;", (old_flight_id,))
+            cursor.execute("UPDATE Flights SET seats_booked = seats_booked + 1 WHERE flight_id = %s;", (new_flight_id,))
+        if holder:
+            cursor.execute("DELETE FROM SeatHolds WHERE flight_id = %s AND seat_number = %s AND holder = %s;",
+                           (new_flight_id, new_seat_number, holder))
+        connection.commit()
+        return UPDATED
+    except Exception as e:
+        connection.rollback()
+        print(f"Failed to change reservation. Database Error: {e}")
+        return FAILED
+
+
+def remove_reservation(connection, reservation_id):
+    # Deletes a reservation and releases its seat from the flight's seats_booked counter in one transaction.
+    # A cancelled reservation no longer counts against its flight, so deleting it leaves the counter alone.
+    cursor = connection.cursor()
+    try:
+        begin_transaction(connection)
+        cursor.execute("SELECT flight_id FROM Reservations WHERE reservation_id = %s;", (reservation_id,))
+        reservation = cursor.fetchone()
+        if reservation is None:
+            connection.rollback()
+            return NO_SUCH_RESERVATION
+        flight_id = reservation[0]
+        cursor.execute("SELECT flight_id FROM Flights WHERE flight_id = %s FOR UPDATE;", (flight_id,))
+        cursor.fetchone()
+        # Read the status under the flight lock: a flight cancellation may have just cancelled it.
+        cursor.execute("SELECT booking_status FROM Reservations WHERE reservation_id = %s AND flight_id = %s FOR UPDATE;",
+                       (reservation_id, flight_id))
+        reservation = cursor.fetchone()
+        if reservation is None:
+            connection.rollback()
+            return FAILED
+        cursor.execute("DELETE FROM Reservations WHERE reservation_id = %s AND flight_id = %s;", (reservation_id, flight_id))
+        if cursor.rowcount != 1:
+            connection.rollback()
+            return FAILED
+        if reservation[0] != "cancelled":
+            cursor.execute("UPDATE Flights SET seats_booked = seats_booked - 1 WHERE flight_id = %s;", (flight_id,))
+        connection.commit()
+        return DELETED
+    except Exception as e:
+        connection.rollback()
+        print(f"Failed to delete reservation. Database Error: {e}")
+        return FAILED
+
+
+def run_overbooking_stress(connect, bookers=50, capacity=10, seats=None):
+    # Starts `bookers` threads, each with its own connection from connect(), that all try to
+    # book the same test flight at once. Seats are drawn from `seats` codes so that several
+    # threads compete for the same seat. Returns a summary and removes the test data afterwards.
+    seats = seats or max(1, capacity + capacity // 2)
+    setup = connect()
+    cursor = setup.cursor()
+    cursor.execute("""
+    INSERT INTO Flights (airline_name, flight_number, departure_airport, arrival_airport,
+                         departure_datetime, arrival_datetime, max_capacity)
+    VALUES ('STRESS', 'ST000', 'TST', 'TST', '2099-01-01 00:00:00', '2099-01-01 01:00:00', %s);
+    """, (capacity,))
+    flight_id = cursor.lastrowid
+    cursor.execute("INSERT INTO Passengers (first_name, last_name, email, phone_number) VALUES ('Stress', 'Test', 'stress@test.invalid', '000');")
+    passenger_id = cursor.lastrowid
+    setup.commit()
+
+    results = []
+    results_lock = threading.Lock()
+    start_barrier = threading.Barrier(bookers)
+
+    def booker(index):
+        connection = connect()
+        try:
+            start_barrier.wait()
+            started = time.perf_counter()
+            result, _ = book_seat(connection, passenger_id, flight_id, f"{index % seats + 1}A")
+            with results_lock:
+                results.append((result, time.perf_counter() - started))
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=booker, args=(i,)) for i in range(bookers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    cursor.execute("SELECT COUNT(*), COUNT(DISTINCT seat_number) FROM Reservations WHERE flight_id = %s;", (flight_id,))
+    booked, distinct_seats = cursor.fetchone()
+    cursor.execute("DELETE FROM Reservations WHERE flight_id = %s;", (flight_id,))
+    cursor.execute("DELETE FROM Flights WHERE flight_id = %s;", (flight_id,))
+    cursor.execute("DELETE FROM Passengers WHERE passenger_id = %s;", (passenger_id,))
+    setup.commit()
+    setup.close()
+
+    outcome = {}
+    for result, _ in results:
+        outcome[result] = outcome.get(result, 0) + 1
+    latencies = sorted(elapsed for _, elapsed in results)
+    return {
+        "bookers": bookers,
+        "capacity": capacity,
+        "reservations": booked,
+        "overbooked": booked > capacity,
+        "double_assigned_seats": booked - distinct_seats,
+        "results": outcome,
+        "max_latency_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent booking stress test: N parallel bookers against one flight.")
+    parser.add_argument("--bookers", type=int, default=50)
+    parser.add_argument("--capacity", type=int, default=10)
+    parser.add_argument("--seats", type=int, default=None, help="number of distinct seat codes the bookers draw from")
+    args = parser.parse_args()
+
+    summary = run_overbooking_stress(db.connect, args.bookers, args.capacity, args.seats)
+    for key, value in summary.items():
+        print(f"{key}: {value}")
+    if summary["overbooked"] or summary["double_assigned_seats"]:
+        print("FAILED: the flight was overbooked or a seat was assigned twice.")
+        raise SystemExit(1)
+    print("OK: no overbooking under concurrent load.")
+
+
+if __name__ == "__main__":
+    main()
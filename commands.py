@@ -0,0 +1,243 @@
+import argparse
+import json
+import sys
+import time
+from booking import book_seat, change_reservation, remove_reservation, hold_clock, BOOKED, UPDATED, DELETED
+from booking import NO_SUCH_FLIGHT, FLIGHT_FULL
+from flight_search import search_flights, FLIGHT_COLUMNS
+from flight_cancellation import cancel_flight
+from import_flights import validate_flight, INSERT_FLIGHT
+from passengers import upsert_passenger
+from seat_map import SeatMap
+from storage import open_storage
+
+# The menu operations as plain functions. Each takes an open connection plus keyword arguments and
+# returns a JSON-serialisable dict with "ok" and the operation's result, instead of prompting and
+# printing. They are exposed on the command line and as a JSONL batch runner below.
+
+
+def add_passenger(connection, first_name, last_name, email, phone_number=""):
+    # Reuses the passenger registered under the same email, updating their details.
+    passenger_id, created = upsert_passenger(connection, first_name, last_name, email, phone_number)
+    return {"ok": True, "passenger_id": passenger_id, "existing": not created}
+
+
+def search(connection, origin, destination, first_day, last_day=None, airline=None):
+    flights = [dict(zip(FLIGHT_COLUMNS, row)) for row in
+               search_flights(connection, origin, destination, (first_day, last_day or first_day), airline)]
+    connection.commit()
+    return {"ok": True, "flights": flights}
+
+
+def _load_seat_map(cursor, flight_id, max_capacity):
+    # Returns (seat_map, holds): the flight's seat map with its reserved and unexpired held seats taken,
+    # and the number of those holds, which count against capacity like reservations.
+    cursor.execute("SELECT seat_number FROM Reservations WHERE flight_id = %s;", (flight_id,))
+    seat_map = SeatMap(max_capacity, (row[0] for row in cursor.fetchall()))
+    cursor.execute("SELECT seat_number FROM SeatHolds WHERE flight_id = %s AND expires_at > %s;", (flight_id, hold_clock()))
+    held = [row[0] for row in cursor.fetchall()]
+    for seat_number in held:
+        seat_map.take(seat_number)
+    return seat_map, len(held)
+
+
+def seats(connection, flight_id):
+    # Seat availability of a flight: capacity, seats taken and held, and the free seat codes in row order.
+    cursor = connection.cursor()
+    cursor.execute("SELECT max_capacity, seats_booked FROM Flights WHERE flight_id = %s;", (flight_id,))
+    flight = cursor.fetchone()
+    if flight is None:
+        connection.commit()
+        return {"ok": False, "result": NO_SUCH_FLIGHT}
+    seat_map, holds = _load_seat_map(cursor, flight_id, flight[0])
+    connection.commit()
+    return {"ok": True, "flight_id": flight_id, "max_capacity": flight[0], "seats_booked": flight[1],
+            "seats_held": holds, "can_book": flight[1] + holds < flight[0], "free_seats": seat_map.free_seats()}
+
+
+def book(connection, flight_id, seat_number=None, passenger_id=None,
+         first_name=None, last_name=None, email=None, phone_number=""):
+    # Books a seat for an existing passenger_id, or for the passenger given by name and email.
+    # Without a seat_number the first seat of the flight that is neither booked nor held is taken.
+    if passenger_id is None:
+        if not (first_name and last_name and email):
+            return {"ok": False, "error": "give passenger_id or first_name, last_name and email"}
+        passenger_id = add_passenger(connection, first_name, last_name, email, phone_number)["passenger_id"]
+    if not seat_number:
+        cursor = connection.cursor()
+        cursor.execute("SELECT max_capacity, seats_booked FROM Flights WHERE flight_id = %s;", (flight_id,))
+        flight = cursor.fetchone()
+        if flight is None:
+            return {"ok": False, "result": NO_SUCH_FLIGHT}
+        seat_map, holds = _load_seat_map(cursor, flight_id, flight[0])
+        seat_number = seat_map.next_free() if flight[1] + holds < flight[0] else None
+        if seat_number is None:
+            return {"ok": False, "result": FLIGHT_FULL}
+    result, reservation_id = book_seat(connection, passenger_id, flight_id, seat_number)
+    return {"ok": result == BOOKED, "result": result, "reservation_id": reservation_id,
+            "passenger_id": passenger_id, "seat_number": seat_number}
+
+
+def edit(connection, reservation_id, flight_id, seat_number):
+    result = change_reservation(connection, reservation_id, flight_id, seat_number)
+    return {"ok": result == UPDATED, "result": result}
+
+
+def delete(connection, reservation_id):
+    result = remove_reservation(connection, reservation_id)
+    return {"ok": result == DELETED, "result": result}
+
+
+def add_flight(connection, airline_name, flight_number, departure_airport, arrival_airport,
+               departure_datetime, arrival_datetime, max_capacity):
+    # Validates with the same rules as the interactive add_flight before inserting.
+    row, error = validate_flight(dict(airline_name=airline_name, flight_number=flight_number,
+                                      departure_airport=departure_airport, arrival_airport=arrival_airport,
+                                      departure_datetime=departure_datetime, arrival_datetime=arrival_datetime,
+                                      max_capacity=max_capacity))
+    if error:
+        return {"ok": False, "error": error}
+    cursor = connection.cursor()
+    cursor.execute(INSERT_FLIGHT, row)
+    connection.commit()
+    return {"ok": True, "flight_id": cursor.lastrowid}
+
+
+def remove_flight(connection, flight_id, rebook=True):
+    # Cancels the flight: its passengers are rebooked on the same route where possible, the rest of
+    # their reservations cancelled, and the flight deleted. See flight_cancellation.cancel_flight.
+    summary = cancel_flight(connection, flight_id, rebook=rebook)
+    return dict(summary, ok=summary["deleted"])
+
+
+def _yes_no(value):
+    if isinstance(value, bool):
+        return value
+    if str(value).strip().lower() in ("1", "true", "yes", "y"):
+        return True
+    if str(value).strip().lower() in ("0", "false", "no", "n"):
+        return False
+    raise ValueError(f"expected yes or no, got {value!r}")
+
+
+# How run_command describes a value the argument's type could not convert.
+_EXPECTED = {int: "an integer", _yes_no: "yes or no"}
+
+# name -> (function, [(argument, type, required, help)])
+COMMANDS = {
+    "add-passenger": (add_passenger, [("first_name", str, True, None), ("last_name", str, True, None),
+                                      ("email", str, True, None), ("phone_number", str, False, None)]),
+    "search": (search, [("origin", str, True, None), ("destination", str, True, None),
+                        ("first_day", str, True, "YYYY-MM-DD"), ("last_day", str, False, "YYYY-MM-DD, default first_day"),
+                        ("airline", str, False, None)]),
+    "seats": (seats, [("flight_id", int, True, None)]),
+    "book": (book, [("flight_id", int, True, None), ("seat_number", str, False, "default: next free seat"),
+                    ("passenger_id", int, False, None), ("first_name", str, False, None),
+                    ("last_name", str, False, None), ("email", str, False, None), ("phone_number", str, False, None)]),
+    "edit": (edit, [("reservation_id", int, True, None), ("flight_id", int, True, None), ("seat_number", str, True, None)]),
+    "delete": (delete, [("reservation_id", int, True, None)]),
+    "add-flight": (add_flight, [("airline_name", str, True, None), ("flight_number", str, True, None),
+                                ("departure_airport", str, True, None), ("arrival_airport", str, True, None),
+                                ("departure_datetime", str, True, "YYYY-MM-DD HH:MM:SS"),
+                                ("arrival_datetime", str, True, "YYYY-MM-DD HH:MM:SS"),
+                                ("max_capacity", int, True, None)]),
+    "remove-flight": (remove_flight, [("flight_id", int, True, None),
+                                      ("rebook", _yes_no, False, "rebook passengers on the same route (default yes)")]),
+}
+
+
+def run_command(connection, name, arguments):
+    # Runs one command and returns its result dict; unknown commands, bad arguments and database
+    # errors are reported as {"ok": False, "error": ...} rather than raised.
+    if name not in COMMANDS:
+        return {"ok": False, "error": f"unknown command {name!r}"}
+    function, parameters = COMMANDS[name]
+    try:
+        converted = {}
+        for argument, kind, required, _ in parameters:
+            value = arguments.get(argument)
+            if value is None or value == "":
+                if required:
+                    return {"ok": False, "error": f"missing {argument}"}
+                continue
+            try:
+                converted[argument] = kind(value)
+            except (TypeError, ValueError):
+                # A fixed message naming the argument, not the converter's own text.
+                return {"ok": False, "error": f"{argument} must be {_EXPECTED.get(kind, 'valid')}"}
+        unknown = set(arguments) - {argument for argument, *_ in parameters}
+        if unknown:
+            return {"ok": False, "error": f"unknown argument(s) {', '.join(sorted(unknown))}"}
+        return function(connection, **converted)
+    except ValueError as e:
+        return {"ok": False, "error": str(e)}
+    except Exception as e:
+        if connection.in_transaction:
+            connection.rollback()
+        return {"ok": False, "error": str(e)}
+
+
+def run_batch(connection, lines, out):
+    # Executes a JSONL stream of {"command": name, "args": {...}} objects (the arguments may also be
+    # given at the top level) on one connection. Writes one result line per command with its latency
+    # and returns a summary.
+    summary = {"commands": 0, "ok": 0, "failed": 0, "seconds": 0.0}
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        started = time.perf_counter()
+        try:
+            request = json.loads(line)
+            arguments = request.get("args", {k: v for k, v in request.items() if k not in ("command", "id")})
+            result = run_command(connection, request.get("command"), arguments)
+        except (ValueError, AttributeError):
+            request, result = {}, {"ok": False, "error": "line is not a JSON object"}
+        elapsed = time.perf_counter() - started
+        summary["commands"] += 1
+        summary["ok" if result.get("ok") else "failed"] += 1
+        summary["seconds"] += elapsed
+        out.write(json.dumps({"line": line_number, "id": request.get("id"), "command": request.get("command"),
+                              "latency_ms": round(elapsed * 1000, 3), "result": result}, default=str) + "\n")
+    summary["seconds"] = round(summary["seconds"], 3)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run Airline Reservation System operations without the menu.")
+    parser.add_argument("--storage", default="mysql", help="'mysql' or 'sqlite:///file.db'")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    for name, (_, parameters) in COMMANDS.items():
+        subcommand = subcommands.add_parser(name)
+        for argument, kind, required, help_text in parameters:
+            if required:
+                subcommand.add_argument(argument, type=kind, help=help_text)
+            else:
+                subcommand.add_argument(f"--{argument.replace('_', '-')}", dest=argument, type=kind, help=help_text)
+    batch = subcommands.add_parser("batch", help="run a JSONL stream of commands on one connection")
+    batch.add_argument("path", nargs="?", default="-", help="JSONL file, or - for standard input")
+    args = parser.parse_args()
+
+    storage = open_storage(args.storage)
+    try:
+        with storage.connection() as connection:
+            if args.command == "batch":
+                source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+                try:
+                    summary = run_batch(connection, source, sys.stdout)
+                finally:
+                    if source is not sys.stdin:
+                        source.close()
+                print(json.dumps({"summary": summary}), file=sys.stderr)
+                ok = summary["failed"] == 0
+            else:
+                arguments = {key: value for key, value in vars(args).items() if key not in ("storage", "command")}
+                result = run_command(connection, args.command, arguments)
+                print(json.dumps(result, default=str, indent=2))
+                ok = result.get("ok")
+    finally:
+        storage.close()
+    raise SystemExit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
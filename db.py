@@ -0,0 +1,121 @@
+import threading
+import time
+from contextlib import contextmanager
+import metrics
+try:
+    import mysql.connector
+    from mysql.connector import pooling
+except ImportError:  # without the MySQL driver only the SQLite storage (storage.py) can be used
+    mysql = pooling = None
+
+# Connection settings of the Air_Reserve_System database.
+DB_CONFIG = {
+    "host": "localhost",
+    "user": "root",
+    "password": "",
+    "database": "Air_Reserve_System",
+    # Drain any unread rows before the next statement instead of raising "Unread result found".
+    "consume_results": True,
+}
+
+# Defaults for the shared pool; override them with init_pool().
+POOL_SIZE = 5
+CHECKOUT_TIMEOUT = 10.0  # seconds to wait for a free connection before giving up
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    # A bounded pool of MySQL connections. Each operation checks a connection out with
+    # `with pool.connection() as connection:` and gives it back when the block ends, so
+    # no two threads ever share a connection. When every connection is in use, callers
+    # wait up to checkout_timeout seconds for one to be returned.
+
+    def __init__(self, pool_size=POOL_SIZE, checkout_timeout=CHECKOUT_TIMEOUT, **config):
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        # Sessions are not reset on return (that would cost a round trip per checkout);
+        # connection() rolls back anything left uncommitted instead.
+        self._pool = pooling.MySQLConnectionPool(pool_name="air_reserve", pool_size=pool_size,
+                                                 pool_reset_session=False, **(config or DB_CONFIG))
+        metrics.count_connection(pool_size)  # the pool opens all of its connections up front
+        self._available = threading.BoundedSemaphore(pool_size)
+        self._stats_lock = threading.Lock()
+        self._stats = {"checkouts": 0, "waits": 0, "wait_seconds": 0.0, "timeouts": 0, "in_use": 0}
+
+    @contextmanager
+    def connection(self):
+        waited = 0.0
+        if not self._available.acquire(blocking=False):
+            start = time.perf_counter()
+            acquired = self._available.acquire(timeout=self.checkout_timeout)
+            waited = time.perf_counter() - start
+            if not acquired:
+                with self._stats_lock:
+                    self._stats["timeouts"] += 1
+                raise PoolTimeout(f"No database connection became free within {self.checkout_timeout}s")
+        try:
+            connection = self._pool.get_connection()
+        except Exception:
+            self._available.release()
+            raise
+        with self._stats_lock:
+            self._stats["checkouts"] += 1
+            self._stats["in_use"] += 1
+            if waited:
+                self._stats["waits"] += 1
+                self._stats["wait_seconds"] += waited
+        try:
+            yield metrics.instrument_connection(connection)
+        finally:
+            try:
+                # Uncommitted work never leaks into the next borrower.
+                if connection.in_transaction:
+                    connection.rollback()
+            finally:
+                connection.close()  # returns it to the pool
+                with self._stats_lock:
+                    self._stats["in_use"] -= 1
+                self._available.release()
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats, pool_size=self.pool_size)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def init_pool(pool_size=POOL_SIZE, checkout_timeout=CHECKOUT_TIMEOUT, **config):
+    # Creates the shared pool. Call it once at start-up to change the size or timeout.
+    global _pool
+    with _pool_lock:
+        _pool = ConnectionPool(pool_size, checkout_timeout, **config)
+    return _pool
+
+
+def get_pool():
+    # Returns the shared pool, creating it with the default settings on first use.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+
+def connection():
+    # Checks a connection out of the shared pool: `with db.connection() as connection: ...`
+    return get_pool().connection()
+
+
+def pool_stats():
+    return get_pool().stats()
+
+
+def connect():
+    # Opens a dedicated connection outside the pool, for tools that manage their own connections.
+    metrics.count_connection()
+    return mysql.connector.connect(**DB_CONFIG)
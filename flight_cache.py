@@ -0,0 +1,96 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from flight_search import FLIGHT_COLUMNS
+
+# Columns of a cached flight record. seats_booked is left out on purpose: it changes with every
+# booking, while these only change when a flight is added, removed or imported.
+FLIGHT_RECORD_COLUMNS = FLIGHT_COLUMNS + ("max_capacity",)
+
+# Seconds a flight id that does not exist is remembered. Kept short, because another process
+# (import_flights, the HTTP service, commands.py) may add the flight at any moment.
+MISS_TTL = 1.0
+
+
+def _interned(row):
+    # The airline and airport names repeat across the whole schedule, so every row shares one copy.
+    row = list(row)
+    for position in (1, 3, 4):
+        if type(row[position]) is str:
+            row[position] = sys.intern(row[position])
+    return tuple(row)
+
+
+class FlightCache:
+    # Read-through cache of flight metadata, kept in an LRU of at most max_size flights. Entries are
+    # reloaded once they are older than ttl seconds (miss_ttl for flights that do not exist, so bad
+    # ids are not re-queried in a tight loop), and invalidate() drops them straight away after a write.
+    # Listing the schedule is left to flight_search.fetch_flight_page, which pages on the server.
+
+    def __init__(self, checkout, max_size=4096, ttl=300.0, miss_ttl=MISS_TTL):
+        # checkout() must return a context manager yielding a database connection, e.g. db.connection.
+        self.checkout = checkout
+        self.max_size = max_size
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._flights = OrderedDict()   # flight_id -> (loaded_at, record or None)
+        self._generation = 0            # bumped by invalidate(), so loads racing a write are not kept
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def get(self, flight_id):
+        # Returns the flight as a dict of FLIGHT_RECORD_COLUMNS, or None if it does not exist.
+        try:
+            flight_id = int(flight_id)
+        except (TypeError, ValueError):
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._flights.get(flight_id)
+            if entry is not None and now - entry[0] <= (self.ttl if entry[1] is not None else self.miss_ttl):
+                self._flights.move_to_end(flight_id)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+            generation = self._generation
+
+        with self.checkout() as connection:
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {', '.join(FLIGHT_RECORD_COLUMNS)} FROM Flights WHERE flight_id = %s;", (flight_id,))
+            row = cursor.fetchone()
+            connection.commit()
+        record = dict(zip(FLIGHT_RECORD_COLUMNS, _interned(row))) if row else None
+        with self._lock:
+            if generation != self._generation:
+                return record
+            self._flights[flight_id] = (now, record)
+            self._flights.move_to_end(flight_id)
+            while len(self._flights) > self.max_size:
+                self._flights.popitem(last=False)
+                self._stats["evictions"] += 1
+        return record
+
+    def exists(self, flight_id):
+        return self.get(flight_id) is not None
+
+    def max_capacity(self, flight_id):
+        record = self.get(flight_id)
+        return record["max_capacity"] if record else None
+
+    def airline(self, flight_id):
+        record = self.get(flight_id)
+        return record["airline_name"] if record else None
+
+    def invalidate(self, flight_id=None):
+        # Drops one flight, or every flight when flight_id is None.
+        with self._lock:
+            if flight_id is None:
+                self._flights.clear()
+            else:
+                self._flights.pop(int(flight_id), None)
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._flights))
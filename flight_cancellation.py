@@ -0,0 +1,202 @@
+import argparse
+import datetime
+import json
+import time
+import db
+from booking import begin_transaction, hold_clock, NO_SUCH_FLIGHT
+from seat_map import SeatMap
+
+# Result codes of cancel_flight and the per-passenger actions in its summary.
+CANCELLED = "cancelled"
+REBOOKED = "rebooked"
+
+# Reservations handled per transaction, so a full 400-seat flight never holds its locks for long.
+CHUNK_SIZE = 50
+
+# How far after the cancelled departure a flight on the same route still counts as an alternative.
+REBOOK_WINDOW = datetime.timedelta(days=2)
+
+
+def _placeholders(count):
+    return ", ".join(["%s"] * count)
+
+
+def _close_flight(cursor, flight_id):
+    # Stops new bookings on the flight: with max_capacity 0 every booking path sees it as full.
+    # The real capacity is kept in original_capacity, and survives a rerun on an already closed
+    # flight. Its seat holds are dropped too. Returns the flight row, ending with that capacity, or None.
+    cursor.execute("SELECT departure_airport, arrival_airport, departure_datetime, "
+                   "COALESCE(original_capacity, max_capacity) FROM Flights WHERE flight_id = %s FOR UPDATE;",
+                   (flight_id,))
+    flight = cursor.fetchone()
+    if flight is not None:
+        cursor.execute("UPDATE Flights SET original_capacity = %s, max_capacity = 0 WHERE flight_id = %s;",
+                       (flight[3], flight_id))
+        cursor.execute("DELETE FROM SeatHolds WHERE flight_id = %s;", (flight_id,))
+    return flight
+
+
+def _alternatives(cursor, flight_id, origin, destination, departure, window):
+    # Flights on the same route departing within `window` after the cancelled one, earliest first.
+    # A range scan on the (departure_airport, arrival_airport, departure_datetime) index.
+    cursor.execute("SELECT flight_id FROM Flights WHERE departure_airport = %s AND arrival_airport = %s "
+                   "AND departure_datetime >= %s AND departure_datetime < %s AND flight_id <> %s "
+                   "ORDER BY departure_datetime, flight_id;",
+                   (origin, destination, departure, departure + window, flight_id))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _load_alternatives(cursor, flight_id, alternatives):
+    # Locks the cancelled flight and its alternatives together, in flight_id order like every other
+    # multi-flight transaction, and returns {flight_id: [load, max_capacity]} and their seat maps.
+    # Reservations and unexpired seat holds both count against an alternative's capacity.
+    locked = sorted(set(alternatives) | {flight_id})
+    cursor.execute(f"SELECT flight_id, seats_booked, max_capacity FROM Flights WHERE flight_id IN "
+                   f"({_placeholders(len(locked))}) ORDER BY flight_id FOR UPDATE;", tuple(locked))
+    loads = {row[0]: [row[1], row[2]] for row in cursor.fetchall() if row[0] != flight_id}
+    seat_maps = {alternative: SeatMap(max_capacity) for alternative, (_, max_capacity) in loads.items()}
+    if loads:
+        cursor.execute(f"SELECT flight_id, seat_number FROM Reservations WHERE flight_id IN "
+                       f"({_placeholders(len(loads))});", tuple(loads))
+        for alternative, seat_number in cursor.fetchall():
+            seat_maps[alternative].take(seat_number)
+        cursor.execute(f"SELECT flight_id, seat_number FROM SeatHolds WHERE expires_at > %s AND flight_id IN "
+                       f"({_placeholders(len(loads))});", (hold_clock(),) + tuple(loads))
+        for alternative, seat_number in cursor.fetchall():
+            seat_maps[alternative].take(seat_number)
+            loads[alternative][0] += 1
+    return loads, seat_maps
+
+
+def _handle_chunk(connection, flight_id, alternatives, chunk_size):
+    # Rebooks or cancels the next chunk of the flight's live reservations in one transaction.
+    # Returns the affected passengers, or [] once none are left.
+    cursor = connection.cursor()
+    begin_transaction(connection)
+    loads, seat_maps = _load_alternatives(cursor, flight_id, alternatives)
+    cursor.execute("SELECT reservation_id, passenger_id, seat_number FROM Reservations "
+                   "WHERE flight_id = %s AND booking_status <> 'cancelled' "
+                   "ORDER BY reservation_id LIMIT %s FOR UPDATE;", (flight_id, chunk_size))
+    reservations = cursor.fetchall()
+    if not reservations:
+        connection.commit()
+        return []
+    passenger_ids = sorted({passenger_id for _, passenger_id, _ in reservations})
+    cursor.execute(f"SELECT passenger_id, first_name, last_name, email FROM Passengers WHERE passenger_id IN "
+                   f"({_placeholders(len(passenger_ids))});", tuple(passenger_ids))
+    passengers = {row[0]: row[1:] for row in cursor.fetchall()}
+
+    affected, moves, cancellations, booked = [], [], [], {}
+    for reservation_id, passenger_id, seat_number in reservations:
+        first_name, last_name, email = passengers.get(passenger_id, (None, None, None))
+        entry = {"reservation_id": reservation_id, "passenger_id": passenger_id, "first_name": first_name,
+                 "last_name": last_name, "email": email, "action": CANCELLED, "flight_id": None, "seat_number": None}
+        for alternative in alternatives:
+            load, seat_map = loads.get(alternative), seat_maps.get(alternative)
+            if load is None or load[0] >= load[1]:
+                continue
+            # Keep the passenger's seat if it is free on the new flight, else take the first free one.
+            new_seat = seat_number if seat_map.is_free(seat_number) else seat_map.next_free()
+            if new_seat is None:
+                continue
+            seat_map.take(new_seat)
+            load[0] += 1
+            booked[alternative] = booked.get(alternative, 0) + 1
+            moves.append((alternative, new_seat, reservation_id))
+            entry.update(action=REBOOKED, flight_id=alternative, seat_number=new_seat)
+            break
+        else:
+            cancellations.append((reservation_id,))
+        affected.append(entry)
+
+    if moves:
+        cursor.executemany("UPDATE Reservations SET flight_id = %s, seat_number = %s WHERE reservation_id = %s;", moves)
+        cursor.executemany("UPDATE Flights SET seats_booked = seats_booked + %s WHERE flight_id = %s;",
+                           [(count, alternative) for alternative, count in booked.items()])
+    if cancellations:
+        cursor.executemany("UPDATE Reservations SET booking_status = 'cancelled' WHERE reservation_id = %s;", cancellations)
+    # Neither moved nor cancelled reservations count against the cancelled flight any more.
+    cursor.execute("UPDATE Flights SET seats_booked = seats_booked - %s WHERE flight_id = %s;", (len(reservations), flight_id))
+    connection.commit()
+    return affected
+
+
+def _delete_flight(connection, flight_id, chunk_size):
+    # Deletes the flight's cancelled reservations chunk by chunk, then the flight itself.
+    cursor = connection.cursor()
+    while True:
+        begin_transaction(connection)
+        cursor.execute("SELECT reservation_id FROM Reservations WHERE flight_id = %s ORDER BY reservation_id LIMIT %s;",
+                       (flight_id, chunk_size))
+        reservation_ids = [row[0] for row in cursor.fetchall()]
+        if not reservation_ids:
+            break
+        cursor.execute(f"DELETE FROM Reservations WHERE reservation_id IN ({_placeholders(len(reservation_ids))});",
+                       tuple(reservation_ids))
+        connection.commit()
+    cursor.execute("DELETE FROM Flights WHERE flight_id = %s;", (flight_id,))
+    connection.commit()
+    return cursor.rowcount == 1
+
+
+def cancel_flight(connection, flight_id, rebook=True, delete=True, chunk_size=CHUNK_SIZE, window=REBOOK_WINDOW):
+    # Cancels a flight and returns a summary of what happened to each of its passengers.
+    #   1. The flight is closed to new bookings in one short transaction.
+    #   2. Its reservations are handled chunk_size per transaction: each is moved to the earliest
+    #      alternative on the same route with room (if rebook), or else marked cancelled.
+    #   3. If delete, the cancelled reservations and then the flight are deleted, again in chunks.
+    #      Otherwise the flight stays, closed, with its cancelled reservations on record and its
+    #      capacity in original_capacity (also reported as the summary's max_capacity).
+    # A cancellation that is interrupted can simply be run again; it picks up where it stopped.
+    start = time.perf_counter()
+    summary = {"flight_id": flight_id, "result": CANCELLED, "max_capacity": None, "rebooked": 0, "cancelled": 0, "deleted": False,
+               "rebooked_onto": [], "passengers": [], "seconds": 0.0}
+    cursor = connection.cursor()
+    try:
+        begin_transaction(connection)
+        flight = _close_flight(cursor, flight_id)
+        connection.commit()
+        if flight is None:
+            summary["result"] = NO_SUCH_FLIGHT
+            return summary
+        origin, destination, departure, summary["max_capacity"] = flight
+        if isinstance(departure, str):
+            departure = datetime.datetime.fromisoformat(departure)
+        alternatives = _alternatives(cursor, flight_id, origin, destination, departure, window) if rebook else []
+        connection.commit()
+
+        while True:
+            affected = _handle_chunk(connection, flight_id, alternatives, chunk_size)
+            if not affected:
+                break
+            for entry in affected:
+                summary[entry["action"]] += 1
+                summary["passengers"].append(entry)
+        summary["rebooked_onto"] = sorted({entry["flight_id"] for entry in summary["passengers"] if entry["flight_id"]})
+        if delete:
+            summary["deleted"] = _delete_flight(connection, flight_id, chunk_size)
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cancel a flight, rebooking or cancelling its passengers.")
+    parser.add_argument("flight_id", type=int)
+    parser.add_argument("--no-rebook", action="store_true", help="cancel every reservation instead of rebooking")
+    parser.add_argument("--keep-flight", action="store_true", help="keep the closed flight and its cancelled reservations")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="reservations per transaction")
+    args = parser.parse_args()
+
+    with db.connection() as connection:
+        summary = cancel_flight(connection, args.flight_id, rebook=not args.no_rebook, delete=not args.keep_flight,
+                                chunk_size=args.chunk_size)
+    print(json.dumps(summary, default=str, indent=2))
+    raise SystemExit(0 if summary["result"] == CANCELLED else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import datetime
+
+FLIGHT_COLUMNS = ("flight_id", "airline_name", "flight_number", "departure_airport", "arrival_airport",
+                  "departure_datetime", "arrival_datetime")
+
+# Rows pulled from the server per fetchmany() while streaming results.
+FETCH_BATCH_SIZE = 500
+
+# Rows fetched per round trip by the flight list.
+PAGE_SIZE = 200
+
+
+def date_bounds(date_range):
+    # Turns an inclusive (first_day, last_day) range of dates or "YYYY-MM-DD" strings into the
+    # half-open [start, end) datetime strings used against departure_datetime.
+    first_day, last_day = (day if isinstance(day, datetime.date) else datetime.date.fromisoformat(str(day).strip())
+                           for day in date_range)
+    if last_day < first_day:
+        raise ValueError("The end of the date range is before its start.")
+    start = datetime.datetime.combine(first_day, datetime.time())
+    end = datetime.datetime.combine(last_day + datetime.timedelta(days=1), datetime.time())
+    return start.strftime("%Y-%m-%d %H:%M:%S"), end.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def search_flights(connection, origin, destination, date_range, airline=None, batch_size=FETCH_BATCH_SIZE):
+    # Yields the flights from origin to destination departing within date_range (inclusive dates),
+    # optionally for one airline, in departure order. The query is a range scan on the
+    # (departure_airport, arrival_airport, departure_datetime) index, and rows are streamed from an
+    # unbuffered cursor in batches, so the first result arrives before the last one is read.
+    start, end = date_bounds(date_range)
+    query = f"""
+    SELECT {", ".join(FLIGHT_COLUMNS)} FROM Flights
+    WHERE departure_airport = %s AND arrival_airport = %s
+      AND departure_datetime >= %s AND departure_datetime < %s
+    """
+    params = [origin, destination, start, end]
+    if airline:
+        query += " AND airline_name = %s"
+        params.append(airline)
+    query += " ORDER BY departure_datetime, flight_id;"
+
+    cursor = connection.cursor()
+    cursor.execute(query, tuple(params))
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+    finally:
+        cursor.close()
+
+
+def fetch_flight_page(connection, after=None, before=None, limit=PAGE_SIZE):
+    # Returns up to `limit` flights in (departure_datetime, flight_id) order, starting right after
+    # the `after` key or ending right before the `before` key. Keyset pagination keeps every page
+    # an index range scan, however deep into the schedule it is.
+    columns = ", ".join(FLIGHT_COLUMNS)
+    if before is not None:
+        query = f"""
+        SELECT {columns} FROM Flights
+        WHERE departure_datetime < %s OR (departure_datetime = %s AND flight_id < %s)
+        ORDER BY departure_datetime DESC, flight_id DESC LIMIT %s;
+        """
+        params = (before[0], before[0], before[1], limit)
+    elif after is not None:
+        query = f"""
+        SELECT {columns} FROM Flights
+        WHERE departure_datetime > %s OR (departure_datetime = %s AND flight_id > %s)
+        ORDER BY departure_datetime, flight_id LIMIT %s;
+        """
+        params = (after[0], after[0], after[1], limit)
+    else:
+        query = f"SELECT {columns} FROM Flights ORDER BY departure_datetime, flight_id LIMIT %s;"
+        params = (limit,)
+
+    # The default cursor is unbuffered, so rows are streamed from the server as they are read.
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    rows = [row for row in cursor]
+    cursor.close()
+    connection.commit()
+    if before is not None:
+        rows.reverse()
+    return rows
+
+
+def flight_key(row):
+    # Keyset position of a flight row: (departure_datetime, flight_id).
+    return row[5], row[0]
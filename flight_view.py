@@ -0,0 +1,123 @@
+import tkinter as tk
+from tkinter import ttk
+from collections import deque
+from flight_search import fetch_flight_page, flight_key, PAGE_SIZE, FLIGHT_COLUMNS
+
+# How many pages of PAGE_SIZE rows the Treeview may hold at once.
+MAX_PAGES = 5
+
+
+class FlightListView:
+    # A Treeview over the Flights table that only holds a sliding window of pages. Scrolling
+    # near the bottom fetches the next page and drops the oldest one, and the other way round
+    # near the top, so memory stays bounded no matter how large the schedule is.
+    #
+    # Pages are requested through page_loader(view, after, before, generation), which must end
+    # with view.load_rows(...) on the Tk thread. By default the page is fetched synchronously on
+    # `connection`; gui.py passes a loader that fetches on a worker thread instead.
+
+    def __init__(self, parent, connection=None, page_size=PAGE_SIZE, max_pages=MAX_PAGES, page_loader=None):
+        self.connection = connection
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.page_loader = page_loader or self._fetch_now
+        self.pages = deque()          # each page is a list of (item_id, key)
+        self.at_start = True
+        self.at_end = False
+        self.generation = 0           # bumped by reload() so pages of an earlier load are ignored
+        self._loading = False
+        self._pending = False
+
+        self.tree = ttk.Treeview(parent, columns=FLIGHT_COLUMNS, show="headings")
+        headings = ("Flight ID", "Airline", "Flight Number", "Departure", "Arrival", "Departure Time", "Arrival Time")
+        widths = (80, 150, 100, 250, 250, 150, 150)
+        for column, heading, width in zip(FLIGHT_COLUMNS, headings, widths):
+            self.tree.heading(column, text=heading)
+            self.tree.column(column, width=width)
+
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self._on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill="y")
+        self.tree.pack(side=tk.LEFT, fill="both", expand=True)
+
+    def load_rows(self, rows, at_end=True, generation=None):
+        # Inserts a fetched page at the bottom (or top) of the window, trimming the other end.
+        if generation is not None and generation != self.generation:
+            return
+        self._pending = False
+        if not rows:
+            if at_end:
+                self.at_end = True
+            else:
+                self.at_start = True
+            return
+        self._loading = True
+        try:
+            total = self._row_count()
+            first_visible = self.tree.yview()[0] * total if total else 0
+            index = tk.END if at_end else 0
+            page = []
+            for row in (rows if at_end else reversed(rows)):
+                item_id = self.tree.insert("", index, values=row)
+                page.append((item_id, flight_key(row)))
+            if at_end:
+                self.pages.append(page)
+                self.at_end = len(rows) < self.page_size
+            else:
+                page.reverse()
+                self.pages.appendleft(page)
+                self.at_start = len(rows) < self.page_size
+                first_visible += len(page)
+
+            if len(self.pages) > self.max_pages:
+                dropped = self.pages.popleft() if at_end else self.pages.pop()
+                self.tree.delete(*(item_id for item_id, _ in dropped))
+                if at_end:
+                    self.at_start = False
+                    first_visible -= len(dropped)
+                else:
+                    self.at_end = False
+            total = self._row_count()
+            if total:
+                self.tree.yview_moveto(max(0.0, first_visible) / total)
+        finally:
+            self._loading = False
+
+    def reload(self):
+        # Clears the window and loads the first page again, keeping the widget itself.
+        self.generation += 1
+        self.tree.delete(*self.tree.get_children())
+        self.pages.clear()
+        self.at_start = True
+        self.at_end = False
+        self._pending = False
+        self.request_page()
+
+    def next_page_key(self):
+        return None if self.at_end or not self.pages else self.pages[-1][-1][1]
+
+    def previous_page_key(self):
+        return None if self.at_start or not self.pages else self.pages[0][0][1]
+
+    def _row_count(self):
+        return sum(len(page) for page in self.pages)
+
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if self._loading or self._pending:
+            return
+        if float(last) > 0.9 and self.next_page_key() is not None:
+            self.request_page(after=self.next_page_key())
+        elif float(first) < 0.1 and self.previous_page_key() is not None:
+            self.request_page(before=self.previous_page_key())
+
+    def request_page(self, after=None, before=None):
+        # Asks the page loader for the neighbouring page; only one request is in flight at a time.
+        if self._pending:
+            return
+        self._pending = True
+        self.page_loader(self, after, before, self.generation)
+
+    def _fetch_now(self, view, after, before, generation):
+        rows = fetch_flight_page(self.connection, after=after, before=before, limit=self.page_size)
+        view.load_rows(rows, at_end=before is None, generation=generation)
@@ -1,24 +1,40 @@
-import mysql.connector
-from pyswip import Prolog
-import tkinter as tk
-from tkinter import ttk
-from tkinter import scrolledtext
+import signal
 import threading
-
-def create_db_connection():
-    # Establishes a connection to the MySQL database and returns the connection object.
+import mysql.connector
+import db
+import metrics
+from prolog_engine import prolog_query, print_engine_stats, close_odbc_pool, odbc_connections_opened, configure_odbc_pool_from_environment
+from popularity import PopularityCache
+from booking import book_seat, change_reservation, remove_reservation
+from booking import BOOKED, UPDATED, DELETED, FLIGHT_FULL, SEAT_TAKEN, SEAT_HELD, NO_SUCH_FLIGHT, RESERVATION_CANCELLED
+from migrations import apply_migrations
+from seat_map import SeatMapCache
+from gui import FlightWindows
+from flight_search import search_flights, fetch_flight_page
+from flight_cache import FlightCache
+from flight_cancellation import cancel_flight, REBOOKED
+from passengers import upsert_passenger
+from reservation_search import fetch_reservation_page, parse_filters
+from itinerary import ItineraryGraph
+from seat_holds import SeatHolds, HELD, new_holder
+from validators import valid_datetime_format, departure_before_arrival
+
+# Time spent waiting at a prompt is not counted towards the instrumented operations below.
+input = metrics.untimed_input
+
+def create_db_pool():
+    # Creates the shared MySQL connection pool, brings the schema up to date, applies any ODBC pool
+    # settings from the environment and reports whether it worked.
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='',
-            database='Air_Reserve_System'
-        )
+        db.init_pool()
+        configure_odbc_pool_from_environment()
+        with db.connection() as connection:
+            apply_migrations(connection)
         print("MySQL Database connection successful")
+        return True
     except Exception as e:
         print(f"The error '{e}' occurred")
-        connection = None
-    return connection
+        return False
 
 def display_main_menu():
     # Displays the main menu options to the user and returns the user's choice.
@@ -31,17 +47,51 @@ def display_main_menu():
     print("4. Delete a Reservation")
     print("5. Add a Flight")
     print("6. Remove a Flight")
-    print("7. Exit")
-    return input("Enter your choice (1-7): ")
+    print("7. Search Flights")
+    print("8. Plan a Trip with Connections")
+    print("9. Exit")
+    return input("Enter your choice (1-9): ")
+
+def load_airline_popularity():
+    # Queries Prolog for the number of reservations held by every airline.
+    result = prolog_query("airline_popularity(Ranking)")
+    return [(str(airline), count) for airline, count in result[0]["Ranking"]] if result else []
+
+# Cached airline ranking, kept up to date by the booking, deletion and flight removal paths.
+popularity = PopularityCache(load_airline_popularity)
 
 def get_most_popular_airline():
-    # Queries Prolog to find the most popular airline based on the number of bookings.
-    prolog = Prolog()
-    prolog.consult("backend.pl")
-    result = list(prolog.query("most_popular_airline(Airline)"))
-    return result[0]["Airline"] if result else "No recommendation available."
+    # Finds the most popular airline based on the number of bookings, using the cached ranking.
+    airline = popularity.most_popular()
+    return airline if airline else "No recommendation available."
+
+def get_top_airlines(n=3):
+    # Returns the n most booked airlines as (airline_name, count) pairs.
+    return popularity.top(n)
+
+# Seat maps of the flights looked at in this session, kept current by the booking paths.
+seat_maps = SeatMapCache(db.connection)
+
+# Flight metadata, invalidated by add_flight and remove_flight below.
+flights = FlightCache(db.connection)
+
+# Connection graph of the whole schedule, loaded on first use and updated as flights and bookings change.
+itineraries = ItineraryGraph(db.connection)
 
-def add_flight(connection):
+# Seats picked in the booking dialogue stay held until booked, released or expired.
+seat_holds = SeatHolds(db.connection)
+
+def get_flight_airline(flight_id):
+    # Looks up the airline operating a flight, or None if the flight does not exist.
+    return flights.airline(flight_id)
+
+def get_reservation_airline(reservation_id):
+    # Looks up the airline of the flight a reservation is booked on.
+    result = prolog_query(f"reservation_airline({reservation_id}, Airline)")
+    return str(result[0]["Airline"]) if result else None
+
+@metrics.instrumented()
+def add_flight():
     print("Please enter the new flight details or press enter at any prompt to cancel.")
     
     airline_name = input("Airline Name: ")
@@ -64,19 +114,16 @@ def add_flight(connection):
         print("Adding flight cancelled.")
         return
 
-    prolog = Prolog()
-    prolog.consult("backend.pl")
-
     # Loop for departure datetime input validation
     while True:
         departure_datetime = input("Departure Date and Time (YYYY-MM-DD HH:MM:SS): ")
         if not departure_datetime:
             print("Adding flight cancelled.")
             return
-        if list(prolog.query(f"valid_datetime_format('{departure_datetime}')")):
+        if valid_datetime_format(departure_datetime):
             break
         else:
-            print("Invalid departure datetime format. Please enter the datetime in the format YYYY-MM-DD HH:MM:SS.")
+            print("Invalid departure datetime. Please enter a real date and time in the format YYYY-MM-DD HH:MM:SS.")
 
     # Loop for arrival datetime input validation
     while True:
@@ -84,14 +131,13 @@ def add_flight(connection):
         if not arrival_datetime:
             print("Adding flight cancelled.")
             return
-        if list(prolog.query(f"valid_datetime_format('{arrival_datetime}')")):
+        if valid_datetime_format(arrival_datetime):
             break
         else:
-            print("Invalid arrival datetime format. Please enter the datetime in the format YYYY-MM-DD HH:MM:SS.")
+            print("Invalid arrival datetime. Please enter a real date and time in the format YYYY-MM-DD HH:MM:SS.")
     
     # Checks if the departure is before the arrival
-    time_check = list(prolog.query(f"is_departure_before_arrival('{departure_datetime}', '{arrival_datetime}', Result)."))
-    if not time_check or time_check[0]["Result"] == 'false':
+    if not departure_before_arrival(departure_datetime, arrival_datetime):
         print("Error: Arrival Time is before Departure Time.")
         return
 
@@ -109,76 +155,97 @@ def add_flight(connection):
         return
 
     try:
-        cursor = connection.cursor()
-        query = """
-        INSERT INTO Flights (
-            airline_name, flight_number, departure_airport, arrival_airport, 
-            departure_datetime, arrival_datetime, max_capacity
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s);
-        """
-        cursor.execute(query, (airline_name, flight_number, departure_airport, arrival_airport, departure_datetime, arrival_datetime, max_capacity))
-        connection.commit()
+        with db.connection() as connection:
+            cursor = connection.cursor()
+            query = """
+            INSERT INTO Flights (
+                airline_name, flight_number, departure_airport, arrival_airport, 
+                departure_datetime, arrival_datetime, max_capacity
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s);
+            """
+            cursor.execute(query, (airline_name, flight_number, departure_airport, arrival_airport, departure_datetime, arrival_datetime, max_capacity))
+            connection.commit()
+        flights.invalidate(cursor.lastrowid)
+        itineraries.add_leg(cursor.lastrowid, departure_airport, arrival_airport, departure_datetime, arrival_datetime, max_capacity)
         print("Flight added successfully.")
     except Exception as e:
         print(f"An error occurred: {e}")
 
 
-def remove_flight(connection):
-    run_list_flights_in_thread(connection)
+@metrics.instrumented()
+def remove_flight():
+    show_flight_list()
     flight_id = input("Enter the Flight ID you wish to remove (or input 0 to exit): ")
     
     if flight_id == '0':
         print("Exiting flight removal process.")
         return
 
-    prolog = Prolog()
-    prolog.consult("backend.pl")
-
     # Verify if the user wants to proceed with deletion
     confirm = input(f"Are you sure you want to remove Flight ID {flight_id}? (yes/no): ").lower()
-    if confirm == 'yes':
-        result = list(prolog.query(f"delete_flight({flight_id}, Success)."))
-        if result and result[0]['Success'] == 'true':
-            print("Flight removed successfully.")
-        else:
-            print("An error occurred while trying to remove the flight.")
-    else:
+    if confirm != 'yes':
         print("Flight removal cancelled.")
+        return
+    rebook = input("Rebook its passengers onto other flights on the same route? (yes/no): ").lower() == 'yes'
+    try:
+        with db.connection() as connection:
+            summary = cancel_flight(connection, int(flight_id), rebook=rebook)
+    except Exception as e:
+        print(f"An error occurred while trying to remove the flight: {e}")
+        return
+    if summary["result"] == NO_SUCH_FLIGHT:
+        print("No flight found with that ID.")
+        return
 
+    # Rebooked passengers may have moved to another airline, so the ranking is reloaded.
+    popularity.invalidate()
+    flights.invalidate(flight_id)
+    seat_maps.forget(flight_id)
+    itineraries.remove_leg(flight_id)
+    for entry in summary["passengers"]:
+        if entry["action"] == REBOOKED:
+            seat_maps.record_taken(entry["flight_id"], entry["seat_number"])
+            itineraries.record_booking(entry["flight_id"])
+            print(f"Reservation {entry['reservation_id']} ({entry['first_name']} {entry['last_name']}, {entry['email']}): "
+                  f"rebooked onto Flight ID {entry['flight_id']}, Seat {entry['seat_number']}")
+        else:
+            print(f"Reservation {entry['reservation_id']} ({entry['first_name']} {entry['last_name']}, {entry['email']}): cancelled")
+    print(f"Flight removed: {summary['rebooked']} passenger(s) rebooked, {summary['cancelled']} reservation(s) cancelled.")
 
-def add_passenger(connection, passenger_details):
+
+@metrics.instrumented()
+def add_passenger(passenger_details):
+    # Returns the passenger's ID, reusing the passenger already registered under the same email.
     first_name, last_name, email, phone_number = passenger_details
     try:
-        cursor = connection.cursor()
-        query = "INSERT INTO Passengers (first_name, last_name, email, phone_number) VALUES (%s, %s, %s, %s);"
-        cursor.execute(query, (first_name, last_name, email, phone_number))
-        connection.commit()
-        passenger_id = cursor.lastrowid
-        print(f"Passenger added successfully. Passenger ID: {passenger_id}")
+        with db.connection() as connection:
+            passenger_id, created = upsert_passenger(connection, first_name, last_name, email, phone_number)
+        if created:
+            print(f"Passenger added successfully. Passenger ID: {passenger_id}")
+        else:
+            print(f"Welcome back! Passenger with email {email} already exists. Passenger ID: {passenger_id}")
         return passenger_id
-    except mysql.connector.Error as e:
+    except (mysql.connector.Error, RuntimeError) as e:
         print(f"Failed to add passenger. MySQL Error: {e}")
         return None
 
 
-def edit_reservation(connection):
-    list_current_reservations(connection)
+@metrics.instrumented()
+def edit_reservation():
+    list_current_reservations()
     reservation_id = input("Enter the Reservation ID you wish to edit (or input 0 to exit): ")
 
     if reservation_id == '0':
         print("Exiting edit reservation process.")
         return
-
-    prolog = Prolog()
-    prolog.consult("backend.pl")
     
     # Check if the reservation ID exists
-    exists_result = list(prolog.query(f"reservation_exists({reservation_id}, Exists)"))
+    exists_result = prolog_query(f"reservation_exists({reservation_id}, Exists)")
     if not exists_result or exists_result[0]["Exists"] == "false":
         print("No reservation ID found.")
         return
 
-    run_list_flights_in_thread(connection)
+    show_flight_list()
     new_flight_id = input("Enter new Flight ID: ")
     new_seat_number = input("Enter new Seat Number (e.g., 12A): ")
 
@@ -188,163 +255,233 @@ def edit_reservation(connection):
         return
     
     # Check if the seat is already taken
-    if not validate_seat_number(new_flight_id, new_seat_number):
-        print("This seat is already taken. Please choose a different seat.")
+    if not seat_maps.is_free(new_flight_id, new_seat_number):
+        print("This seat is already taken or does not exist on this flight. Please choose a different seat.")
         return
     
     # Check if the new flight has capacity
-    can_book_result = list(prolog.query(f"can_book_flight({new_flight_id}, CanBook)"))
+    can_book_result = prolog_query(f"can_book_flight({new_flight_id}, CanBook)")
     if not can_book_result or can_book_result[0]["CanBook"] == "false":
         print("Cannot change to the selected flight due to max capacity.")
         return
 
-    # Perform the update in the database
-    result = list(prolog.query(f"edit_reservation({reservation_id}, {new_flight_id}, '{new_seat_number}', Success)."))
-    if result and result[0]['Success'] == 'true':
+    # Perform the update in the database, moving the seat counters in the same transaction
+    old_airline = get_reservation_airline(reservation_id)
+    old_seat = get_reservation_seat(reservation_id)
+    with db.connection() as connection:
+        result = change_reservation(connection, reservation_id, new_flight_id, new_seat_number)
+    if result == UPDATED:
+        if old_seat:
+            seat_maps.record_released(*old_seat)
+            itineraries.record_cancellation(old_seat[0])
+        seat_maps.record_taken(new_flight_id, new_seat_number)
+        itineraries.record_booking(new_flight_id)
+        new_airline = get_flight_airline(new_flight_id)
+        if old_airline != new_airline:
+            popularity.record_cancellation(old_airline)
+            popularity.record_booking(new_airline)
         print("Reservation updated successfully.")
+    elif result == FLIGHT_FULL:
+        print("Cannot change to the selected flight due to max capacity.")
+    elif result == SEAT_TAKEN:
+        seat_maps.forget(new_flight_id)
+        print("This seat is already taken. Please choose a different seat.")
+    elif result == SEAT_HELD:
+        print("This seat is being booked by someone else. Please choose a different seat.")
+    elif result == RESERVATION_CANCELLED:
+        print("This reservation was cancelled and cannot be edited.")
     else:
         print("Failed to update the reservation.")
 
 
-def delete_reservation(connection):
-    list_current_reservations(connection)
+@metrics.instrumented()
+def delete_reservation():
+    list_current_reservations()
     reservation_id = input("Enter the Reservation ID you wish to delete (or input 0 to exit): ")
     
     if reservation_id == '0':
         print("Exiting delete reservation process.")
         return
     
-    prolog = Prolog()
-    prolog.consult("backend.pl")
-    result = list(prolog.query(f"delete_reservation({reservation_id}, Success)"))
+    airline = get_reservation_airline(reservation_id)
+    seat = get_reservation_seat(reservation_id)
+    with db.connection() as connection:
+        result = remove_reservation(connection, reservation_id)
     
-    if result and result[0]["Success"] == "true":
+    if result == DELETED:
+        # A cancelled reservation held no seat and did not count towards the airline's popularity.
+        if seat:
+            seat_maps.record_released(*seat)
+            itineraries.record_cancellation(seat[0])
+            popularity.record_cancellation(airline)
         print("Reservation deleted successfully.")
-        connection.commit()
     else:
         print("Reservation ID not found. No deletion performed.")
 
-def list_flights(connection):
-    window = tk.Tk()
-    window.title("Available Flights")
-    window.geometry("1140x500")  # Adjust the size as needed
-
-    # Define the columns
-    columns = ("flight_id", "airline_name", "flight_number", "departure", "arrival", "departure_time", "arrival_time")
-
-    tree = ttk.Treeview(window, columns=columns, show="headings")
-    tree.heading("flight_id", text="Flight ID")
-    tree.heading("airline_name", text="Airline")
-    tree.heading("flight_number", text="Flight Number")
-    tree.heading("departure", text="Departure")
-    tree.heading("arrival", text="Arrival")
-    tree.heading("departure_time", text="Departure Time")
-    tree.heading("arrival_time", text="Arrival Time")
-
-    tree.column("flight_id", width=80)
-    tree.column("airline_name", width=150)
-    tree.column("flight_number", width=100)
-    tree.column("departure", width=250)
-    tree.column("arrival", width=250)
-    tree.column("departure_time", width=150)
-    tree.column("arrival_time", width=150)
-
-    # scrollbar adding
-    scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=tree.yview)
-    tree.configure(yscroll=scrollbar.set)
-    scrollbar.pack(side=tk.RIGHT, fill="y")
-
-    tree.pack(side=tk.LEFT, fill="both", expand=True)
-
-    # Retrieving flight data from database
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT flight_id, airline_name, flight_number, departure_airport, arrival_airport, departure_datetime, arrival_datetime FROM Flights ORDER BY departure_datetime;")
-    flights = cursor.fetchall()
-
-    for flight in flights:
-        tree.insert("", tk.END, values=(flight["flight_id"], flight["airline_name"], flight["flight_number"],
-                                         flight["departure_airport"], flight["arrival_airport"], 
-                                         flight["departure_datetime"], flight["arrival_datetime"]))
-
-    window.mainloop()
-
-def run_list_flights_in_thread(connection):
-    flight_thread = threading.Thread(target=list_flights, args=(connection,))
-    flight_thread.start()
+# The single Tk root of the program; flight lists open as windows of it.
+flight_windows = FlightWindows(db.connection)
 
-def validate_flight_id(flight_id):
-    prolog = Prolog()
-    prolog.consult("backend.pl")  
-    query = f"flight_id_exists({flight_id}, Exists)."
-    result = list(prolog.query(query))
-    if result and result[0]['Exists'] == 'true':
-        return True
-    else:
-        return False
+def show_flight_list():
+    # Opens the flight list window, or refreshes it in place if it is already open. Without a
+    # display the first page of the schedule is printed instead.
+    try:
+        flight_windows.show_flights()
+    except RuntimeError as e:
+        print(f"{e}. Available flights:")
+        with db.connection() as connection:
+            rows = fetch_flight_page(connection)
+        for flight_id, airline_name, flight_number, departure, arrival, departure_time, arrival_time in rows:
+            print(f"Flight ID: {flight_id}, Airline: {airline_name}, Flight Number: {flight_number}, Departure: {departure} -> Arrival: {arrival}, Departure Time: {departure_time}, Arrival Time: {arrival_time}")
+
+@metrics.instrumented()
+def search_flights_menu():
+    print("Please enter the route to search for or press enter at any prompt to cancel.")
+
+    origin = input("Departure Airport: ").strip()
+    if not origin:
+        print("Search cancelled.")
+        return
 
-def validate_seat_number(flight_id, seat_number):
-    prolog = Prolog()
-    prolog.consult("backend.pl") 
-    query = f"seat_number_available({flight_id}, '{seat_number}', Available)."
-    result = list(prolog.query(query))
-    if result and result[0]['Available'] == 'true':
-        return True
-    else:
-        return False
+    destination = input("Arrival Airport: ").strip()
+    if not destination:
+        print("Search cancelled.")
+        return
+
+    first_day = input("Earliest Departure Date (YYYY-MM-DD): ").strip()
+    if not first_day:
+        print("Search cancelled.")
+        return
+    last_day = input("Latest Departure Date (YYYY-MM-DD, press enter for the same day): ").strip() or first_day
+    airline = input("Airline (press enter for any airline): ").strip() or None
+
+    # Results are printed as they stream in, in departure order
+    found = 0
+    try:
+        with db.connection() as connection:
+            for flight in search_flights(connection, origin, destination, (first_day, last_day), airline):
+                flight_id, airline_name, flight_number, departure, arrival, departure_time, arrival_time = flight
+                print(f"Flight ID: {flight_id}, Airline: {airline_name}, Flight Number: {flight_number}, Departure: {departure} -> Arrival: {arrival}, Departure Time: {departure_time}, Arrival Time: {arrival_time}")
+                found += 1
+    except ValueError as e:
+        print(f"Invalid date range: {e}. Please use the format YYYY-MM-DD.")
+        return
+    if not found:
+        print("No flights found for that route and dates.")
+
+@metrics.instrumented()
+def plan_trip_menu():
+    print("Please enter the trip to plan or press enter at any prompt to cancel.")
+
+    origin = input("Departure Airport: ").strip()
+    if not origin:
+        print("Trip planning cancelled.")
+        return
+
+    destination = input("Arrival Airport: ").strip()
+    if not destination:
+        print("Trip planning cancelled.")
+        return
+
+    depart_after = get_valid_datetime("Earliest Departure (YYYY-MM-DD HH:MM:SS): ")
+
+    # Shows both the itinerary that lands first and the one with the fewest connections, if they differ
+    fastest = itineraries.earliest_arrival(origin, destination, depart_after)
+    if fastest is None:
+        print(f"No bookable itinerary of up to {itineraries.max_legs} flights found.")
+        return
+    options = [("Earliest arrival", fastest)]
+    fewest = itineraries.fewest_legs(origin, destination, depart_after)
+    if fewest != fastest:
+        options.append(("Fewest connections", fewest))
+    for title, legs in options:
+        print(f"{title} ({len(legs)} flight(s), arriving {legs[-1].arrival}):")
+        for leg in legs:
+            print(f"  Flight ID: {leg.flight_id}, {leg.origin} -> {leg.destination}, Departure Time: {leg.departure}, Arrival Time: {leg.arrival}")
+
+@metrics.instrumented()
+def validate_flight_id(flight_id):
+    return flights.exists(flight_id)
 
 def get_valid_datetime(prompt):
-    prolog = Prolog()
-    prolog.consult("backend.pl")
     while True:
         datetime_input = input(prompt)
-        if list(prolog.query(f"valid_datetime_format('{datetime_input}')")):
+        if valid_datetime_format(datetime_input):
             return datetime_input
         else:
-            print("Invalid datetime format. Please enter the datetime in the format YYYY-MM-DD HH:MM:SS.")
-
-def list_current_reservations(connection): # Did not use Prolog due to ODBC complications
-    cursor = connection.cursor(dictionary=True)
-    query = """
-    SELECT r.reservation_id, p.first_name, p.last_name, r.flight_id, r.seat_number, r.booking_status
-    FROM Reservations r
-    JOIN Passengers p ON r.passenger_id = p.passenger_id
-    ORDER BY r.reservation_id;
-    """
-    cursor.execute(query)
-    reservations = cursor.fetchall()
-
-    if reservations:
-        print("Current Reservations:")
-        for reservation in reservations:
-            print(f"Reservation ID: {reservation['reservation_id']}, Passenger: {reservation['first_name']} {reservation['last_name']}, Flight ID: {reservation['flight_id']}, Seat: {reservation['seat_number']}, Status: {reservation['booking_status']}")
-    else:
+            print("Invalid datetime. Please enter a real date and time in the format YYYY-MM-DD HH:MM:SS.")
+
+def get_reservation_seat(reservation_id):
+    # Returns (flight_id, seat_number) of a reservation, or None if it does not exist or is cancelled.
+    with db.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT flight_id, seat_number FROM Reservations WHERE reservation_id = %s "
+                       "AND booking_status <> 'cancelled';", (reservation_id,))
+        return cursor.fetchone()
+
+def list_current_reservations():
+    # Pages through the reservations matching an optional filter, one page per query, until the
+    # user moves on to the Reservation ID prompt.
+    filters = parse_filters(input("Filter reservations by flight ID, email, name or status (press enter for all): "))
+    with db.connection() as connection:
+        rows = fetch_reservation_page(connection, filters)
+    if not rows:
         print("No current reservations found.")
+        return
+    while True:
+        print("Current Reservations:")
+        for reservation_id, first_name, last_name, email, flight_id, seat_number, booking_status in rows:
+            print(f"Reservation ID: {reservation_id}, Passenger: {first_name} {last_name} <{email}>, Flight ID: {flight_id}, Seat: {seat_number}, Status: {booking_status}")
+        choice = input("[n]ext page, [p]revious page, or press enter to continue: ").strip().lower()
+        if choice not in ("n", "p"):
+            return
+        with db.connection() as connection:
+            if choice == "n":
+                page = fetch_reservation_page(connection, filters, after=rows[-1][0])
+            else:
+                page = fetch_reservation_page(connection, filters, before=rows[0][0])
+        if page:
+            rows = page
+        else:
+            print("No more reservations in that direction.")
 
 def can_book_flight_via_prolog(flight_id):
-    prolog = Prolog()
-    prolog.consult("backend.pl")
     query = f"can_book_flight({flight_id}, CanBook)."
-    result = list(prolog.query(query))
+    result = prolog_query(query)
     if result and result[0]["CanBook"] == "true":
         return True
     else:
         return False
 
-def make_reservation(connection, passenger_id, flight_id, seat_number):
-    prolog = Prolog()
-    prolog.consult("backend.pl")
-    can_book = list(prolog.query(f"can_book_flight({flight_id}, CanBook)"))
-    if can_book and can_book[0]["CanBook"] == "true":
-        try:
-            cursor = connection.cursor()
-            query = "INSERT INTO Reservations (passenger_id, flight_id, seat_number, booking_status) VALUES (%s, %s, %s, 'confirmed');"
-            cursor.execute(query, (passenger_id, flight_id, seat_number))
-            connection.commit()
-            print("Reservation made successfully!")
-        except mysql.connector.Error as e:
-            print(f"Failed to make reservation. MySQL Error: {e}")
-    else:
+@metrics.instrumented()
+def make_reservation(passenger_id, flight_id, seat_number, holder=None):
+    # Books the seat in one transaction; the database re-checks the flight, seat and capacity.
+    # The booking consumes the holder's hold on the seat; if it fails the hold is given back.
+    if holder and not seat_holds.is_held(flight_id, seat_number):
+        print(f"The hold on seat {seat_number} has expired; booking it if it is still free.")
+    with db.connection() as connection:
+        result, reservation_id = book_seat(connection, passenger_id, flight_id, seat_number, holder)
+    if holder:
+        if result == BOOKED:
+            seat_holds.confirmed(flight_id, seat_number)
+        else:
+            seat_holds.release(holder, flight_id, seat_number)
+    if result == BOOKED:
+        seat_maps.record_taken(flight_id, seat_number)
+        itineraries.record_booking(flight_id)
+        popularity.record_booking(get_flight_airline(flight_id))
+        print(f"Reservation made successfully! Reservation ID: {reservation_id}")
+    elif result == FLIGHT_FULL:
         print("Cannot make reservation: Flight is fully booked.")
+    elif result == SEAT_TAKEN:
+        seat_maps.forget(flight_id)
+        print("Cannot make reservation: This seat has just been taken by another booking.")
+    elif result == SEAT_HELD:
+        print("Cannot make reservation: This seat is being booked by someone else.")
+    elif result == NO_SUCH_FLIGHT:
+        print("Cannot make reservation: Flight not found.")
+    else:
+        print("Failed to make reservation.")
+    return result
 
 def get_user_input_for_passenger():
     print("Please enter your personal details or press enter at any prompt to cancel.")
@@ -373,49 +510,147 @@ def get_user_input_for_passenger():
 
 
 
-def choose_flight_and_seat(connection):
-    run_list_flights_in_thread(connection)
-    flight_id = input("Please enter the flight ID you wish to book: ")
-    while not validate_flight_id(flight_id):
-        print("Invalid flight ID. Please choose a valid flight ID from the list.")
+def choose_flight_and_seat():
+    # Returns (flight_id, seat_number, holder) once the chosen seat is held for this dialogue,
+    # so nobody else can book it while the booking is completed.
+    holder = new_holder()
+    while True:
+        show_flight_list()
         flight_id = input("Please enter the flight ID you wish to book: ")
-    seat_number = input("Please enter your preferred seat number (e.g., 12A): ")
-    while not validate_seat_number(flight_id, seat_number):
-        print("This seat is already taken. Please choose a different seat.")
-        seat_number = input("Please enter your preferred seat number (e.g., 12A): ")
-    return flight_id, seat_number
+        while not validate_flight_id(flight_id):
+            print("Invalid flight ID. Please choose a valid flight ID from the list.")
+            flight_id = input("Please enter the flight ID you wish to book: ")
+        show_seat_picker(flight_id)
+        while True:
+            seat_number = choose_seat(flight_id)
+            if seat_number is None:
+                # Nothing left to pick on this flight; go back to the flight list.
+                print("Please choose a different flight.")
+                break
+            if not seat_maps.is_free(flight_id, seat_number):
+                print("This seat is already taken or does not exist on this flight. Please choose a different seat.")
+                continue
+            result = seat_holds.hold(holder, flight_id, seat_number)
+            if result == HELD:
+                print(f"Seat {seat_number} is held for you for {seat_holds.ttl // 60} minute(s).")
+                return flight_id, seat_number, holder
+            elif result == SEAT_TAKEN:
+                seat_maps.forget(flight_id)
+                print("This seat is already taken. Please choose a different seat.")
+            elif result == SEAT_HELD:
+                print("This seat is being booked by someone else. Please choose a different seat.")
+            else:
+                print("No seat can be held on this flight right now. Please choose a different flight.")
+                break
+
+def show_seat_picker(flight_id):
+    # Prints the seat map of a flight so the user can see which seats are free.
+    seat_map = seat_maps.get(flight_id)
+    if seat_map is None:
+        return
+    free = len(seat_map.free_seats())
+    print(f"Seat map for Flight ID {flight_id} ([x] = taken, {free} seat(s) free):")
+    print(seat_map.render())
+
+def choose_seat(flight_id):
+    # Asks for a seat number; pressing enter takes the first free seat on the map. Returns None
+    # when enter was pressed and the flight has no free seat left.
+    seat_number = input("Please enter your preferred seat number (e.g., 12A), or press enter for the next free seat: ").strip()
+    if not seat_number:
+        seat_map = seat_maps.get(flight_id)
+        seat_number = seat_map.next_free() if seat_map else None
+        if seat_number:
+            print(f"Seat {seat_number} selected.")
+        else:
+            print("No free seats remain on this flight.")
+    return seat_number
+
+def metrics_gauges():
+    # Process-wide figures reported next to the per-operation metrics.
+    gauges = {f"db_pool_{key}": value for key, value in db.pool_stats().items()}
+    gauges["odbc_connections_opened"] = odbc_connections_opened()
+    gauges.update({f"flight_cache_{key}": value for key, value in flights.stats().items()})
+    return gauges
+
+def write_metrics(metrics_file):
+    # Prints the histogram dump and, if a file is configured, writes the Prometheus text file.
+    gauges = metrics_gauges()
+    print(metrics.histogram_dump(gauges))
+    if metrics_file:
+        metrics.write_prometheus(metrics_file, gauges)
+        print(f"Metrics written to {metrics_file}")
+
+# Set by SIGUSR2. The dump queries Prolog and takes the metrics and pool locks, so it is written by
+# a daemon thread waiting on this event rather than by the handler, which may interrupt any of them.
+# The thread writes it straight away, even while the menu is waiting for input.
+metrics_requested = threading.Event()
+
+def start_metrics_writer(metrics_file):
+    def run():
+        while True:
+            metrics_requested.wait()
+            metrics_requested.clear()
+            try:
+                write_metrics(metrics_file)
+            except Exception as e:
+                print(f"Failed to write metrics: {e}")
+
+    threading.Thread(target=run, name="metrics-writer", daemon=True).start()
+
+def install_metrics_signals():
+    # SIGUSR1 switches instrumentation on or off and SIGUSR2 asks for a metrics dump, without restarting.
+    if not hasattr(signal, "SIGUSR1"):
+        return
+    signal.signal(signal.SIGUSR1, lambda *_: print(f"Instrumentation {'on' if metrics.toggle() else 'off'}."))
+    signal.signal(signal.SIGUSR2, lambda *_: metrics_requested.set())
 
 def main():
-    connection = create_db_connection()
-    if connection:
+    metrics_file = metrics.configure_from_environment()
+    install_metrics_signals()
+    if create_db_pool():
+        seat_holds.start_sweeper()
         print("Welcome to the Airline Reservation System!")
+        start_metrics_writer(metrics_file)
         while True:
             user_choice = display_main_menu()
             if user_choice == '1':
+                # The seat is held from the moment it is picked, while the passenger details are entered.
+                flight_id, seat_number, holder = choose_flight_and_seat()
                 passenger_details = get_user_input_for_passenger()
                 if None in passenger_details:
-                    continue  # Skip adding the passenger if the operation was cancelled
-                passenger_id = add_passenger(connection, passenger_details)
+                    seat_holds.release(holder, flight_id, seat_number)
+                    continue  # Skip the booking if the operation was cancelled
+                passenger_id = add_passenger(passenger_details)
                 if passenger_id is not None:
-                    flight_id, seat_number = choose_flight_and_seat(connection)
-                    make_reservation(connection, passenger_id, flight_id, seat_number)
+                    make_reservation(passenger_id, flight_id, seat_number, holder)
                 else:
+                    seat_holds.release(holder, flight_id, seat_number)
                     print("Failed to add passenger.")
             elif user_choice == '2':
-                run_list_flights_in_thread(connection)
+                show_flight_list()
             elif user_choice == '3':
-                edit_reservation(connection)
+                edit_reservation()
             elif user_choice == '4':
-                delete_reservation(connection)
+                delete_reservation()
             elif user_choice == '5':
-                add_flight(connection)
+                add_flight()
             elif user_choice == '6':
-                remove_flight(connection)
+                remove_flight()
             elif user_choice == '7':
+                search_flights_menu()
+            elif user_choice == '8':
+                plan_trip_menu()
+            elif user_choice == '9':
                 print("Exiting the Airline Reservation System.")
+                flight_windows.stop()
+                seat_holds.stop_sweeper()
+                if metrics.is_enabled():
+                    write_metrics(metrics_file)
+                close_odbc_pool()
+                print_engine_stats()
                 break
             else:
-                print("Invalid choice. Please enter a number between 1 and 7.")
+                print("Invalid choice. Please enter a number between 1 and 9.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,220 @@
+import argparse
+import csv
+import os
+import sys
+import time
+import db
+from booking import begin_transaction, hold_clock
+from import_flights import read_records, RejectWriter
+from passengers import normalize_email
+from seat_map import SeatMap
+
+PASSENGER_FIELDS = ("first_name", "last_name", "email", "phone_number")
+
+BATCH_SIZE = 500
+FETCH_BATCH_SIZE = 1000
+
+MANIFEST_COLUMNS = ("reservation_id", "seat_number", "first_name", "last_name", "email", "phone_number", "booking_status")
+
+
+def _placeholders(count):
+    return ", ".join(["%s"] * count)
+
+
+def validate_booking(record):
+    # Returns ((first_name, last_name, email, phone_number), flight_id, seat_number or None), or raises
+    # ValueError with the reason the record is rejected. An empty seat means "next free seat".
+    missing = [field for field in PASSENGER_FIELDS + ("flight_id",) if str(record.get(field) or "").strip() == ""]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    passenger = tuple(str(record[field]).strip() for field in PASSENGER_FIELDS)
+    try:
+        flight_id = int(str(record["flight_id"]).strip())
+    except ValueError:
+        raise ValueError("flight_id is not a whole number")
+    seat_number = str(record.get("seat_number") or "").strip().upper() or None
+    return passenger, flight_id, seat_number
+
+
+def _resolve_passengers(cursor, passengers, known):
+    # Maps every normalized email in passengers to a passenger_id, inserting the ones not registered
+    # yet. Like passengers.upsert_passenger, a returning passenger keeps their passenger_id; the
+    # import does not overwrite their details. known caches email -> passenger_id across batches.
+    emails = [email for email in passengers if email not in known]
+    if not emails:
+        return
+    cursor.execute(f"SELECT email_normalized, passenger_id FROM Passengers WHERE email_normalized IN "
+                   f"({_placeholders(len(emails))});", tuple(emails))
+    known.update(cursor.fetchall())
+    new = [passengers[email] + (email,) for email in emails if email not in known]
+    if not new:
+        return
+    cursor.executemany("INSERT INTO Passengers (first_name, last_name, email, phone_number, email_normalized) "
+                       "VALUES (%s, %s, %s, %s, %s);", new)
+    new_emails = [details[4] for details in new]
+    cursor.execute(f"SELECT email_normalized, passenger_id FROM Passengers WHERE email_normalized IN "
+                   f"({_placeholders(len(new_emails))});", tuple(new_emails))
+    known.update(cursor.fetchall())
+
+
+def _book_batch(connection, batch, rejects, known):
+    # Books one batch in one transaction: the flights involved are locked together, their seat maps
+    # are loaded with one query, and capacity and seats are checked in memory before a single
+    # executemany inserts the reservations. Returns the number of reservations made.
+    cursor = connection.cursor()
+    flight_ids = sorted({flight_id for _, _, flight_id, _, _ in batch})
+    try:
+        begin_transaction(connection)
+        cursor.execute(f"SELECT flight_id, seats_booked, max_capacity FROM Flights WHERE flight_id IN "
+                       f"({_placeholders(len(flight_ids))}) ORDER BY flight_id FOR UPDATE;", tuple(flight_ids))
+        flights = {flight_id: [seats_booked, max_capacity] for flight_id, seats_booked, max_capacity in cursor.fetchall()}
+        seat_maps = {flight_id: SeatMap(max_capacity) for flight_id, (_, max_capacity) in flights.items()}
+        if flights:
+            cursor.execute(f"SELECT flight_id, seat_number FROM Reservations WHERE flight_id IN "
+                           f"({_placeholders(len(flights))});", tuple(flights))
+            for flight_id, seat_number in cursor.fetchall():
+                seat_maps[flight_id].take(seat_number)
+            # Seats held in an interactive booking dialogue are off limits to the import as well.
+            cursor.execute(f"SELECT flight_id, seat_number FROM SeatHolds WHERE expires_at > %s AND flight_id IN "
+                           f"({_placeholders(len(flights))});", (hold_clock(),) + tuple(flights))
+            for flight_id, seat_number in cursor.fetchall():
+                seat_maps[flight_id].take(seat_number)
+                flights[flight_id][0] += 1
+
+        accepted = []
+        for line_number, passenger, flight_id, seat_number, record in batch:
+            if flight_id not in flights:
+                rejects.write(line_number, "flight not found", record)
+                continue
+            load = flights[flight_id]
+            seat_map = seat_maps[flight_id]
+            if load[0] >= load[1]:
+                rejects.write(line_number, "flight is fully booked", record)
+                continue
+            seat_number = seat_number or seat_map.next_free()
+            if seat_number is None:
+                rejects.write(line_number, "no free seat left on the seat map", record)
+                continue
+            if not seat_map.is_free(seat_number):
+                rejects.write(line_number, f"seat {seat_number} is already taken, held or not on the seat map", record)
+                continue
+            seat_map.take(seat_number)
+            load[0] += 1
+            accepted.append((line_number, passenger, flight_id, seat_number))
+
+        if accepted:
+            _resolve_passengers(cursor, {normalize_email(passenger[2]): passenger for _, passenger, _, _ in accepted}, known)
+            cursor.executemany("INSERT INTO Reservations (passenger_id, flight_id, seat_number, booking_status) "
+                               "VALUES (%s, %s, %s, 'confirmed');",
+                               [(known[normalize_email(passenger[2])], flight_id, seat_number) for _, passenger, flight_id, seat_number in accepted])
+            booked = {}
+            for _, _, flight_id, _ in accepted:
+                booked[flight_id] = booked.get(flight_id, 0) + 1
+            cursor.executemany("UPDATE Flights SET seats_booked = seats_booked + %s WHERE flight_id = %s;",
+                               [(count, flight_id) for flight_id, count in booked.items()])
+        connection.commit()
+        return len(accepted)
+    except Exception as e:
+        connection.rollback()
+        # Passengers inserted in the failed transaction were rolled back too.
+        known.clear()
+        for line_number, _, _, _, record in batch:
+            rejects.write(line_number, f"batch failed: {e}", record)
+        return 0
+
+
+def import_bookings(connection, records, rejects, batch_size=BATCH_SIZE, progress=None):
+    # Books (line_number, record, raw_line) items from read_records in batches of batch_size, one
+    # transaction per batch. Returns a summary dict.
+    start = time.perf_counter()
+    known = {}
+    booked = 0
+    batch = []
+    for line_number, record, raw in records:
+        if record is None:
+            rejects.write(line_number, "line is not a JSON object", raw)
+            continue
+        try:
+            passenger, flight_id, seat_number = validate_booking(record)
+        except ValueError as e:
+            rejects.write(line_number, str(e), record)
+            continue
+        batch.append((line_number, passenger, flight_id, seat_number, record))
+        if len(batch) >= batch_size:
+            booked += _book_batch(connection, batch, rejects, known)
+            batch = []
+            if progress:
+                progress(booked, time.perf_counter() - start)
+    if batch:
+        booked += _book_batch(connection, batch, rejects, known)
+    seconds = time.perf_counter() - start
+    return {"booked": booked, "rejected": rejects.count, "seconds": round(seconds, 3),
+            "rows_per_second": round(booked / seconds, 1) if seconds else 0.0}
+
+
+def export_manifest(connection, flight_id, out, batch_size=FETCH_BATCH_SIZE):
+    # Writes the passenger manifest of a flight to out as CSV, in seat order. Rows are streamed from an
+    # unbuffered cursor batch_size at a time, so memory use does not grow with the flight.
+    # Returns the number of passengers written.
+    writer = csv.writer(out)
+    writer.writerow(MANIFEST_COLUMNS)
+    cursor = connection.cursor()
+    cursor.execute("""
+    SELECT r.reservation_id, r.seat_number, p.first_name, p.last_name, p.email, p.phone_number, r.booking_status
+    FROM Reservations r
+    JOIN Passengers p ON r.passenger_id = p.passenger_id
+    WHERE r.flight_id = %s
+    ORDER BY r.seat_number, r.reservation_id;
+    """, (flight_id,))
+    written = 0
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            writer.writerows(rows)
+            written += len(rows)
+    finally:
+        cursor.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import group bookings or export a flight's passenger manifest.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    importer = commands.add_parser("import", help="book every passenger in a CSV or JSONL file")
+    importer.add_argument("path", help="rows with first_name, last_name, email, phone_number, flight_id and optional seat_number")
+    importer.add_argument("--format", choices=("csv", "jsonl"), help="defaults to the file extension")
+    importer.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="bookings per transaction")
+    importer.add_argument("--rejects", help="side file for rejected rows (default: <path>.rejected.jsonl)")
+    manifest = commands.add_parser("manifest", help="write the passenger manifest of a flight as CSV")
+    manifest.add_argument("flight_id", type=int)
+    manifest.add_argument("--output", help="file to write (default: standard output)")
+    args = parser.parse_args()
+
+    if args.command == "import":
+        rejects = RejectWriter(args.rejects or os.path.splitext(args.path)[0] + ".rejected.jsonl")
+        progress = lambda booked, seconds: print(f"{booked} reservations made ({booked / seconds:.0f} rows/s)")
+        try:
+            with db.connection() as connection:
+                summary = import_bookings(connection, read_records(args.path, args.format), rejects,
+                                          args.batch_size, progress)
+        finally:
+            rejects.close()
+        print(f"Made {summary['booked']} reservation(s) in {summary['seconds']}s ({summary['rows_per_second']} rows/s).")
+        if summary["rejected"]:
+            print(f"Rejected {summary['rejected']} row(s); see {rejects.path}")
+    else:
+        out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+        try:
+            with db.connection() as connection:
+                written = export_manifest(connection, args.flight_id, out)
+        finally:
+            if args.output:
+                out.close()
+        if args.output:
+            print(f"Wrote {written} passenger(s) of Flight ID {args.flight_id} to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
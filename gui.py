@@ -0,0 +1,128 @@
+import queue
+import threading
+import tkinter as tk
+from flight_view import FlightListView
+from flight_search import fetch_flight_page
+import metrics
+
+# How often the Tk thread checks its queues, in milliseconds.
+POLL_INTERVAL_MS = 50
+
+# How long start() waits for the Tk root to come up, in seconds.
+START_TIMEOUT = 10
+
+
+class FlightWindows:
+    # Owns the one Tk root of the program. The root lives on its own GUI thread and stays
+    # hidden; every flight view is a Toplevel of it. Database reads run on a separate loader
+    # thread that checks a connection out per page and hands the rows back through a queue,
+    # so the Tk thread never waits on MySQL.
+
+    def __init__(self, checkout):
+        # checkout() must return a context manager yielding a database connection, e.g. db.connection.
+        self.checkout = checkout
+        self._commands = queue.Queue()   # callables to run on the Tk thread
+        self._requests = queue.Queue()   # page requests for the loader thread
+        self._root = None
+        self._flight_view = None
+        self._flight_window = None
+        self._started = threading.Event()
+        self._error = None               # why the Tk root could not be created, if it could not
+        self._gui_thread = None
+        self._loader_thread = None
+
+    def start(self):
+        # Starts the GUI and loader threads. Raises RuntimeError if there is no display to open
+        # windows on, now and on every later call.
+        if self._gui_thread is None:
+            self._gui_thread = threading.Thread(target=self._run_gui, name="gui", daemon=True)
+            self._gui_thread.start()
+            if not self._started.wait(START_TIMEOUT):
+                self._error = RuntimeError(f"The GUI did not start within {START_TIMEOUT} seconds")
+            if self._error is None:
+                self._loader_thread = threading.Thread(target=self._run_loader, name="gui-loader", daemon=True)
+                self._loader_thread.start()
+        if self._error is not None:
+            raise self._error
+
+    def show_flights(self):
+        # Opens the flight list, or refreshes and raises it if it is already open. Raises
+        # RuntimeError if the GUI cannot be started.
+        self.start()
+        self._commands.put(self._show_flights)
+
+    def stop(self):
+        if self._gui_thread is None or self._error is not None:
+            return
+        self._commands.put(lambda: self._root.quit())
+        self._requests.put(None)
+        self._gui_thread.join(timeout=2)
+
+    # -- Tk thread --
+
+    def _run_gui(self):
+        # _started is set whether or not Tk comes up, so start() never waits on a dead thread.
+        try:
+            self._root = tk.Tk()
+            self._root.withdraw()
+            self._root.after(POLL_INTERVAL_MS, self._poll)
+        except Exception as e:
+            self._error = RuntimeError(f"The flight window could not be opened: {e}")
+            return
+        finally:
+            self._started.set()
+        self._root.mainloop()
+        self._root.destroy()
+
+    def _poll(self):
+        while True:
+            try:
+                command = self._commands.get_nowait()
+            except queue.Empty:
+                break
+            command()
+        self._root.after(POLL_INTERVAL_MS, self._poll)
+
+    def _show_flights(self):
+        if self._flight_window is not None and self._flight_window.winfo_exists():
+            self._flight_view.reload()
+            self._flight_window.deiconify()
+            self._flight_window.lift()
+            return
+        window = tk.Toplevel(self._root)
+        window.title("Available Flights")
+        window.geometry("1140x500")
+        window.protocol("WM_DELETE_WINDOW", self._close_flights)
+        self._flight_window = window
+        self._flight_view = FlightListView(window, page_loader=self._queue_page)
+        self._flight_view.reload()
+
+    def _close_flights(self):
+        self._flight_window.destroy()
+        self._flight_window = None
+        self._flight_view = None
+
+    def _deliver(self, view, rows, at_end, generation):
+        # Pages for a window that has since been closed are dropped.
+        if view is self._flight_view:
+            view.load_rows(rows, at_end=at_end, generation=generation)
+
+    def _queue_page(self, view, after, before, generation):
+        self._requests.put((view, after, before, generation))
+
+    # -- loader thread --
+
+    def _run_loader(self):
+        while True:
+            request = self._requests.get()
+            if request is None:
+                break
+            view, after, before, generation = request
+            try:
+                with metrics.operation("flight_list_page"), self.checkout() as connection:
+                    rows = fetch_flight_page(connection, after=after, before=before, limit=view.page_size)
+            except Exception as e:
+                print(f"Failed to load flights: {e}")
+                rows = []
+            self._commands.put(lambda view=view, rows=rows, at_end=before is None, generation=generation:
+                               self._deliver(view, rows, at_end, generation))
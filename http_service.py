@@ -0,0 +1,269 @@
+import argparse
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qsl
+import metrics
+from booking import NO_SUCH_FLIGHT, NO_SUCH_RESERVATION, RESERVATION_CANCELLED, SEAT_TAKEN, SEAT_HELD, FLIGHT_FULL
+from commands import run_command
+from storage import open_storage
+
+# HTTP/JSON front end for the reservation logic, on asyncio streams from the standard library.
+# The database drivers are blocking, so every request body runs the same command functions as
+# commands.py on a thread pool no larger than the connection pool; the event loop only parses
+# requests and writes responses, and can hold hundreds of idle or waiting clients.
+#
+# Backpressure: at most `workers` requests touch the database at once, at most `queue_limit` more
+# wait for a turn, and anything beyond that is answered 503 straight away instead of queueing
+# without bound. Each client connection is served one request at a time, so a client that sends
+# faster than it is answered simply stops being read.
+
+WORKERS = 8
+QUEUE_LIMIT = 256
+MAX_BODY = 64 * 1024
+IDLE_TIMEOUT = 30.0  # seconds a keep-alive connection may sit idle
+
+ROUTES = [
+    # (method, path pattern, command, where the arguments come from)
+    ("GET", ("flights", "search"), "search", "query"),
+    ("GET", ("flights", "{flight_id}", "seats"), "seats", "query"),
+    ("POST", ("reservations",), "book", "body"),
+    ("PUT", ("reservations", "{reservation_id}"), "edit", "body"),
+    ("DELETE", ("reservations", "{reservation_id}"), "delete", "query"),
+]
+
+_STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                409: "Conflict", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+_RESULT_STATUS = {NO_SUCH_FLIGHT: 404, NO_SUCH_RESERVATION: 404, RESERVATION_CANCELLED: 409, SEAT_TAKEN: 409,
+                  SEAT_HELD: 409, FLIGHT_FULL: 409}
+
+
+def match_route(method, path):
+    # Returns (command, source, path_arguments), or (None, status, None) if nothing matches.
+    parts = tuple(part for part in path.split("/") if part)
+    allowed = False
+    for route_method, pattern, command, source in ROUTES:
+        if len(pattern) != len(parts):
+            continue
+        arguments = {}
+        for expected, actual in zip(pattern, parts):
+            if expected.startswith("{"):
+                arguments[expected[1:-1]] = actual
+            elif expected != actual:
+                break
+        else:
+            if route_method == method:
+                return command, source, arguments
+            allowed = True
+    return None, 405 if allowed else 404, None
+
+
+def response_status(command, result):
+    if result.get("ok"):
+        return 201 if command == "book" else 200
+    return _RESULT_STATUS.get(result.get("result"), 400)
+
+
+class BookingService:
+    # Routes HTTP requests to the command functions and applies the concurrency limits above.
+
+    def __init__(self, storage, workers=WORKERS, queue_limit=QUEUE_LIMIT):
+        self.storage = storage
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="booking")
+        self._slots = None
+        self._waiting = 0
+        self.stats = {"requests": 0, "rejected": 0, "errors": 0}
+
+    def _execute(self, command, arguments):
+        with metrics.operation(f"http_{command}"), self.storage.connection() as connection:
+            return run_command(connection, command, arguments)
+
+    async def dispatch(self, method, target, body):
+        # Returns (status, payload) for one request.
+        url = urlsplit(target)
+        if method == "GET" and url.path == "/health":
+            return 200, {"ok": True, "waiting": self._waiting, "stats": self.stats}
+        command, source, arguments = match_route(method, url.path)
+        if command is None:
+            return source, {"ok": False, "error": "not found" if source == 404 else "method not allowed"}
+        if source == "body":
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                return 400, {"ok": False, "error": "body is not valid JSON"}
+            if not isinstance(payload, dict):
+                return 400, {"ok": False, "error": "body must be a JSON object"}
+            arguments.update(payload)
+        else:
+            arguments.update(parse_qsl(url.query))
+
+        if self._waiting >= self.queue_limit:
+            self.stats["rejected"] += 1
+            return 503, {"ok": False, "error": "server busy, retry later"}
+        self._waiting += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._executor, self._execute, command, arguments)
+        except Exception as e:
+            self.stats["errors"] += 1
+            return 500, {"ok": False, "error": str(e)}
+        finally:
+            self._slots.release()
+        return response_status(command, result), result
+
+    async def handle_client(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), IDLE_TIMEOUT)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                request_line, *header_lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = request_line.split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"ok": False, "error": "bad request line"}, False)
+                    break
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                length = headers.get("content-length") or "0"
+                if not (length.isascii() and length.isdigit()):
+                    await self._respond(writer, 400, {"ok": False, "error": "bad content-length"}, False)
+                    break
+                length = int(length)
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"ok": False, "error": "body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                self.stats["requests"] += 1
+                status, payload = await self.dispatch(method.upper(), target, body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload, keep_alive):
+        body = json.dumps(payload, default=str).encode()
+        head = (f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n")
+        if status == 503:
+            head += "Retry-After: 1\r\n"
+        writer.write(head.encode() + b"\r\n" + body)
+        await writer.drain()
+
+    async def serve(self, host, port, ready=None):
+        self._slots = asyncio.Semaphore(self.workers)
+        server = await asyncio.start_server(self.handle_client, host, port, backlog=1024)
+        if ready:
+            ready(server)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+
+# -- load generator --
+
+async def _client(host, port, deadline, requests, latencies, statuses):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        index = 0
+        while time.perf_counter() < deadline:
+            method, path, payload = requests[index % len(requests)]
+            index += 1
+            body = json.dumps(payload).encode() if payload is not None else b""
+            writer.write(f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+            started = time.perf_counter()
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            status = int(head.split(b" ", 2)[1])
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def generate_load(host, port, clients, seconds, requests):
+    # Runs `clients` keep-alive clients for `seconds`, each cycling through `requests`
+    # ([(method, path, json_body_or_None)]), and returns the achieved rate and latencies.
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*(_client(host, port, deadline, requests[i:] + requests[:i], latencies, statuses)
+                           for i in range(clients)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    pick = lambda fraction: latencies[min(len(latencies) - 1, int(fraction * (len(latencies) - 1)))] * 1000 if latencies else 0.0
+    served = sum(count for status, count in statuses.items() if status != 503)
+    return {"clients": clients, "requests": len(latencies), "requests_per_second": round(len(latencies) / elapsed, 1),
+            "served_per_second": round(served / elapsed, 1),
+            "p50_ms": round(pick(0.50), 2), "p99_ms": round(pick(0.99), 2), "statuses": statuses}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the reservation operations over HTTP/JSON, or load-test a server.")
+    parser.add_argument("--storage", default="mysql", help="'mysql' or 'sqlite:///file.db'")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="requests running against the database at once")
+    parser.add_argument("--queue-limit", type=int, default=QUEUE_LIMIT, help="requests allowed to wait before 503s")
+    parser.add_argument("--load", action="store_true", help="run the load generator against --host/--port instead")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--flight-id", type=int, default=1, help="flight the load generator searches seats on and books")
+    parser.add_argument("--origin", default="JFK")
+    parser.add_argument("--destination", default="LAX")
+    parser.add_argument("--day", default="2025-01-01")
+    args = parser.parse_args()
+
+    if args.load:
+        requests = [
+            ("GET", f"/flights/search?origin={args.origin}&destination={args.destination}&first_day={args.day}", None),
+            ("GET", f"/flights/{args.flight_id}/seats", None),
+            ("GET", f"/flights/search?origin={args.origin}&destination={args.destination}&first_day={args.day}", None),
+            ("POST", "/reservations", {"flight_id": args.flight_id, "first_name": "Load", "last_name": "Test",
+                                       "email": "load@test.invalid"}),
+        ]
+        summary = asyncio.run(generate_load(args.host, args.port, args.clients, args.seconds, requests))
+        for key, value in summary.items():
+            print(f"{key}: {value}")
+        return
+
+    if args.storage == "mysql":
+        import db
+        db.init_pool(pool_size=args.workers)
+    storage = open_storage(args.storage)
+    service = BookingService(storage, args.workers, args.queue_limit)
+    try:
+        asyncio.run(service.serve(args.host, args.port,
+                                  ready=lambda server: print(f"Listening on http://{args.host}:{args.port}")))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import argparse
+import csv
+import json
+import os
+import time
+import db
+from booking import begin_transaction
+from validators import validate_schedule
+
+FLIGHT_FIELDS = ("airline_name", "flight_number", "departure_airport", "arrival_airport",
+                 "departure_datetime", "arrival_datetime", "max_capacity")
+
+BATCH_SIZE = 1000
+
+INSERT_FLIGHT = """
+INSERT INTO Flights (
+    airline_name, flight_number, departure_airport, arrival_airport,
+    departure_datetime, arrival_datetime, max_capacity
+) VALUES (%s, %s, %s, %s, %s, %s, %s);
+"""
+
+def validate_flights(records):
+    # Returns a (row, None) with the values to insert, or (None, reason), for each record. The
+    # datetime columns of all the records are checked together with validators.validate_schedule.
+    results = [None] * len(records)
+    candidates = []
+    for index, record in enumerate(records):
+        missing = [field for field in FLIGHT_FIELDS if str(record.get(field) or "").strip() == ""]
+        if missing:
+            results[index] = (None, f"missing {', '.join(missing)}")
+            continue
+        values = {field: str(record[field]).strip() for field in FLIGHT_FIELDS}
+        try:
+            max_capacity = int(values["max_capacity"])
+        except ValueError:
+            results[index] = (None, "max_capacity is not a whole number")
+            continue
+        if max_capacity <= 0:
+            results[index] = (None, "max_capacity must be a positive integer")
+            continue
+        candidates.append((index, tuple(values[field] for field in FLIGHT_FIELDS[:-1]) + (max_capacity,)))
+    errors = validate_schedule([row[4] for _, row in candidates], [row[5] for _, row in candidates])
+    for (index, row), error in zip(candidates, errors):
+        results[index] = (None, error) if error else (row, None)
+    return results
+
+
+def validate_flight(record):
+    return validate_flights([record])[0]
+
+
+def read_records(path, file_format=None):
+    # Yields (line_number, record, None) from a CSV file with a header row or from a JSONL file, one
+    # record at a time. A JSONL line that is not a JSON object is yielded as (line_number, None, text).
+    file_format = file_format or ("jsonl" if path.endswith((".jsonl", ".json")) else "csv")
+    with open(path, newline="", encoding="utf-8") as source:
+        if file_format == "csv":
+            reader = csv.DictReader(source)
+            for record in reader:
+                yield reader.line_num, record, None
+        else:
+            for line_number, line in enumerate(source, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    yield line_number, None, line.rstrip("\n")
+                    continue
+                if isinstance(record, dict):
+                    yield line_number, record, None
+                else:
+                    yield line_number, None, line.rstrip("\n")
+
+
+class RejectWriter:
+    # Appends rejected records to a JSONL side file as {"line", "error", "record"}; opened on first use.
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = None
+
+    def write(self, line_number, error, record):
+        if self._file is None:
+            self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write(json.dumps({"line": line_number, "error": error, "record": record}, default=str) + "\n")
+        self.count += 1
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+
+def _insert_batch(connection, batch, rejects):
+    # Inserts one batch in one transaction. If the database refuses the batch, each row is retried
+    # in its own transaction so only the offending rows are rejected. Returns the rows inserted.
+    cursor = connection.cursor()
+    try:
+        begin_transaction(connection)
+        cursor.executemany(INSERT_FLIGHT, [row for _, row, _ in batch])
+        connection.commit()
+        return len(batch)
+    except Exception:
+        connection.rollback()
+    inserted = 0
+    for line_number, row, record in batch:
+        try:
+            begin_transaction(connection)
+            cursor.execute(INSERT_FLIGHT, row)
+            connection.commit()
+            inserted += 1
+        except Exception as e:
+            connection.rollback()
+            rejects.write(line_number, str(e), record)
+    return inserted
+
+
+def _import_batch(connection, pending, rejects):
+    # Validates pending (line_number, record) items as one batch and inserts the valid rows.
+    batch = []
+    for (line_number, record), (row, error) in zip(pending, validate_flights([record for _, record in pending])):
+        if error:
+            rejects.write(line_number, error, record)
+        else:
+            batch.append((line_number, row, record))
+    return _insert_batch(connection, batch, rejects) if batch else 0
+
+
+def import_flights(connection, records, rejects, batch_size=BATCH_SIZE, progress=None):
+    # Validates and inserts (line_number, record, raw_line) items batch_size at a time, each batch
+    # validated together and inserted with executemany in one transaction. Rejected rows go to
+    # rejects. Returns a summary dict.
+    start = time.perf_counter()
+    imported = 0
+    pending = []
+    for line_number, record, raw in records:
+        if record is None:
+            rejects.write(line_number, "line is not a JSON object", raw)
+            continue
+        pending.append((line_number, record))
+        if len(pending) >= batch_size:
+            imported += _import_batch(connection, pending, rejects)
+            pending = []
+            if progress:
+                progress(imported, time.perf_counter() - start)
+    if pending:
+        imported += _import_batch(connection, pending, rejects)
+    seconds = time.perf_counter() - start
+    return {"imported": imported, "rejected": rejects.count, "seconds": round(seconds, 3),
+            "rows_per_second": round(imported / seconds, 1) if seconds else 0.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="import-flights", description="Bulk-load a flight schedule from CSV or JSONL.")
+    parser.add_argument("path", help="CSV file with a header row, or JSONL file with one flight per line")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="defaults to the file extension")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="rows per INSERT batch and transaction")
+    parser.add_argument("--rejects", help="side file for rejected rows (default: <path>.rejected.jsonl)")
+    args = parser.parse_args()
+
+    rejects = RejectWriter(args.rejects or os.path.splitext(args.path)[0] + ".rejected.jsonl")
+    progress = lambda imported, seconds: print(f"{imported} flights imported ({imported / seconds:.0f} rows/s)")
+    try:
+        with db.connection() as connection:
+            summary = import_flights(connection, read_records(args.path, args.format), rejects,
+                                     args.batch_size, progress)
+    finally:
+        rejects.close()
+    print(f"Imported {summary['imported']} flight(s) in {summary['seconds']}s ({summary['rows_per_second']} rows/s).")
+    if summary["rejected"]:
+        print(f"Rejected {summary['rejected']} row(s); see {rejects.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import argparse
+import db
+from booking import begin_transaction
+
+
+def find_seat_count_drift(connection):
+    # Returns (flight_id, seats_booked, actual_count) for every flight whose counter
+    # no longer matches its number of reservations that are not cancelled.
+    cursor = connection.cursor()
+    cursor.execute("""
+    SELECT f.flight_id, f.seats_booked, COUNT(r.reservation_id) AS actual
+    FROM Flights f
+    LEFT JOIN Reservations r ON r.flight_id = f.flight_id AND r.booking_status <> 'cancelled'
+    GROUP BY f.flight_id, f.seats_booked
+    HAVING f.seats_booked <> COUNT(r.reservation_id)
+    ORDER BY f.flight_id;
+    """)
+    drift = cursor.fetchall()
+    connection.commit()
+    return drift
+
+
+def repair_seat_count_drift(connection, drift=None):
+    # Recounts each drifted flight under its row lock, so a booking running at the same
+    # time cannot slip in between the count and the update. Returns the number repaired.
+    if drift is None:
+        drift = find_seat_count_drift(connection)
+    cursor = connection.cursor()
+    repaired = 0
+    for flight_id, _, _ in drift:
+        begin_transaction(connection)
+        cursor.execute("SELECT seats_booked FROM Flights WHERE flight_id = %s FOR UPDATE;", (flight_id,))
+        cursor.fetchone()
+        cursor.execute("SELECT COUNT(*) FROM Reservations WHERE flight_id = %s AND booking_status <> 'cancelled';", (flight_id,))
+        actual = cursor.fetchone()[0]
+        cursor.execute("UPDATE Flights SET seats_booked = %s WHERE flight_id = %s;", (actual, flight_id))
+        connection.commit()
+        repaired += 1
+    return repaired
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the per-flight seats_booked counters against Reservations.")
+    parser.add_argument("--repair", action="store_true", help="fix every counter that has drifted")
+    args = parser.parse_args()
+
+    with db.connection() as connection:
+        drift = find_seat_count_drift(connection)
+        if not drift:
+            print("All seat counters are consistent.")
+        for flight_id, seats_booked, actual in drift:
+            print(f"Flight ID: {flight_id}, seats_booked: {seats_booked}, reservations: {actual}")
+        if drift and args.repair:
+            print(f"Repaired {repair_seat_count_drift(connection, drift)} flight(s).")
+
+
+if __name__ == "__main__":
+    main()
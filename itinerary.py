@@ -0,0 +1,257 @@
+import argparse
+import bisect
+import datetime
+import random
+import threading
+import time
+from collections import namedtuple
+
+# Shortest time between landing and the next departure at a connecting airport.
+MIN_CONNECTION = datetime.timedelta(minutes=45)
+MAX_LEGS = 3
+
+Leg = namedtuple("Leg", ["flight_id", "origin", "destination", "departure", "arrival"])
+
+
+def _as_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.strptime(str(value).strip(), "%Y-%m-%d %H:%M:%S")
+
+
+class ItineraryGraph:
+    # Time-expanded flight graph: for every airport, its departing legs sorted by departure time.
+    # A connection from leg A to leg B exists when B leaves A's arrival airport at least
+    # min_connection after A lands, so the edges are never stored; they are the suffix of the
+    # airport's departure list found by bisecting on A's arrival time. Adding or removing a flight
+    # is one insert into / delete from one sorted list, so the graph never has to be rebuilt.
+    # Seat counts are kept per leg so that full flights (the ones can_book_flight rejects) are skipped.
+
+    def __init__(self, checkout=None, min_connection=MIN_CONNECTION, max_legs=MAX_LEGS):
+        # checkout() must return a context manager yielding a database connection, e.g. db.connection.
+        # The schedule is loaded from Flights on first use; without checkout the graph starts empty.
+        self.checkout = checkout
+        self.min_connection = min_connection
+        self.max_legs = max_legs
+        self._lock = threading.RLock()
+        self._loaded = checkout is None
+        self._legs = {}            # flight_id -> Leg
+        self._load = {}            # flight_id -> [seats_booked, max_capacity]
+        self._departures = {}      # airport -> sorted [(departure, flight_id)]
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self.checkout() as connection:
+            cursor = connection.cursor()
+            cursor.execute("""
+            SELECT flight_id, departure_airport, arrival_airport, departure_datetime, arrival_datetime,
+                   seats_booked, max_capacity
+            FROM Flights;
+            """)
+            rows = cursor.fetchall()
+        self.load_legs(rows)
+        self._loaded = True
+
+    def load_legs(self, rows):
+        # Bulk-loads (flight_id, origin, destination, departure, arrival, seats_booked, max_capacity)
+        # rows, sorting each airport's departures once instead of inserting one at a time.
+        with self._lock:
+            for flight_id, origin, destination, departure, arrival, seats_booked, max_capacity in rows:
+                leg = Leg(int(flight_id), origin, destination, _as_datetime(departure), _as_datetime(arrival))
+                if leg.arrival <= leg.departure or leg.origin == leg.destination:
+                    continue
+                self._legs[leg.flight_id] = leg
+                self._load[leg.flight_id] = [seats_booked, max_capacity]
+                self._departures.setdefault(leg.origin, []).append((leg.departure, leg.flight_id))
+            for departures in self._departures.values():
+                departures.sort()
+
+    def add_leg(self, flight_id, origin, destination, departure, arrival, max_capacity, seats_booked=0):
+        with self._lock:
+            if not self._loaded:
+                return  # picked up by the first load
+            self.remove_leg(flight_id)
+            leg = Leg(int(flight_id), origin, destination, _as_datetime(departure), _as_datetime(arrival))
+            if leg.arrival <= leg.departure or leg.origin == leg.destination:
+                return
+            self._legs[leg.flight_id] = leg
+            self._load[leg.flight_id] = [seats_booked, max_capacity]
+            bisect.insort(self._departures.setdefault(leg.origin, []), (leg.departure, leg.flight_id))
+
+    def remove_leg(self, flight_id):
+        with self._lock:
+            leg = self._legs.pop(int(flight_id), None)
+            if leg is None:
+                return
+            del self._load[leg.flight_id]
+            departures = self._departures[leg.origin]
+            index = bisect.bisect_left(departures, (leg.departure, leg.flight_id))
+            if index < len(departures) and departures[index] == (leg.departure, leg.flight_id):
+                del departures[index]
+
+    def record_booking(self, flight_id, count=1):
+        with self._lock:
+            load = self._load.get(int(flight_id))
+            if load is not None:
+                load[0] += count
+
+    def record_cancellation(self, flight_id, count=1):
+        self.record_booking(flight_id, -count)
+
+    def leg_count(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._legs)
+
+    def _bookable(self, flight_id):
+        seats_booked, max_capacity = self._load[flight_id]
+        return seats_booked < max_capacity
+
+    def _rounds(self, origin, destination, depart_after, max_legs):
+        # Round k holds the earliest arrival at each airport using at most k legs, together with the
+        # leg that achieved it. Only airports improved in round k - 1 are expanded in round k, and no
+        # departure later than the best arrival already found at the destination is scanned.
+        arrivals = {origin: depart_after}
+        parents = [{}]
+        improved = {origin}
+        best = None
+        for round_number in range(1, max_legs + 1):
+            reached = {}
+            for airport in improved:
+                earliest = arrivals[airport]
+                if airport != origin:
+                    earliest += self.min_connection
+                departures = self._departures.get(airport, ())
+                index = bisect.bisect_left(departures, (earliest, -1))
+                for position in range(index, len(departures)):
+                    departure, flight_id = departures[position]
+                    if best is not None and departure >= best:
+                        break
+                    if not self._bookable(flight_id):
+                        continue
+                    leg = self._legs[flight_id]
+                    if leg.destination == origin:
+                        continue
+                    current = reached.get(leg.destination)
+                    known = arrivals.get(leg.destination)
+                    if (current is None or leg.arrival < current[0]) and (known is None or leg.arrival < known):
+                        reached[leg.destination] = (leg.arrival, leg)
+            if not reached:
+                break
+            parents.append({airport: leg for airport, (_, leg) in reached.items()})
+            for airport, (arrival, _) in reached.items():
+                arrivals[airport] = arrival
+            if destination in reached:
+                best = reached[destination][0]
+            improved = set(reached) - {destination}
+        return parents, best
+
+    def _trace(self, parents, round_number, destination):
+        # Walks back from the destination's leg in round_number. Each leg left its origin airport at
+        # the arrival time that airport had before that round, i.e. the one set in the latest earlier
+        # round that improved it.
+        legs = []
+        airport = destination
+        while round_number > 0:
+            leg = parents[round_number][airport]
+            legs.append(leg)
+            airport = leg.origin
+            round_number -= 1
+            while round_number > 0 and airport not in parents[round_number]:
+                round_number -= 1
+        legs.reverse()
+        return legs
+
+    def _search(self, origin, destination, depart_after, max_legs, fewest):
+        with self._lock:
+            self._ensure_loaded()
+            parents, best = self._rounds(origin, destination, _as_datetime(depart_after), max_legs or self.max_legs)
+            if best is None:
+                return None
+            rounds = [k for k, reached in enumerate(parents) if destination in reached]
+            return self._trace(parents, rounds[0] if fewest else rounds[-1], destination)
+
+    def earliest_arrival(self, origin, destination, depart_after, max_legs=None):
+        # Returns the legs of the itinerary from origin to destination that lands first, leaving no
+        # earlier than depart_after and using at most max_legs flights, or None if there is none.
+        return self._search(origin, destination, depart_after, max_legs, fewest=False)
+
+    def fewest_legs(self, origin, destination, depart_after, max_legs=None):
+        # Returns the itinerary with the fewest flights (the earliest-landing one among those), or None.
+        return self._search(origin, destination, depart_after, max_legs, fewest=True)
+
+
+def synthetic_schedule(legs, airports, days, start=datetime.datetime(2025, 1, 1), seed=42):
+    # Generates (flight_id, origin, destination, departure, arrival, seats_booked, max_capacity) rows
+    # between airports "A000".."Annn". Traffic is skewed towards a few hubs, as in a real network.
+    generator = random.Random(seed)
+    codes = [f"A{i:03d}" for i in range(airports)]
+    weights = [1.0 / (rank + 1) for rank in range(airports)]
+    rows = []
+    for flight_id in range(1, legs + 1):
+        origin, destination = generator.choices(codes, weights, k=2)
+        while destination == origin:
+            destination = generator.choice(codes)
+        departure = start + datetime.timedelta(minutes=generator.randrange(days * 24 * 60))
+        arrival = departure + datetime.timedelta(minutes=generator.randint(45, 480))
+        capacity = 180
+        booked = capacity if generator.random() < 0.05 else generator.randrange(capacity)
+        rows.append((flight_id, origin, destination, departure, arrival, booked, capacity))
+    return rows, codes
+
+
+def _percentiles(latencies):
+    latencies = sorted(latencies)
+    pick = lambda fraction: latencies[min(len(latencies) - 1, int(round(fraction * (len(latencies) - 1))))]
+    return f"p50 {pick(0.50) * 1000:.3f} ms, p99 {pick(0.99) * 1000:.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the itinerary planner on a synthetic schedule.")
+    parser.add_argument("--legs", type=int, default=100_000)
+    parser.add_argument("--airports", type=int, default=300)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--updates", type=int, default=10_000)
+    parser.add_argument("--max-legs", type=int, default=MAX_LEGS)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rows, codes = synthetic_schedule(args.legs, args.airports, args.days, seed=args.seed)
+    graph = ItineraryGraph(max_legs=args.max_legs)
+    started = time.perf_counter()
+    graph.load_legs(rows)
+    print(f"Loaded {graph.leg_count()} legs between {args.airports} airports in {time.perf_counter() - started:.2f}s")
+
+    generator = random.Random(args.seed + 1)
+    start = datetime.datetime(2025, 1, 1)
+    queries = []
+    for _ in range(args.queries):
+        origin, destination = generator.sample(codes, 2)
+        queries.append((origin, destination, start + datetime.timedelta(hours=generator.randrange(args.days * 24))))
+
+    for name, search in (("Earliest arrival", graph.earliest_arrival), ("Fewest legs", graph.fewest_legs)):
+        latencies = []
+        found = 0
+        for origin, destination, depart_after in queries:
+            query_start = time.perf_counter()
+            found += search(origin, destination, depart_after) is not None
+            latencies.append(time.perf_counter() - query_start)
+        print(f"{name}: {_percentiles(latencies)} over {len(queries)} queries, {found} itineraries found")
+
+    # Incremental updates: add a batch of new legs, then remove them again.
+    new_rows, _ = synthetic_schedule(args.updates, args.airports, args.days, seed=args.seed + 2)
+    started = time.perf_counter()
+    for flight_id, origin, destination, departure, arrival, seats_booked, max_capacity in new_rows:
+        graph.add_leg(args.legs + flight_id, origin, destination, departure, arrival, max_capacity, seats_booked)
+    added = time.perf_counter() - started
+    started = time.perf_counter()
+    for flight_id, *_ in new_rows:
+        graph.remove_leg(args.legs + flight_id)
+    removed = time.perf_counter() - started
+    print(f"Incremental add: {added / len(new_rows) * 1e6:.1f} us/leg, remove: {removed / len(new_rows) * 1e6:.1f} us/leg")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+import argparse
+import datetime
+import json
+import os
+import random
+import threading
+import time
+from booking import BOOKED, UPDATED, DELETED
+from passengers import normalize_email
+from popularity import PopularityCache
+from seat_map import format_seat, SEAT_LETTERS
+from storage import open_storage
+
+# Relative weights of the operations replayed by the load test, roughly what the menu sees:
+# mostly lookups, a steady stream of bookings, and occasional changes and cancellations.
+DEFAULT_MIX = {"search": 40, "capacity": 20, "popularity": 15, "book": 15, "edit": 5, "delete": 5}
+
+AIRLINES = ["Delta", "United", "American", "Southwest", "JetBlue", "Alaska"]
+START_DAY = datetime.datetime(2025, 1, 1)
+
+
+def seed(storage, flights, passengers, reservations, airports=30, days=60, capacity=180, rng=None):
+    # Fills the storage with a synthetic schedule: `flights` flights between `airports` airports over
+    # `days` days, `passengers` passengers and `reservations` reservations spread over the flights.
+    # Returns ({flight_id: airline_name}, passenger_ids, airports, {reservation_id: flight_id}).
+    rng = rng or random.Random(0)
+    codes = [f"A{i:02d}" for i in range(airports)]
+    with storage.connection() as connection:
+        cursor = connection.cursor()
+        rows = []
+        for number in range(flights):
+            origin, destination = rng.sample(codes, 2)
+            departure = START_DAY + datetime.timedelta(minutes=rng.randrange(days * 24 * 60))
+            arrival = departure + datetime.timedelta(minutes=rng.randint(45, 480))
+            rows.append((rng.choice(AIRLINES), f"LT{number}", origin, destination,
+                         departure.strftime("%Y-%m-%d %H:%M:%S"), arrival.strftime("%Y-%m-%d %H:%M:%S"), capacity))
+        cursor.executemany("""
+        INSERT INTO Flights (airline_name, flight_number, departure_airport, arrival_airport,
+                             departure_datetime, arrival_datetime, max_capacity)
+        VALUES (%s, %s, %s, %s, %s, %s, %s);
+        """, rows)
+        cursor.execute("SELECT flight_id, airline_name FROM Flights WHERE flight_number LIKE 'LT%' ORDER BY flight_id;")
+        flight_airlines = dict(cursor.fetchall()[-flights:])
+        flight_ids = list(flight_airlines)
+
+        cursor.executemany("INSERT INTO Passengers (first_name, last_name, email, email_normalized, phone_number) "
+                           "VALUES (%s, %s, %s, %s, %s);",
+                           [("Load", f"Test{i}", f"load{i}@test.invalid", normalize_email(f"load{i}@test.invalid"), "000")
+                            for i in range(passengers)])
+        cursor.execute("SELECT passenger_id FROM Passengers WHERE email LIKE 'load%@test.invalid' ORDER BY passenger_id;")
+        passenger_ids = [row[0] for row in cursor.fetchall()]
+
+        # Seats are handed out in order on each flight, so no flight goes over capacity.
+        booked = {}
+        rows = []
+        for _ in range(min(reservations, flights * capacity)):
+            flight_id = rng.choice(flight_ids)
+            while booked.get(flight_id, 0) >= capacity:
+                flight_id = rng.choice(flight_ids)
+            index = booked.get(flight_id, 0)
+            booked[flight_id] = index + 1
+            seat = format_seat(index // len(SEAT_LETTERS) + 1, index % len(SEAT_LETTERS))
+            rows.append((rng.choice(passenger_ids), flight_id, seat))
+        cursor.executemany("INSERT INTO Reservations (passenger_id, flight_id, seat_number, booking_status) "
+                           "VALUES (%s, %s, %s, 'confirmed');", rows)
+        cursor.executemany("UPDATE Flights SET seats_booked = %s WHERE flight_id = %s;",
+                           [(count, flight_id) for flight_id, count in booked.items()])
+        cursor.execute("SELECT reservation_id, flight_id FROM Reservations WHERE flight_id IN "
+                       "(SELECT flight_id FROM Flights WHERE flight_number LIKE 'LT%');")
+        reservation_flights = {reservation_id: flight_id for reservation_id, flight_id in cursor.fetchall()
+                               if flight_id in flight_airlines}
+        connection.commit()
+    return flight_airlines, passenger_ids, codes, reservation_flights
+
+
+def open_empty_storage(url):
+    # Opens the storage to seed, so every run starts from the same data. A SQLite file is the load
+    # test's own and is recreated; any other database must be empty, as it is never cleared here.
+    if url.startswith("sqlite:///"):
+        path = url[len("sqlite:///"):]
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    storage = open_storage(url)
+    with storage.connection() as connection:
+        cursor = connection.cursor()
+        counts = []
+        for table in ("Flights", "Passengers", "Reservations"):
+            cursor.execute(f"SELECT COUNT(*) FROM {table};")
+            counts.append(cursor.fetchone()[0])
+        connection.commit()
+    if any(counts):
+        storage.close()
+        raise SystemExit(f"{url} already holds {counts[0]} flights, {counts[1]} passengers and {counts[2]} "
+                         f"reservations; the load test needs an empty database so runs are comparable.")
+    return storage
+
+
+class Workload:
+    # The state shared by the workers: what exists to search, book and cancel, and the airline
+    # ranking cache the menu shows, kept current the way frontend.py keeps it.
+
+    def __init__(self, storage, flight_airlines, passenger_ids, airports, reservation_flights, days):
+        self.storage = storage
+        self.flight_airlines = flight_airlines
+        self.flight_ids = list(flight_airlines)
+        self.passenger_ids = passenger_ids
+        self.airports = airports
+        self.days = days
+        self.reservation_flights = dict(reservation_flights)
+        self.reservation_ids = list(reservation_flights)
+        self.lock = threading.Lock()
+        self.popularity = PopularityCache(storage.airline_popularity)
+
+    def _take_reservation(self, rng):
+        with self.lock:
+            if not self.reservation_ids:
+                return None
+            index = rng.randrange(len(self.reservation_ids))
+            self.reservation_ids[index], self.reservation_ids[-1] = self.reservation_ids[-1], self.reservation_ids[index]
+            return self.reservation_ids.pop()
+
+    def _return_reservation(self, reservation_id, flight_id):
+        with self.lock:
+            self.reservation_ids.append(reservation_id)
+            self.reservation_flights[reservation_id] = flight_id
+
+    def _random_seat(self, rng):
+        return format_seat(rng.randint(1, 30), rng.randrange(len(SEAT_LETTERS)))
+
+    def search(self, rng):
+        origin, destination = rng.sample(self.airports, 2)
+        first_day = (START_DAY + datetime.timedelta(days=rng.randrange(self.days))).date()
+        self.storage.search_flights(origin, destination, (first_day, first_day + datetime.timedelta(days=2)))
+        return True
+
+    def capacity(self, rng):
+        self.storage.can_book_flight(rng.choice(self.flight_ids))
+        return True
+
+    def popularity_lookup(self, rng):
+        self.popularity.most_popular()
+        return True
+
+    def book(self, rng):
+        flight_id = rng.choice(self.flight_ids)
+        result, reservation_id = self.storage.book_seat(rng.choice(self.passenger_ids), flight_id, self._random_seat(rng))
+        if result == BOOKED:
+            self._return_reservation(reservation_id, flight_id)
+            self.popularity.record_booking(self.flight_airlines[flight_id])
+        return result == BOOKED
+
+    def edit(self, rng):
+        reservation_id = self._take_reservation(rng)
+        if reservation_id is None:
+            return False
+        old_flight_id = self.reservation_flights[reservation_id]
+        new_flight_id = rng.choice(self.flight_ids)
+        result = self.storage.change_reservation(reservation_id, new_flight_id, self._random_seat(rng))
+        if result == UPDATED:
+            self._return_reservation(reservation_id, new_flight_id)
+            self.popularity.record_cancellation(self.flight_airlines[old_flight_id])
+            self.popularity.record_booking(self.flight_airlines[new_flight_id])
+        else:
+            self._return_reservation(reservation_id, old_flight_id)
+        return result == UPDATED
+
+    def delete(self, rng):
+        reservation_id = self._take_reservation(rng)
+        if reservation_id is None:
+            return False
+        result = self.storage.remove_reservation(reservation_id)
+        if result == DELETED:
+            self.popularity.record_cancellation(self.flight_airlines[self.reservation_flights.pop(reservation_id)])
+        else:
+            self._return_reservation(reservation_id, self.reservation_flights[reservation_id])
+        return result == DELETED
+
+    def operations(self):
+        return {"search": self.search, "capacity": self.capacity, "popularity": self.popularity_lookup,
+                "book": self.book, "edit": self.edit, "delete": self.delete}
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))]
+
+
+def run(workload, mix, operations, workers, seed_value=0):
+    # Replays `operations` operations drawn from `mix` on `workers` threads. Each worker has its own
+    # seeded random generator, so the same arguments replay the same sequence of operations.
+    # Returns the per-operation results.
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    handlers = workload.operations()
+    timings = {name: [] for name in names}
+    outcomes = {name: {"ok": 0, "rejected": 0, "errors": 0} for name in names}
+    lock = threading.Lock()
+    per_worker = [operations // workers + (1 if i < operations % workers else 0) for i in range(workers)]
+
+    def worker(index):
+        rng = random.Random(seed_value * 1000 + index)
+        local = []
+        for _ in range(per_worker[index]):
+            name = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                outcome = "ok" if handlers[name](rng) else "rejected"
+            except Exception:
+                outcome = "errors"
+            local.append((name, time.perf_counter() - started, outcome))
+        with lock:
+            for name, elapsed, outcome in local:
+                timings[name].append(elapsed)
+                outcomes[name][outcome] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for name in names:
+        latencies = sorted(timings[name])
+        results[name] = dict(outcomes[name], count=len(latencies),
+                             throughput=round(len(latencies) / elapsed, 2),
+                             p50_ms=round(percentile(latencies, 0.50) * 1000, 3),
+                             p95_ms=round(percentile(latencies, 0.95) * 1000, 3),
+                             p99_ms=round(percentile(latencies, 0.99) * 1000, 3),
+                             max_ms=round(latencies[-1] * 1000, 3) if latencies else 0.0)
+    return {"seconds": round(elapsed, 3), "throughput": round(operations / elapsed, 2), "operations": results}
+
+
+def compare(results, baseline, tolerance):
+    # Returns one line per operation comparing p50/p99 latency and throughput with the baseline run,
+    # and whether any of them got worse by more than `tolerance` (a fraction, e.g. 0.1 for 10%).
+    lines = []
+    regressed = False
+    for name, current in results["operations"].items():
+        before = baseline["operations"].get(name)
+        if not before or not current["count"]:
+            continue
+        changes = []
+        for metric, worse_if_higher in (("p50_ms", True), ("p99_ms", True), ("throughput", False)):
+            if not before[metric]:
+                continue
+            change = (current[metric] - before[metric]) / before[metric]
+            worse = change > tolerance if worse_if_higher else change < -tolerance
+            regressed = regressed or worse
+            changes.append(f"{metric} {before[metric]} -> {current[metric]} ({change:+.0%}){' REGRESSION' if worse else ''}")
+        lines.append(f"{name}: " + ", ".join(changes))
+    return lines, regressed
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown operation {name.strip()!r}")
+        mix[name.strip()] = float(weight)
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed a database and replay a mix of reservation operations.")
+    parser.add_argument("--storage", default="sqlite:///loadtest.db",
+                        help="'mysql' or 'sqlite:///file.db'; a SQLite file is recreated on every run, "
+                             "any other database must be empty")
+    parser.add_argument("--flights", type=int, default=2000)
+    parser.add_argument("--passengers", type=int, default=5000)
+    parser.add_argument("--reservations", type=int, default=20000)
+    parser.add_argument("--operations", type=int, default=20000)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help="e.g. search=40,book=15,edit=5,delete=5")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="loadtest_results.json", help="where to save the results as JSON")
+    parser.add_argument("--baseline", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before a metric counts as a regression")
+    args = parser.parse_args()
+
+    storage = open_empty_storage(args.storage)
+    days = 60
+    started = time.perf_counter()
+    flight_airlines, passenger_ids, airports, reservation_flights = seed(storage, args.flights, args.passengers,
+                                                                         args.reservations, days=days,
+                                                                         rng=random.Random(args.seed))
+    print(f"Seeded {len(flight_airlines)} flights, {len(passenger_ids)} passengers and {len(reservation_flights)} "
+          f"reservations in {time.perf_counter() - started:.1f}s")
+
+    workload = Workload(storage, flight_airlines, passenger_ids, airports, reservation_flights, days)
+    results = run(workload, args.mix, args.operations, args.workers, args.seed)
+    results["config"] = {key: value for key, value in vars(args).items() if key not in ("output", "baseline")}
+    results["finished_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+    storage.close()
+
+    print(f"{args.operations} operations on {args.workers} workers in {results['seconds']}s "
+          f"({results['throughput']} ops/s)")
+    for name, result in results["operations"].items():
+        print(f"{name:>10}: {result['count']:>6} ops, {result['throughput']:>8} ops/s, p50 {result['p50_ms']} ms, "
+              f"p95 {result['p95_ms']} ms, p99 {result['p99_ms']} ms, rejected {result['rejected']}, errors {result['errors']}")
+    with open(args.output, "w", encoding="utf-8") as out:
+        json.dump(results, out, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as source:
+            lines, regressed = compare(results, json.load(source), args.tolerance)
+        print(f"Compared with {args.baseline}:")
+        for line in lines:
+            print(f"  {line}")
+        if regressed:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import functools
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-operation instrumentation: wall time, SQL statements, Prolog queries and connections opened.
+# Everything is off until enable() is called (or AIRLINE_METRICS=1 is set); while off, an
+# instrumented function costs one global flag check and counters are not touched.
+
+# Upper bounds of the latency histogram buckets, in seconds.
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+COUNTERS = ("sql_statements", "prolog_queries", "connections_opened")
+
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_operations = {}   # name -> {"count", "seconds", "buckets": [...], counter: total}
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def toggle():
+    global _enabled
+    _enabled = not _enabled
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _operations.clear()
+
+
+def _frames():
+    frames = getattr(_local, "frames", None)
+    if frames is None:
+        frames = _local.frames = []
+    return frames
+
+
+def _count(counter, n):
+    # Adds n to the counter of every operation running on this thread, so an operation's totals
+    # include the work of the operations it calls.
+    for frame in _frames():
+        frame[counter] += n
+
+
+def count_sql(n=1):
+    if _enabled:
+        _count("sql_statements", n)
+
+
+def count_prolog(n=1):
+    if _enabled:
+        _count("prolog_queries", n)
+
+
+def count_connection(n=1):
+    if _enabled:
+        _count("connections_opened", n)
+
+
+def _record(name, seconds, frame):
+    with _lock:
+        operation = _operations.get(name)
+        if operation is None:
+            operation = _operations[name] = dict({"count": 0, "seconds": 0.0, "buckets": [0] * len(BUCKETS)},
+                                                 **{counter: 0 for counter in COUNTERS})
+        operation["count"] += 1
+        operation["seconds"] += seconds
+        for index, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                operation["buckets"][index] += 1
+                break
+        for counter in COUNTERS:
+            operation[counter] += frame[counter]
+
+
+@contextmanager
+def operation(name):
+    # Times the block as one run of `name`: `with metrics.operation("gui.flight_page"): ...`
+    if not _enabled:
+        yield
+        return
+    frame = {counter: 0 for counter in COUNTERS}
+    frame["waiting"] = 0.0
+    frames = _frames()
+    frames.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start - frame["waiting"]
+        frames.pop()
+        _record(name, seconds, frame)
+
+
+def instrumented(name=None):
+    # Decorator recording every call of the function as one run of the operation `name`
+    # (the function's name by default).
+    def decorate(function):
+        label = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with operation(label):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def untimed_input(prompt=""):
+    # input() that does not count the time spent waiting for the user towards the running
+    # operations, so interactive operations report only the time the program itself spends.
+    if not _enabled:
+        return input(prompt)
+    start = time.perf_counter()
+    try:
+        return input(prompt)
+    finally:
+        waited = time.perf_counter() - start
+        for frame in _frames():
+            frame["waiting"] += waited
+
+
+class _CountingCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args, **kwargs):
+        count_sql()
+        return self._cursor.execute(*args, **kwargs)
+
+    def executemany(self, *args, **kwargs):
+        count_sql()
+        return self._cursor.executemany(*args, **kwargs)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _CountingConnection:
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self, *args, **kwargs):
+        return _CountingCursor(self._connection.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+def instrument_connection(connection):
+    # Returns the connection itself while instrumentation is off, or a thin wrapper whose cursors
+    # count the statements they execute.
+    return _CountingConnection(connection) if _enabled else connection
+
+
+def snapshot():
+    with _lock:
+        return {name: dict(operation, buckets=list(operation["buckets"])) for name, operation in _operations.items()}
+
+
+def histogram_dump(extra=None):
+    # Returns a text report: one block per operation with its totals and latency histogram.
+    # extra is an optional {name: value} of process-wide gauges appended at the end.
+    lines = []
+    for name, operation in sorted(snapshot().items()):
+        count = operation["count"]
+        lines.append(f"{name}: {count} call(s), {operation['seconds'] * 1000 / count:.2f} ms avg, "
+                     f"{operation['sql_statements'] / count:.1f} SQL, {operation['prolog_queries'] / count:.1f} Prolog, "
+                     f"{operation['connections_opened']} connection(s) opened")
+        peak = max(operation["buckets"]) or 1
+        for bound, bucket in zip(BUCKETS, operation["buckets"]):
+            if bucket:
+                lines.append(f"  <= {bound * 1000:>7g} ms {bucket:>7} {'#' * max(1, bucket * 40 // peak)}")
+        slower = count - sum(operation["buckets"])
+        if slower:
+            lines.append(f"  >  {BUCKETS[-1] * 1000:>7g} ms {slower:>7}")
+    for name, value in (extra or {}).items():
+        lines.append(f"{name}: {value}")
+    return "\n".join(lines) if lines else "No operations recorded."
+
+
+def prometheus_text(extra=None):
+    # Returns the metrics in the Prometheus text exposition format.
+    operations = sorted(snapshot().items())
+    lines = ["# HELP airline_operation_seconds Wall time of each operation.",
+             "# TYPE airline_operation_seconds histogram"]
+    for name, operation in operations:
+        cumulative = 0
+        for bound, bucket in zip(BUCKETS, operation["buckets"]):
+            cumulative += bucket
+            lines.append(f'airline_operation_seconds_bucket{{operation="{name}",le="{bound:g}"}} {cumulative}')
+        lines.append(f'airline_operation_seconds_bucket{{operation="{name}",le="+Inf"}} {operation["count"]}')
+        lines.append(f'airline_operation_seconds_sum{{operation="{name}"}} {operation["seconds"]:.6f}')
+        lines.append(f'airline_operation_seconds_count{{operation="{name}"}} {operation["count"]}')
+    for counter in COUNTERS:
+        lines.append(f"# HELP airline_operation_{counter}_total {counter.replace('_', ' ').capitalize()} per operation.")
+        lines.append(f"# TYPE airline_operation_{counter}_total counter")
+        for name, operation in operations:
+            lines.append(f'airline_operation_{counter}_total{{operation="{name}"}} {operation[counter]}')
+    for name, value in (extra or {}).items():
+        lines.append(f"# TYPE airline_{name} gauge")
+        lines.append(f"airline_{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(path, extra=None):
+    # Writes prometheus_text() to path atomically, for a node_exporter textfile collector.
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as out:
+        out.write(prometheus_text(extra))
+    os.replace(temporary, path)
+
+
+def configure_from_environment():
+    # AIRLINE_METRICS=1 turns instrumentation on at start-up; AIRLINE_METRICS_FILE names the
+    # Prometheus text file written by frontend.py. Returns the file path, if any.
+    if os.environ.get("AIRLINE_METRICS", "").lower() in ("1", "true", "yes", "on"):
+        enable()
+    return os.environ.get("AIRLINE_METRICS_FILE")
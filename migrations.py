@@ -0,0 +1,98 @@
+import db
+
+
+# MySQL commits DDL as soon as it runs, so a migration that fails half way leaves its earlier steps
+# applied but the migration unrecorded. Steps that add a column or an index are therefore guarded:
+# they are skipped when the object already exists, and a failed migration can simply be run again.
+def _add_column(table, column, definition):
+    return ("column", table, column, f"ALTER TABLE {table} ADD COLUMN {column} {definition};")
+
+
+def _create_index(name, table, columns, unique=False):
+    return ("index", table, name, f"CREATE {'UNIQUE ' if unique else ''}INDEX {name} ON {table} ({columns});")
+
+
+# Schema changes applied on top of the base Air_Reserve_System tables, in order.
+# Each entry is (name, steps); a step is a statement, or a guarded step from the helpers above.
+# Applied names are recorded in schema_migrations. Plain statements must be safe to run again.
+MIGRATIONS = [
+    ("001_flights_seats_booked", [
+        _add_column("Flights", "seats_booked", "INT NOT NULL DEFAULT 0"),
+        "UPDATE Flights f SET seats_booked = (SELECT COUNT(*) FROM Reservations r WHERE r.flight_id = f.flight_id);",
+    ]),
+    ("002_flights_departure_index", [
+        _create_index("idx_flights_departure", "Flights", "departure_datetime, flight_id"),
+    ]),
+    ("003_flights_route_index", [
+        _create_index("idx_flights_route", "Flights", "departure_airport, arrival_airport, departure_datetime"),
+    ]),
+    ("004_lookup_indexes", [
+        _create_index("idx_passengers_email", "Passengers", "email"),
+        _create_index("idx_reservations_flight_seat", "Reservations", "flight_id, seat_number"),
+    ]),
+    ("005_seat_holds", [
+        """CREATE TABLE IF NOT EXISTS SeatHolds (
+            hold_id INT AUTO_INCREMENT PRIMARY KEY,
+            flight_id INT NOT NULL,
+            seat_number VARCHAR(10) NOT NULL,
+            holder VARCHAR(100) NOT NULL,
+            expires_at DATETIME NOT NULL,
+            UNIQUE KEY uq_seat_holds_seat (flight_id, seat_number),
+            INDEX idx_seat_holds_expiry (expires_at),
+            FOREIGN KEY (flight_id) REFERENCES Flights (flight_id) ON DELETE CASCADE
+        );""",
+    ]),
+    ("006_passengers_email_normalized", [
+        _add_column("Passengers", "email_normalized", "VARCHAR(100) NULL"),
+        # The oldest passenger of each email is registered under it; later duplicates keep NULL
+        # until passengers.py merges them, so the unique index can be built straight away.
+        """UPDATE Passengers SET email_normalized = LOWER(TRIM(email))
+        WHERE passenger_id IN (SELECT keeper FROM (SELECT MIN(passenger_id) AS keeper FROM Passengers
+                                                   GROUP BY LOWER(TRIM(email))) AS keepers);""",
+        _create_index("uq_passengers_email_normalized", "Passengers", "email_normalized", unique=True),
+    ]),
+    ("007_flights_original_capacity", [
+        # Set when flight_cancellation closes a flight, which zeroes max_capacity.
+        _add_column("Flights", "original_capacity", "INT NULL"),
+    ]),
+]
+
+
+def _exists(cursor, kind, table, name):
+    # Whether the column or index `name` of `table` is already in the current database.
+    if kind == "column":
+        cursor.execute("SELECT COUNT(*) FROM information_schema.columns "
+                       "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s;", (table, name))
+    else:
+        cursor.execute("SELECT COUNT(*) FROM information_schema.statistics "
+                       "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s;", (table, name))
+    return cursor.fetchone()[0] > 0
+
+
+def apply_migrations(connection):
+    # Applies every migration that has not been recorded yet and returns the names applied.
+    cursor = connection.cursor()
+    cursor.execute("CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);")
+    cursor.execute("SELECT name FROM schema_migrations;")
+    applied = {row[0] for row in cursor.fetchall()}
+    newly_applied = []
+    for name, steps in MIGRATIONS:
+        if name in applied:
+            continue
+        for step in steps:
+            if isinstance(step, tuple):
+                kind, table, object_name, step = step
+                if _exists(cursor, kind, table, object_name):
+                    continue
+            cursor.execute(step)
+        cursor.execute("INSERT INTO schema_migrations (name) VALUES (%s);", (name,))
+        connection.commit()
+        print(f"Applied migration {name}")
+        newly_applied.append(name)
+    return newly_applied
+
+
+if __name__ == "__main__":
+    with db.connection() as connection:
+        if not apply_migrations(connection):
+            print("Schema is up to date.")
@@ -0,0 +1,143 @@
+% Connection pool for the AirSystem ODBC data source.
+% Connections are reused across predicate calls and each connection keeps
+% its own cache of prepared statements, so a lookup costs a single execute.
+:- use_module(library(odbc)).
+
+:- dynamic pool_option/2.
+:- dynamic pool_open/1.           % pool_open(Connection)
+:- dynamic pool_idle/2.           % pool_idle(Connection, LastUsedTime)
+:- dynamic pool_statement/4.      % pool_statement(Connection, SQL, Types, Statement)
+:- dynamic pool_connects/1.       % pool_connects(Count): connections opened since the pool was loaded
+
+pool_connects(0).
+
+% Pool settings. Change them at runtime with set_pool_option/2.
+pool_option(dsn, 'AirSystem').
+pool_option(user, 'root').
+pool_option(password, '').
+pool_option(max_size, 4).             % maximum number of open connections
+pool_option(idle_timeout, 300).       % seconds before an idle connection is closed
+pool_option(health_check_after, 30).  % idle seconds after which a connection is pinged before reuse
+
+set_pool_option(Name, Value) :-
+    retractall(pool_option(Name, _)),
+    assertz(pool_option(Name, Value)).
+
+% Opens a new connection to the database.
+connect_to_database(Connection) :-
+    pool_option(dsn, DSN),
+    pool_option(user, User),
+    pool_option(password, Password),
+    odbc_connect(DSN, Connection, [user(User), password(Password), open(multiple)]),
+    retract(pool_connects(Count)),
+    Next is Count + 1,
+    assertz(pool_connects(Next)).
+
+% -- CHECKOUT / RELEASE --
+
+% Takes an idle connection from the pool, or opens a new one if the pool is not full.
+checkout_connection(Connection) :-
+    with_mutex(odbc_pool, checkout_connection_(Connection)).
+
+checkout_connection_(Connection) :-
+    get_time(Now),
+    close_expired_connections(Now),
+    (   retract(pool_idle(Candidate, LastUsed))
+    ->  (   healthy_connection(Candidate, LastUsed, Now)
+        ->  Connection = Candidate
+        ;   close_pooled_connection(Candidate),
+            checkout_connection_(Connection)
+        )
+    ;   pool_option(max_size, Max),
+        aggregate_all(count, pool_open(_), Open),
+        Open < Max
+    ->  connect_to_database(Connection),
+        assertz(pool_open(Connection))
+    ;   throw(error(resource_error(odbc_pool), checkout_connection/1))
+    ).
+
+% Returns a connection to the pool. The most recently used connection is handed out first.
+release_connection(Connection) :-
+    get_time(Now),
+    with_mutex(odbc_pool, asserta(pool_idle(Connection, Now))).
+
+% Runs Goal once with a pooled connection. A connection that raised an error is closed instead of reused.
+with_pooled_connection(Connection, Goal) :-
+    setup_call_catcher_cleanup(checkout_connection(Connection),
+                               once(Goal),
+                               Catcher,
+                               return_connection(Catcher, Connection)).
+
+% Runs Goal as one transaction on a pooled connection: commits if it succeeds, rolls back otherwise.
+with_pooled_transaction(Connection, Goal) :-
+    with_pooled_connection(Connection,
+        setup_call_cleanup(odbc_set_connection(Connection, auto_commit(false)),
+                           run_transaction(Connection, Goal),
+                           odbc_set_connection(Connection, auto_commit(true)))).
+
+run_transaction(Connection, Goal) :-
+    catch(Goal, Error, ( odbc_end_transaction(Connection, rollback), throw(Error) )),
+    !,
+    odbc_end_transaction(Connection, commit).
+run_transaction(Connection, _) :-
+    odbc_end_transaction(Connection, rollback),
+    fail.
+
+return_connection(exception(_), Connection) :- !,
+    with_mutex(odbc_pool, close_pooled_connection(Connection)).
+return_connection(_, Connection) :-
+    release_connection(Connection).
+
+% -- HEALTH --
+
+% A recently used connection is trusted; one that sat idle longer is pinged first.
+healthy_connection(_, LastUsed, Now) :-
+    pool_option(health_check_after, After),
+    Now - LastUsed < After, !.
+healthy_connection(Connection, _, _) :-
+    catch(odbc_query(Connection, 'SELECT 1', row(_)), _, fail).
+
+% Closes idle connections that have been unused for longer than the idle timeout.
+close_expired_connections(Now) :-
+    pool_option(idle_timeout, Timeout),
+    forall(( pool_idle(Connection, LastUsed), Now - LastUsed > Timeout ),
+           ( retract(pool_idle(Connection, LastUsed)),
+             close_pooled_connection(Connection) )).
+
+% Frees the cached statements of a connection and disconnects it.
+close_pooled_connection(Connection) :-
+    forall(retract(pool_statement(Connection, _, _, Statement)),
+           catch(odbc_free_statement(Statement), _, true)),
+    retractall(pool_open(Connection)),
+    catch(odbc_disconnect(Connection), _, true).
+
+% Closes every idle connection, e.g. before the program exits.
+close_connection_pool :-
+    with_mutex(odbc_pool,
+               forall(retract(pool_idle(Connection, _)),
+                      close_pooled_connection(Connection))).
+
+% Reports how many connections are open and how many of them are idle.
+pool_stats(Open, Idle) :-
+    aggregate_all(count, pool_open(_), Open),
+    aggregate_all(count, pool_idle(_, _), Idle).
+
+% Reports how many connections the pool has opened in total.
+pool_connections_opened(Count) :-
+    pool_connects(Count).
+
+% -- STATEMENTS --
+
+% Returns the prepared statement for SQL on this connection, preparing it on first use.
+pooled_statement(Connection, SQL, Types, Statement) :-
+    (   pool_statement(Connection, SQL, Types, Statement)
+    ->  true
+    ;   odbc_prepare(Connection, SQL, Types, Statement),
+        assertz(pool_statement(Connection, SQL, Types, Statement))
+    ).
+
+% Executes a cached statement on a pooled connection and returns its first row.
+pooled_execute(SQL, Types, Parameters, Row) :-
+    with_pooled_connection(Connection,
+                           ( pooled_statement(Connection, SQL, Types, Statement),
+                             odbc_execute(Statement, Parameters, Row) )).
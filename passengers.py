@@ -0,0 +1,120 @@
+import argparse
+import time
+import db
+from booking import begin_transaction
+
+# Passenger identity: one Passengers row per person, keyed by the normalized email. The column
+# email_normalized carries a unique index (migration 006), so finding a returning passenger is one
+# indexed lookup and two clerks adding the same passenger at once cannot create two rows.
+#
+# Rows written before the index existed may share an email. Migration 006 marks the oldest row of
+# each email as the canonical one and leaves email_normalized NULL on the rest; merge_duplicates()
+# folds those into the canonical row and moves their reservations over.
+
+MERGE_BATCH_SIZE = 500
+
+
+def normalize_email(email):
+    return str(email).strip().lower()
+
+
+def find_passenger(connection, email):
+    # Returns the passenger_id registered under email, or None.
+    cursor = connection.cursor()
+    cursor.execute("SELECT passenger_id FROM Passengers WHERE email_normalized = %s;", (normalize_email(email),))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def upsert_passenger(connection, first_name, last_name, email, phone_number=""):
+    # Returns (passenger_id, created). A returning passenger keeps their passenger_id and gets the
+    # name and phone number given now; otherwise a new passenger is inserted. If another session
+    # inserts the same email first, the unique index refuses this insert and its row is used.
+    normalized = normalize_email(email)
+    cursor = connection.cursor()
+    for _ in range(2):
+        passenger_id = find_passenger(connection, normalized)
+        if passenger_id is not None:
+            cursor.execute("UPDATE Passengers SET first_name = %s, last_name = %s, phone_number = %s WHERE passenger_id = %s;",
+                           (first_name, last_name, phone_number, passenger_id))
+            connection.commit()
+            return passenger_id, False
+        try:
+            cursor.execute("INSERT INTO Passengers (first_name, last_name, email, email_normalized, phone_number) "
+                           "VALUES (%s, %s, %s, %s, %s);", (first_name, last_name, email.strip(), normalized, phone_number))
+            connection.commit()
+            return cursor.lastrowid, True
+        except Exception:
+            # Most likely the unique index: look the winner up on the next pass.
+            connection.rollback()
+    raise RuntimeError(f"Could not add or find the passenger with email {email!r}")
+
+
+def _placeholders(count):
+    return ", ".join(["%s"] * count)
+
+
+def merge_duplicates(connection, batch_size=MERGE_BATCH_SIZE, progress=None):
+    # Folds passengers without an email_normalized into the passenger registered under the same
+    # normalized email, batch_size rows per transaction, and returns a summary dict. Each batch is
+    # an index range scan for email_normalized IS NULL, so the job can be stopped and resumed.
+    summary = {"merged": 0, "registered": 0, "reservations_moved": 0, "seconds": 0.0}
+    start = time.perf_counter()
+    cursor = connection.cursor()
+    while True:
+        begin_transaction(connection)
+        cursor.execute("SELECT passenger_id, email FROM Passengers WHERE email_normalized IS NULL "
+                       "ORDER BY passenger_id LIMIT %s FOR UPDATE;", (batch_size,))
+        rows = cursor.fetchall()
+        if not rows:
+            connection.commit()
+            break
+        emails = sorted({normalize_email(email) for _, email in rows})
+        cursor.execute(f"SELECT email_normalized, passenger_id FROM Passengers WHERE email_normalized IN "
+                       f"({_placeholders(len(emails))}) FOR UPDATE;", tuple(emails))
+        canonical = dict(cursor.fetchall())
+
+        merges = []      # (duplicate passenger_id, canonical passenger_id)
+        registered = []  # (email_normalized, passenger_id) of new canonical rows
+        for passenger_id, email in rows:
+            normalized = normalize_email(email)
+            if normalized in canonical:
+                merges.append((passenger_id, canonical[normalized]))
+            else:
+                # No registered passenger yet: the oldest row of this email becomes the canonical one.
+                canonical[normalized] = passenger_id
+                registered.append((normalized, passenger_id))
+
+        if registered:
+            cursor.executemany("UPDATE Passengers SET email_normalized = %s WHERE passenger_id = %s;", registered)
+        if merges:
+            cursor.executemany("UPDATE Reservations SET passenger_id = %s WHERE passenger_id = %s;",
+                               [(target, duplicate) for duplicate, target in merges])
+            summary["reservations_moved"] += max(cursor.rowcount, 0)
+            duplicates = [duplicate for duplicate, _ in merges]
+            cursor.execute(f"DELETE FROM Passengers WHERE passenger_id IN ({_placeholders(len(duplicates))});",
+                           tuple(duplicates))
+        connection.commit()
+        summary["merged"] += len(merges)
+        summary["registered"] += len(registered)
+        if progress:
+            progress(summary)
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge passengers that share an email into one passenger each.")
+    parser.add_argument("--batch-size", type=int, default=MERGE_BATCH_SIZE, help="passengers per transaction")
+    args = parser.parse_args()
+
+    progress = lambda summary: print(f"{summary['merged']} merged, {summary['registered']} registered, "
+                                     f"{summary['reservations_moved']} reservation(s) moved")
+    with db.connection() as connection:
+        summary = merge_duplicates(connection, args.batch_size, progress)
+    print(f"Merged {summary['merged']} duplicate passenger(s) and moved {summary['reservations_moved']} "
+          f"reservation(s) in {summary['seconds']}s.")
+
+
+if __name__ == "__main__":
+    main()
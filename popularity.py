@@ -0,0 +1,60 @@
+import heapq
+import threading
+import time
+
+
+class PopularityCache:
+    # Keeps reservation counts per airline in memory so the main menu does not
+    # re-run the GROUP BY aggregate on every loop. The counts are reloaded in full
+    # once they are older than ttl seconds and adjusted in place after each write.
+
+    def __init__(self, loader, ttl=300.0):
+        # loader() must return an iterable of (airline_name, reservation_count) pairs.
+        self.loader = loader
+        self.ttl = ttl
+        self._counts = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _ensure_fresh(self):
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self._counts = {airline: count for airline, count in self.loader()}
+            self._loaded_at = time.monotonic()
+
+    def top(self, n=1):
+        # Returns the n most booked airlines as (airline_name, count) pairs, most booked first.
+        with self._lock:
+            self._ensure_fresh()
+            ranking = ((count, airline) for airline, count in self._counts.items() if count > 0)
+            return [(airline, count) for count, airline in heapq.nlargest(n, ranking)]
+
+    def most_popular(self):
+        # Returns the single most booked airline, or None when there are no reservations.
+        ranking = self.top(1)
+        return ranking[0][0] if ranking else None
+
+    def record_booking(self, airline, count=1):
+        # Adds count reservations to an airline after a successful booking.
+        # An unknown airline (None) forces a full reload instead.
+        with self._lock:
+            if airline is None:
+                self._loaded_at = None
+            elif self._loaded_at is not None:
+                self._counts[airline] = self._counts.get(airline, 0) + count
+
+    def record_cancellation(self, airline, count=1):
+        # Removes count reservations from an airline after a reservation or flight is deleted.
+        with self._lock:
+            if airline is None:
+                self._loaded_at = None
+            elif self._loaded_at is not None:
+                remaining = self._counts.get(airline, 0) - count
+                if remaining > 0:
+                    self._counts[airline] = remaining
+                else:
+                    self._counts.pop(airline, None)
+
+    def invalidate(self):
+        # Forces the next lookup to reload the full ranking.
+        with self._lock:
+            self._loaded_at = None
@@ -0,0 +1,84 @@
+import os
+import threading
+import time
+from pyswip import Prolog
+import metrics
+
+# Path of the Prolog backend, resolved once so worker threads do not depend on the working directory.
+BACKEND_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "backend.pl")
+
+_lock = threading.RLock()
+_prolog = None
+_loaded_mtime = None
+_stats = {"consults": 0, "consult_seconds": 0.0, "queries": 0, "query_seconds": 0.0}
+
+
+def get_prolog():
+    # Returns the process-wide Prolog engine, consulting backend.pl only the first time
+    # and again whenever the file's modification time changes.
+    global _prolog, _loaded_mtime
+    with _lock:
+        mtime = os.path.getmtime(BACKEND_FILE)
+        if _prolog is None or mtime != _loaded_mtime:
+            if _prolog is None:
+                _prolog = Prolog()
+            start = time.perf_counter()
+            with metrics.operation("prolog_consult"):
+                _prolog.consult(BACKEND_FILE)
+            _stats["consults"] += 1
+            _stats["consult_seconds"] += time.perf_counter() - start
+            _loaded_mtime = mtime
+        return _prolog
+
+
+def prolog_query(query):
+    # Runs a query on the shared engine and returns every solution as a list.
+    # The engine is not re-entrant, so queries from different threads are serialised.
+    metrics.count_prolog()
+    with _lock:
+        prolog = get_prolog()
+        start = time.perf_counter()
+        try:
+            return list(prolog.query(query))
+        finally:
+            _stats["queries"] += 1
+            _stats["query_seconds"] += time.perf_counter() - start
+
+
+def engine_stats():
+    # Returns a snapshot of the consult and query counters.
+    with _lock:
+        return dict(_stats)
+
+
+def print_engine_stats():
+    # Prints a one-line summary of the time spent consulting and querying Prolog.
+    stats = engine_stats()
+    print(f"Prolog engine: {stats['consults']} consult(s) in {stats['consult_seconds']:.3f}s, "
+          f"{stats['queries']} quer(ies) in {stats['query_seconds']:.3f}s")
+
+
+def configure_odbc_pool(max_size=None, idle_timeout=None, health_check_after=None):
+    # Adjusts the ODBC connection pool used by the backend.pl predicates.
+    options = {"max_size": max_size, "idle_timeout": idle_timeout, "health_check_after": health_check_after}
+    for name, value in options.items():
+        if value is not None:
+            prolog_query(f"set_pool_option({name}, {int(value)})")
+
+
+def configure_odbc_pool_from_environment():
+    # AIRLINE_ODBC_MAX_SIZE, AIRLINE_ODBC_IDLE_TIMEOUT and AIRLINE_ODBC_HEALTH_CHECK_AFTER override
+    # the defaults in odbc_pool.pl at start-up. Unset ones leave the engine untouched.
+    configure_odbc_pool(**{name: os.environ.get(f"AIRLINE_ODBC_{name.upper()}") or None
+                           for name in ("max_size", "idle_timeout", "health_check_after")})
+
+
+def odbc_connections_opened():
+    # Returns how many ODBC connections the backend.pl pool has opened since it was loaded.
+    result = prolog_query("pool_connections_opened(Count)")
+    return result[0]["Count"] if result else 0
+
+
+def close_odbc_pool():
+    # Disconnects the idle pooled ODBC connections.
+    prolog_query("close_connection_pool")
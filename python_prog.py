@@ -1,18 +1,17 @@
 import mysql.connector
+import db
+from passengers import upsert_passenger
 
-def create_db_connection():
+def create_db_pool():
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            user='root',
-            password='',
-            database='Air_Reserve_System'
-        )
+        db.init_pool()
+        with db.connection() as connection:
+            connection.ping()
         print("MySQL Database connection successful")
+        return True
     except Exception as e:
         print(f"The error '{e}' occurred")
-        connection = None
-    return connection
+        return False
 
 def display_main_menu():
     print("\nMain Menu:")
@@ -26,7 +25,7 @@ def display_main_menu():
     choice = input("Enter your choice (1-7): ")
     return choice
 
-def add_flight(connection):
+def add_flight():
     try:
         print("Please enter the new flight details.")
         airline_name = input("Airline Name: ")
@@ -48,10 +47,11 @@ def add_flight(connection):
             print("Maximum capacity must be a positive integer.")
             return
 
-        cursor = connection.cursor()
-        query = "INSERT INTO Flights (airline_name, flight_number, departure_airport, arrival_airport, departure_datetime, arrival_datetime, max_capacity) VALUES (%s, %s, %s, %s, %s, %s, %s);"
-        cursor.execute(query, (airline_name, flight_number, departure_airport, arrival_airport, departure_datetime, arrival_datetime, max_capacity))
-        connection.commit()
+        with db.connection() as connection:
+            cursor = connection.cursor()
+            query = "INSERT INTO Flights (airline_name, flight_number, departure_airport, arrival_airport, departure_datetime, arrival_datetime, max_capacity) VALUES (%s, %s, %s, %s, %s, %s, %s);"
+            cursor.execute(query, (airline_name, flight_number, departure_airport, arrival_airport, departure_datetime, arrival_datetime, max_capacity))
+            connection.commit()
         print("Flight added successfully.")
     except mysql.connector.Error as e:
         print(f"Failed to add flight. MySQL Error: {e}")
@@ -60,56 +60,57 @@ def add_flight(connection):
     except Exception as e:
         print(f"An error occurred: {e}")
 
-def remove_flight(connection):
-    list_flights(connection)  # Show the list of flights
+def remove_flight():
+    list_flights()  # Show the list of flights
     flight_id = input("Enter the Flight ID you wish to remove (or input 0 to exit): ")
     
     if flight_id == '0':
         print("Exiting flight removal process.")
         return
     
-    cursor = connection.cursor()
     # Check if the flight exists
-    cursor.execute("SELECT * FROM Flights WHERE flight_id = %s;", (flight_id,))
-    if cursor.fetchone():
+    with db.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT * FROM Flights WHERE flight_id = %s;", (flight_id,))
+        exists = cursor.fetchone() is not None
+    if exists:
         # Confirm before deleting
         confirm = input(f"Are you sure you want to remove Flight ID {flight_id}? (yes/no): ").lower()
         if confirm == 'yes':
-            delete_query = "DELETE FROM Flights WHERE flight_id = %s;"
-            cursor.execute(delete_query, (flight_id,))
-            connection.commit()
+            with db.connection() as connection:
+                cursor = connection.cursor()
+                delete_query = "DELETE FROM Flights WHERE flight_id = %s;"
+                cursor.execute(delete_query, (flight_id,))
+                connection.commit()
             print("Flight removed successfully.")
         else:
             print("Flight removal cancelled.")
     else:
         print("Flight not found.")
 
-def add_passenger(connection, passenger_details):
-    cursor = connection.cursor(dictionary=True)
-    email = passenger_details[2]
-    cursor.execute("SELECT passenger_id FROM Passengers WHERE email = %s;", (email,))
-    existing_passenger = cursor.fetchone()
-    if existing_passenger:
-        print(f"Passenger with email {email} already exists. Passenger ID: {existing_passenger['passenger_id']}")
-        return existing_passenger['passenger_id']
+def add_passenger(passenger_details):
+    # Reuses the passenger registered under the same (normalized) email, like frontend.py.
+    first_name, last_name, email, phone_number = passenger_details
+    with db.connection() as connection:
+        passenger_id, created = upsert_passenger(connection, first_name, last_name, email, phone_number)
+    if created:
+        print("Passenger added successfully. Passenger ID:", passenger_id)
     else:
-        query = "INSERT INTO Passengers (first_name, last_name, email, phone_number) VALUES (%s, %s, %s, %s);"
-        cursor.execute(query, passenger_details)
-        connection.commit()
-        print("Passenger added successfully. Passenger ID:", cursor.lastrowid)
-        return cursor.lastrowid
+        print(f"Passenger with email {email} already exists. Passenger ID: {passenger_id}")
+    return passenger_id
 
-def edit_reservation(connection):
-    list_current_reservations(connection)
+def edit_reservation():
+    list_current_reservations()
     reservation_id = input("Enter the Reservation ID you wish to edit (input 0 to exit): ")
 
     if reservation_id =='0':
         print("Exiting edit reservation process.")
         return
     
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM Reservations WHERE reservation_id = %s;", (reservation_id,))
-    reservation = cursor.fetchone()
+    with db.connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT * FROM Reservations WHERE reservation_id = %s;", (reservation_id,))
+        reservation = cursor.fetchone()
 
     if reservation:
         print(f"Editing reservation ID: {reservation_id}")
@@ -119,8 +120,8 @@ def edit_reservation(connection):
     else:
         print("Reservation not found.")
 
-def delete_reservation(connection):
-    list_current_reservations(connection)  # Show the list of current reservations
+def delete_reservation():
+    list_current_reservations()  # Show the list of current reservations
     reservation_id = input("Enter the Reservation ID you wish to delete (or input 0 to exit): ")
     
     # Option to exit
@@ -128,26 +129,32 @@ def delete_reservation(connection):
         print("Exiting delete reservation process.")
         return
 
-    cursor = connection.cursor()
     # Check if the reservation exists
-    cursor.execute("SELECT * FROM Reservations WHERE reservation_id = %s;", (reservation_id,))
-    if cursor.fetchone():
+    with db.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT * FROM Reservations WHERE reservation_id = %s;", (reservation_id,))
+        exists = cursor.fetchone() is not None
+    if exists:
         # Confirm before deleting
         confirm = input(f"Are you sure you want to delete reservation ID {reservation_id}? (yes/no): ").lower()
         if confirm == 'yes':
-            delete_query = "DELETE FROM Reservations WHERE reservation_id = %s;"
-            cursor.execute(delete_query, (reservation_id,))
-            connection.commit()
+            with db.connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("UPDATE Flights f JOIN Reservations r ON r.flight_id = f.flight_id SET f.seats_booked = f.seats_booked - 1 WHERE r.reservation_id = %s;", (reservation_id,))
+                delete_query = "DELETE FROM Reservations WHERE reservation_id = %s;"
+                cursor.execute(delete_query, (reservation_id,))
+                connection.commit()
             print("Reservation deleted successfully.")
         else:
             print("Deletion cancelled.")
     else:
         print("Reservation not found.")
 
-def list_flights(connection):
-    cursor = connection.cursor(dictionary=True)
-    cursor.execute("SELECT flight_id, airline_name, flight_number, departure_airport, arrival_airport, departure_datetime, arrival_datetime FROM Flights ORDER BY departure_datetime;")
-    flights = cursor.fetchall()
+def list_flights():
+    with db.connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute("SELECT flight_id, airline_name, flight_number, departure_airport, arrival_airport, departure_datetime, arrival_datetime FROM Flights ORDER BY departure_datetime;")
+        flights = cursor.fetchall()
     if flights:
         print("Available Flights:")
         for flight in flights:
@@ -155,26 +162,29 @@ def list_flights(connection):
     else:
         print("No available flights.")
 
-def validate_flight_id(connection, flight_id):
-    cursor = connection.cursor()
-    cursor.execute("SELECT COUNT(*) FROM Flights WHERE flight_id = %s;", (flight_id,))
-    return cursor.fetchone()[0] == 1
+def validate_flight_id(flight_id):
+    with db.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Flights WHERE flight_id = %s;", (flight_id,))
+        return cursor.fetchone()[0] == 1
 
-def validate_seat_number(connection, flight_id, seat_number):
-    cursor = connection.cursor()
-    cursor.execute("SELECT COUNT(*) FROM Reservations WHERE flight_id = %s AND seat_number = %s;", (flight_id, seat_number))
-    return cursor.fetchone()[0] == 0
+def validate_seat_number(flight_id, seat_number):
+    with db.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT COUNT(*) FROM Reservations WHERE flight_id = %s AND seat_number = %s;", (flight_id, seat_number))
+        return cursor.fetchone()[0] == 0
 
-def list_current_reservations(connection):
-    cursor = connection.cursor(dictionary=True)
-    query = """
-    SELECT r.reservation_id, p.first_name, p.last_name, r.flight_id, r.seat_number, r.booking_status
-    FROM Reservations r
-    JOIN Passengers p ON r.passenger_id = p.passenger_id
-    ORDER BY r.reservation_id;
-    """
-    cursor.execute(query)
-    reservations = cursor.fetchall()
+def list_current_reservations():
+    with db.connection() as connection:
+        cursor = connection.cursor(dictionary=True)
+        query = """
+        SELECT r.reservation_id, p.first_name, p.last_name, r.flight_id, r.seat_number, r.booking_status
+        FROM Reservations r
+        JOIN Passengers p ON r.passenger_id = p.passenger_id
+        ORDER BY r.reservation_id;
+        """
+        cursor.execute(query)
+        reservations = cursor.fetchall()
 
     if reservations:
         print("Current Reservations:")
@@ -184,14 +194,16 @@ def list_current_reservations(connection):
         print("No current reservations found.")
 
 
-def make_reservation(connection, reservation_details):
+def make_reservation(reservation_details):
     flight_id = reservation_details[1]  # Assuming reservation_details[1] is the flight_id
 
     # Check if the flight has available capacity
-    if check_flight_capacity(connection, flight_id):
-        cursor = connection.cursor()
-        cursor.execute("INSERT INTO Reservations (passenger_id, flight_id, seat_number, booking_status) VALUES (%s, %s, %s, %s);", reservation_details)
-        connection.commit()
+    if check_flight_capacity(flight_id):
+        with db.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("INSERT INTO Reservations (passenger_id, flight_id, seat_number, booking_status) VALUES (%s, %s, %s, %s);", reservation_details)
+            cursor.execute("UPDATE Flights SET seats_booked = seats_booked + 1 WHERE flight_id = %s;", (flight_id,))
+            connection.commit()
         print("Reservation made successfully")
     else:
         print("Cannot make reservation: Flight is fully booked.")
@@ -201,27 +213,24 @@ def get_user_input_for_passenger():
     print("Please enter your personal details.")
     return input("First Name: "), input("Last Name: "), input("Email: "), input("Phone Number: ")
 
-def choose_flight_and_seat(connection):
-    list_flights(connection)
+def choose_flight_and_seat():
+    list_flights()
     flight_id = input("Please enter the flight ID you wish to book: ")
-    while not validate_flight_id(connection, flight_id):
+    while not validate_flight_id(flight_id):
         print("Invalid flight ID. Please choose a valid flight ID from the list above.")
         flight_id = input("Please enter the flight ID you wish to book: ")
     seat_number = input("Please enter your preferred seat number (e.g., 12A): ")
-    while not validate_seat_number(connection, flight_id, seat_number):
+    while not validate_seat_number(flight_id, seat_number):
         print("This seat is already taken. Please choose a different seat.")
         seat_number = input("Please enter your preferred seat number (e.g., 12A): ")
     return flight_id, seat_number
 
-def check_flight_capacity(connection, flight_id):
-    cursor = connection.cursor()
-    # Query to count the number of reservations for the given flight_id
-    cursor.execute("SELECT COUNT(*) FROM reservations WHERE flight_id = %s;", (flight_id,))
-    reservations_count = cursor.fetchone()[0]
-
-    # Query to get the max capacity of the flight
-    cursor.execute("SELECT max_capacity FROM flights WHERE flight_id = %s;", (flight_id,))
-    max_capacity = cursor.fetchone()[0]
+def check_flight_capacity(flight_id):
+    with db.connection() as connection:
+        cursor = connection.cursor()
+        # The flight row keeps a running count of its reservations, so one row lookup is enough
+        cursor.execute("SELECT seats_booked, max_capacity FROM flights WHERE flight_id = %s;", (flight_id,))
+        reservations_count, max_capacity = cursor.fetchone()
 
     # Check if the flight has available seats
     if reservations_count < max_capacity:
@@ -231,28 +240,27 @@ def check_flight_capacity(connection, flight_id):
 
 
 def main():
-    connection = create_db_connection()
-    if connection:
+    if create_db_pool():
         print("Welcome to the Airline Reservation System!")
         while True:
             user_choice = display_main_menu()
             if user_choice == '1':
                 first_name, last_name, email, phone_number = get_user_input_for_passenger()
-                passenger_id = add_passenger(connection, (first_name, last_name, email, phone_number))
-                flight_id, seat_number = choose_flight_and_seat(connection)
-                make_reservation(connection, (passenger_id, flight_id, seat_number, 'confirmed'))
+                passenger_id = add_passenger((first_name, last_name, email, phone_number))
+                flight_id, seat_number = choose_flight_and_seat()
+                make_reservation((passenger_id, flight_id, seat_number, 'confirmed'))
                 print("Your reservation has been made successfully!")
             elif user_choice == '2':
-                list_flights(connection)
+                list_flights()
             elif user_choice == '3':
-                edit_reservation(connection)
+                edit_reservation()
                 # Implement function to edit reservation
             elif user_choice == '4':
-                delete_reservation(connection)
+                delete_reservation()
             elif user_choice == '5':
-                add_flight(connection)  # Handle adding a flight
+                add_flight()  # Handle adding a flight
             elif user_choice == '6':
-                remove_flight(connection)  # Handle removing a flight
+                remove_flight()  # Handle removing a flight
             elif user_choice == '7':
                 print("Exiting the Airline Reservation System.")
                 break
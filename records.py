@@ -0,0 +1,240 @@
+import argparse
+import datetime
+import sys
+import tracemalloc
+from array import array
+
+# Compact in-memory forms of database rows. The record classes keep their fields in __slots__
+# instead of a per-row dict, and ColumnarTable holds a large result set column by column in typed
+# arrays. Strings with few distinct values (airlines, airports, booking statuses, seat codes) are
+# interned, so a million rows share one copy of each.
+
+# Rows pulled from the server per fetchmany() while filling a table.
+FETCH_SIZE = 1000
+
+
+class Record:
+    # Base of the record classes: positional or keyword fields named by __slots__.
+    __slots__ = ()
+    interned = ()  # fields whose string values are interned
+
+    def __init__(self, *values, **fields):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+        for name in self.__slots__[len(values):]:
+            setattr(self, name, fields.get(name))
+        for name in self.interned:
+            value = getattr(self, name)
+            if type(value) is str:
+                setattr(self, name, sys.intern(value))
+
+    @classmethod
+    def from_row(cls, row):
+        # Builds a record from a tuple in __slots__ order or from a dictionary cursor row.
+        if row is None:
+            return None
+        return cls(**row) if isinstance(row, dict) else cls(*row)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __iter__(self):
+        return (getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        return type(other) is type(self) and tuple(self) == tuple(other)
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class Flight(Record):
+    __slots__ = ("flight_id", "airline_name", "flight_number", "departure_airport", "arrival_airport",
+                 "departure_datetime", "arrival_datetime", "max_capacity", "seats_booked")
+    interned = ("airline_name", "departure_airport", "arrival_airport")
+
+
+class Passenger(Record):
+    __slots__ = ("passenger_id", "first_name", "last_name", "email", "phone_number")
+
+
+class Reservation(Record):
+    __slots__ = ("reservation_id", "passenger_id", "flight_id", "seat_number", "booking_status")
+    interned = ("seat_number", "booking_status")
+
+
+# Column kinds of a ColumnarTable:
+#   an array typecode ("q", "l", ...)  numbers stored in an array of that type
+#   "symbol"    a low-cardinality string, stored as an index into an interned value list
+#   "datetime"  a datetime stored as whole seconds since 0001-01-01 in an array("q")
+#   "object"    anything else, kept in a plain list
+_EPOCH = datetime.datetime(1, 1, 1)
+_NONE = -1
+
+
+class ColumnarTable:
+    # A read-only snapshot of many rows with the same columns, stored one column at a time.
+    # Rows are read back as tuples, or as record_type instances if one is given.
+
+    def __init__(self, columns, record_type=None):
+        # columns: [(name, kind)] as described above.
+        self.names = tuple(name for name, _ in columns)
+        self.kinds = tuple(kind for _, kind in columns)
+        self.record_type = record_type
+        self._columns = []
+        self._symbols = {}   # column position -> (values list, value -> index)
+        for position, kind in enumerate(self.kinds):
+            if kind == "symbol":
+                self._columns.append(array("l"))
+                self._symbols[position] = ([], {})
+            elif kind == "datetime":
+                self._columns.append(array("q"))
+            elif kind == "object":
+                self._columns.append([])
+            else:
+                self._columns.append(array(kind))
+        self._length = 0
+
+    def append(self, row):
+        for position, (kind, column, value) in enumerate(zip(self.kinds, self._columns, row)):
+            if kind == "symbol":
+                if value is None:
+                    column.append(_NONE)
+                    continue
+                values, index = self._symbols[position]
+                code = index.get(value)
+                if code is None:
+                    code = index[value] = len(values)
+                    values.append(sys.intern(value) if type(value) is str else value)
+                column.append(code)
+            elif kind == "datetime":
+                column.append(_NONE if value is None else int((value - _EPOCH).total_seconds()))
+            else:
+                column.append(value)
+        self._length += 1
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    @classmethod
+    def from_cursor(cls, cursor, columns, record_type=None, fetch_size=FETCH_SIZE):
+        # Fills a table from an executed cursor, fetch_size rows at a time, so the full result
+        # never exists as Python row objects at once.
+        table = cls(columns, record_type)
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                return table
+            table.extend(rows)
+
+    def _value(self, position, index):
+        stored = self._columns[position][index]
+        kind = self.kinds[position]
+        if kind == "symbol":
+            return None if stored == _NONE else self._symbols[position][0][stored]
+        if kind == "datetime":
+            return None if stored == _NONE else _EPOCH + datetime.timedelta(seconds=stored)
+        return stored
+
+    def row(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("row index out of range")
+        values = tuple(self._value(position, index) for position in range(len(self.names)))
+        return self.record_type(*values) if self.record_type else values
+
+    def __getitem__(self, index):
+        return self.row(index)
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return (self.row(index) for index in range(self._length))
+
+    def column(self, name):
+        # Returns the decoded values of one column as a list.
+        position = self.names.index(name)
+        return [self._value(position, index) for index in range(self._length)]
+
+    def nbytes(self):
+        # Approximate memory held by the column storage, excluding shared interned strings.
+        total = 0
+        for column in self._columns:
+            total += sys.getsizeof(column)
+            if isinstance(column, list):
+                total += sum(sys.getsizeof(value) for value in column)
+        for values, index in self._symbols.values():
+            total += sys.getsizeof(values) + sys.getsizeof(index)
+        return total
+
+
+RESERVATION_TABLE = [("reservation_id", "q"), ("passenger_id", "q"), ("flight_id", "q"),
+                     ("seat_number", "symbol"), ("booking_status", "symbol")]
+
+FLIGHT_TABLE = [("flight_id", "q"), ("airline_name", "symbol"), ("flight_number", "object"),
+                ("departure_airport", "symbol"), ("arrival_airport", "symbol"),
+                ("departure_datetime", "datetime"), ("arrival_datetime", "datetime"),
+                ("max_capacity", "l"), ("seats_booked", "l")]
+
+# The reservation listing shown to clerks: reservations joined with the passenger's name.
+RESERVATION_LISTING_TABLE = [("reservation_id", "q"), ("first_name", "object"), ("last_name", "object"),
+                             ("email", "object"), ("flight_id", "q"), ("seat_number", "symbol"),
+                             ("booking_status", "symbol")]
+
+
+# -- memory benchmark --
+
+def _synthetic_rows(count):
+    # Reservation rows as a driver returns them: every string is a fresh object.
+    letters = "ABCDEF"
+    for reservation_id in range(1, count + 1):
+        yield (reservation_id, reservation_id % 50000 + 1, reservation_id % 2000 + 1,
+               f"{reservation_id % 30 + 1}{letters[reservation_id % 6]}", "".join(("confi", "rmed")))
+
+
+class _Rows:
+    # Minimal cursor over an iterator of rows, for the benchmark.
+    def __init__(self, rows):
+        self._rows = iter(rows)
+
+    def fetchmany(self, size):
+        return [row for _, row in zip(range(size), self._rows)]
+
+
+def _measure(build, count):
+    tracemalloc.start()
+    try:
+        result = build(_synthetic_rows(count))
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return size, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory of dict rows, __slots__ records and a columnar table.")
+    parser.add_argument("--reservations", type=int, default=1000000)
+    args = parser.parse_args()
+
+    names = [name for name, _ in RESERVATION_TABLE]
+    builders = [
+        ("dict rows", lambda rows: [dict(zip(names, row)) for row in rows]),
+        ("tuples", lambda rows: list(rows)),
+        ("__slots__ records", lambda rows: [Reservation(*row) for row in rows]),
+        ("columnar table", lambda rows: ColumnarTable.from_cursor(_Rows(rows), RESERVATION_TABLE, Reservation)),
+    ]
+    baseline = None
+    for label, build in builders:
+        size, result = _measure(build, args.reservations)
+        baseline = baseline or size
+        print(f"{label:>18}: {size / 2 ** 20:8.1f} MiB, {size / args.reservations:6.1f} bytes/row, "
+              f"{size / baseline:6.1%} of dict rows")
+        del result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import csv
+import sys
+import db
+from flight_search import FETCH_BATCH_SIZE
+
+RESERVATION_LISTING_COLUMNS = ("reservation_id", "first_name", "last_name", "email", "flight_id", "seat_number",
+                               "booking_status")
+
+# Reservations shown per page by the interactive listing.
+RESERVATION_PAGE_SIZE = 20
+
+_SELECT = """
+SELECT r.reservation_id, p.first_name, p.last_name, p.email, r.flight_id, r.seat_number, r.booking_status
+FROM Reservations r
+JOIN Passengers p ON r.passenger_id = p.passenger_id
+"""
+
+
+def _like_prefix(prefix):
+    # LIKE pattern matching values that start with prefix, with its wildcards escaped by "!" (a
+    # backslash would mean different things to MySQL and SQLite).
+    return prefix.replace("!", "!!").replace("%", "!%").replace("_", "!_") + "%"
+
+
+def _filter_clause(flight_id=None, email=None, name=None, booking_status=None):
+    # Returns (conditions, params) for the given filters. email and name are prefixes; name matches
+    # the start of the first or the last name.
+    conditions, params = [], []
+    if flight_id is not None:
+        conditions.append("r.flight_id = %s")
+        params.append(int(flight_id))
+    if email:
+        conditions.append("p.email LIKE %s ESCAPE '!'")
+        params.append(_like_prefix(email))
+    if name:
+        conditions.append("(p.last_name LIKE %s ESCAPE '!' OR p.first_name LIKE %s ESCAPE '!')")
+        params += [_like_prefix(name)] * 2
+    if booking_status:
+        conditions.append("r.booking_status = %s")
+        params.append(booking_status)
+    return conditions, params
+
+
+def fetch_reservation_page(connection, filters=None, after=None, before=None, limit=RESERVATION_PAGE_SIZE):
+    # Returns up to `limit` matching reservations in reservation_id order, starting right after the
+    # reservation_id `after` or ending right before `before`. Like fetch_flight_page, each page is a
+    # range scan on the key, so page 10,000 costs the same as page 1.
+    conditions, params = _filter_clause(**(filters or {}))
+    if before is not None:
+        conditions.append("r.reservation_id < %s")
+        params.append(before)
+        order = "DESC"
+    else:
+        if after is not None:
+            conditions.append("r.reservation_id > %s")
+            params.append(after)
+        order = "ASC"
+    query = _SELECT
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += f" ORDER BY r.reservation_id {order} LIMIT %s;"
+    params.append(limit)
+
+    # The default cursor is unbuffered, so rows are streamed from the server as they are read.
+    cursor = connection.cursor()
+    cursor.execute(query, tuple(params))
+    rows = [row for row in cursor]
+    cursor.close()
+    connection.commit()
+    if before is not None:
+        rows.reverse()
+    return rows
+
+
+def stream_reservations(connection, filters=None, batch_size=FETCH_BATCH_SIZE):
+    # Yields every matching reservation in reservation_id order from an unbuffered cursor, batch_size
+    # rows at a time, so memory stays the same however many reservations match.
+    conditions, params = _filter_clause(**(filters or {}))
+    query = _SELECT
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY r.reservation_id;"
+
+    cursor = connection.cursor()
+    cursor.execute(query, tuple(params))
+    try:
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                yield row
+    finally:
+        cursor.close()
+
+
+def parse_filters(text, statuses=("confirmed", "cancelled")):
+    # Reads the filter line typed at the reservation listing: a number is a flight ID, a word with
+    # an "@" an email prefix, a booking status a status, and anything else a name prefix.
+    filters = {}
+    for term in text.split():
+        if term.isdecimal():
+            filters["flight_id"] = int(term)
+        elif "@" in term:
+            filters["email"] = term
+        elif term.lower() in statuses:
+            filters["booking_status"] = term.lower()
+        else:
+            filters["name"] = term
+    return filters
+
+
+def export_reservations(connection, out, filters=None):
+    # Writes every matching reservation to out as CSV and returns the number written. The rows come
+    # from stream_reservations, so a full export needs no more memory than one batch.
+    writer = csv.writer(out)
+    writer.writerow(RESERVATION_LISTING_COLUMNS)
+    written = 0
+    for row in stream_reservations(connection, filters):
+        writer.writerow(row)
+        written += 1
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export reservations as CSV, optionally filtered.")
+    parser.add_argument("filter", nargs="*", help="flight ID, email prefix, name prefix or booking status, "
+                                                  "as typed at the reservation listing")
+    parser.add_argument("--output", help="file to write (default: standard output)")
+    args = parser.parse_args()
+
+    out = open(args.output, "w", newline="", encoding="utf-8") if args.output else sys.stdout
+    try:
+        with db.connection() as connection:
+            written = export_reservations(connection, out, parse_filters(" ".join(args.filter)))
+    finally:
+        if args.output:
+            out.close()
+    if args.output:
+        print(f"Wrote {written} reservation(s) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import re
+import migrations
+
+# The Air_Reserve_System schema in its current shape (base tables plus every migration), written once
+# and rendered for each storage engine. Column types are generic: "id" is the auto-increment primary
+# key, "int", "varchar(N)" and "datetime" map to the closest native type of the engine.
+TABLES = [
+    ("Flights", [
+        ("flight_id", "id", ""),
+        ("airline_name", "varchar(100)", "NOT NULL"),
+        ("flight_number", "varchar(20)", "NOT NULL"),
+        ("departure_airport", "varchar(100)", "NOT NULL"),
+        ("arrival_airport", "varchar(100)", "NOT NULL"),
+        ("departure_datetime", "datetime", "NOT NULL"),
+        ("arrival_datetime", "datetime", "NOT NULL"),
+        ("max_capacity", "int", "NOT NULL"),
+        ("seats_booked", "int", "NOT NULL DEFAULT 0"),
+        ("original_capacity", "int", ""),
+    ], []),
+    ("Passengers", [
+        ("passenger_id", "id", ""),
+        ("first_name", "varchar(50)", "NOT NULL"),
+        ("last_name", "varchar(50)", "NOT NULL"),
+        ("email", "varchar(100)", "NOT NULL"),
+        ("email_normalized", "varchar(100)", ""),
+        ("phone_number", "varchar(20)", ""),
+    ], [
+        "CONSTRAINT uq_passengers_email_normalized UNIQUE (email_normalized)",
+    ]),
+    ("Reservations", [
+        ("reservation_id", "id", ""),
+        ("passenger_id", "int", "NOT NULL"),
+        ("flight_id", "int", "NOT NULL"),
+        ("seat_number", "varchar(10)", "NOT NULL"),
+        ("booking_status", "varchar(20)", "NOT NULL DEFAULT 'confirmed'"),
+    ], [
+        "FOREIGN KEY (passenger_id) REFERENCES Passengers (passenger_id)",
+        "FOREIGN KEY (flight_id) REFERENCES Flights (flight_id)",
+    ]),
+    ("SeatHolds", [
+        ("hold_id", "id", ""),
+        ("flight_id", "int", "NOT NULL"),
+        ("seat_number", "varchar(10)", "NOT NULL"),
+        ("holder", "varchar(100)", "NOT NULL"),
+        ("expires_at", "datetime", "NOT NULL"),
+    ], [
+        "UNIQUE (flight_id, seat_number)",
+        "FOREIGN KEY (flight_id) REFERENCES Flights (flight_id) ON DELETE CASCADE",
+    ]),
+]
+
+# (index_name, table, columns)
+INDEXES = [
+    ("idx_flights_departure", "Flights", "departure_datetime, flight_id"),
+    ("idx_flights_route", "Flights", "departure_airport, arrival_airport, departure_datetime"),
+    ("idx_passengers_email", "Passengers", "email"),
+    ("idx_reservations_flight_seat", "Reservations", "flight_id, seat_number"),
+    ("idx_seat_holds_expiry", "SeatHolds", "expires_at"),
+]
+
+_TYPES = {
+    "mysql": {"id": "INT AUTO_INCREMENT PRIMARY KEY", "int": "INT", "varchar": "VARCHAR({})", "datetime": "DATETIME"},
+    "sqlite": {"id": "INTEGER PRIMARY KEY AUTOINCREMENT", "int": "INTEGER", "varchar": "TEXT", "datetime": "DATETIME"},
+}
+
+
+def _column_type(generic, dialect):
+    match = re.fullmatch(r"(\w+)(?:\((\d+)\))?", generic)
+    return _TYPES[dialect][match.group(1)].format(match.group(2))
+
+
+def create_statements(dialect):
+    # Returns the CREATE statements of the whole schema for "mysql" or "sqlite". Each statement is
+    # safe to run against a database where the object already exists.
+    statements = []
+    for table, columns, constraints in TABLES:
+        lines = [" ".join(filter(None, (name, _column_type(generic, dialect), options))) for name, generic, options in columns]
+        if dialect == "mysql":
+            # MySQL has no CREATE INDEX IF NOT EXISTS, so the indexes are declared with the table.
+            lines += [f"INDEX {name} ({index_columns})" for name, index_table, index_columns in INDEXES if index_table == table]
+        lines += constraints
+        body = ",\n    ".join(lines)
+        statements.append(f"CREATE TABLE IF NOT EXISTS {table} (\n    {body}\n);")
+    if dialect == "sqlite":
+        statements += [f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({index_columns});" for name, table, index_columns in INDEXES]
+    return statements
+
+
+def create_schema(connection, dialect):
+    # Creates any missing table of the schema and records every migration as applied, since the
+    # tables are created in their migrated shape. Existing MySQL databases are upgraded by
+    # migrations.apply_migrations instead.
+    cursor = connection.cursor()
+    fresh = not _table_exists(cursor, dialect, "Flights")
+    for statement in create_statements(dialect):
+        cursor.execute(statement)
+    cursor.execute("CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP);")
+    if fresh:
+        cursor.executemany("INSERT INTO schema_migrations (name) VALUES (%s);", [(name,) for name, _ in migrations.MIGRATIONS])
+    connection.commit()
+    return fresh
+
+
+def _table_exists(cursor, dialect, table):
+    if dialect == "sqlite":
+        cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'table' AND name = %s;", (table,))
+    else:
+        cursor.execute("SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s;", (table,))
+    return cursor.fetchone()[0] > 0
@@ -0,0 +1,179 @@
+import datetime
+import heapq
+import os
+import threading
+import uuid
+from booking import begin_transaction, held_by_others, hold_clock
+from booking import NO_SUCH_FLIGHT, SEAT_TAKEN, SEAT_HELD, FLIGHT_FULL, FAILED
+
+# Result code of place_hold when the seat is now held for the caller.
+HELD = "held"
+
+# How long a seat stays held while the clerk finishes the booking dialogue.
+HOLD_TTL = 120  # seconds
+SWEEP_BATCH_SIZE = 500
+SWEEP_INTERVAL = 30.0  # seconds between background sweeps
+
+
+def new_holder():
+    # An identifier unique to this process and dialogue, stored in SeatHolds.holder.
+    return f"{os.getpid()}-{uuid.uuid4().hex[:12]}"
+
+
+def place_hold(connection, holder, flight_id, seat_number, ttl=HOLD_TTL):
+    # Holds a seat for `holder` until ttl seconds from now and returns (result_code, expires_at).
+    # Runs under the flight's row lock, like book_seat, so a hold can neither take a booked or held
+    # seat nor push reservations plus holds over max_capacity. Holding the same seat again extends it.
+    cursor = connection.cursor()
+    try:
+        begin_transaction(connection)
+        cursor.execute("SELECT seats_booked, max_capacity FROM Flights WHERE flight_id = %s FOR UPDATE;", (flight_id,))
+        flight = cursor.fetchone()
+        if flight is None:
+            connection.rollback()
+            return NO_SUCH_FLIGHT, None
+        seats_booked, max_capacity = flight
+        now = hold_clock()
+        # An expired hold on this seat, whoever placed it, is simply replaced.
+        cursor.execute("DELETE FROM SeatHolds WHERE flight_id = %s AND seat_number = %s AND expires_at <= %s;",
+                       (flight_id, seat_number, now))
+        cursor.execute("SELECT COUNT(*) FROM Reservations WHERE flight_id = %s AND seat_number = %s;", (flight_id, seat_number))
+        if cursor.fetchone()[0]:
+            connection.rollback()
+            return SEAT_TAKEN, None
+        holds, seat_held = held_by_others(cursor, flight_id, seat_number, holder)
+        if seat_held:
+            connection.rollback()
+            return SEAT_HELD, None
+        # The caller's own earlier hold on another seat of this flight is given up for this one.
+        cursor.execute("DELETE FROM SeatHolds WHERE flight_id = %s AND holder = %s AND seat_number <> %s;",
+                       (flight_id, holder, seat_number))
+        if seats_booked + holds >= max_capacity:
+            connection.rollback()
+            return FLIGHT_FULL, None
+        expires_at = now + datetime.timedelta(seconds=ttl)
+        cursor.execute("UPDATE SeatHolds SET expires_at = %s WHERE flight_id = %s AND seat_number = %s AND holder = %s;",
+                       (expires_at, flight_id, seat_number, holder))
+        if cursor.rowcount == 0:
+            cursor.execute("INSERT INTO SeatHolds (flight_id, seat_number, holder, expires_at) VALUES (%s, %s, %s, %s);",
+                           (flight_id, seat_number, holder, expires_at))
+        connection.commit()
+        return HELD, expires_at
+    except Exception as e:
+        connection.rollback()
+        print(f"Failed to hold seat. Database Error: {e}")
+        return FAILED, None
+
+
+def release_hold(connection, holder, flight_id, seat_number):
+    cursor = connection.cursor()
+    cursor.execute("DELETE FROM SeatHolds WHERE flight_id = %s AND seat_number = %s AND holder = %s;",
+                   (flight_id, seat_number, holder))
+    connection.commit()
+    return cursor.rowcount == 1
+
+
+def sweep_expired_holds(connection, batch_size=SWEEP_BATCH_SIZE):
+    # Deletes expired holds, oldest first, batch_size at a time. Each batch is a range scan from the
+    # start of the expires_at index that stops at the current time, so only expired rows are read,
+    # however many live holds the table has. Returns the number deleted.
+    cursor = connection.cursor()
+    deleted = 0
+    while True:
+        cursor.execute("SELECT hold_id FROM SeatHolds WHERE expires_at <= %s ORDER BY expires_at LIMIT %s;",
+                       (hold_clock(), batch_size))
+        hold_ids = [row[0] for row in cursor.fetchall()]
+        if not hold_ids:
+            connection.commit()
+            return deleted
+        cursor.execute(f"DELETE FROM SeatHolds WHERE hold_id IN ({', '.join(['%s'] * len(hold_ids))});", tuple(hold_ids))
+        connection.commit()
+        deleted += cursor.rowcount
+        if len(hold_ids) < batch_size:
+            return deleted
+
+
+class SeatHolds:
+    # The holds placed by this process, mirrored in the SeatHolds table so other processes see them.
+    # Entries expire from an in-memory heap ordered by expiry time, so finding what has lapsed only
+    # looks at the front of the heap. sweep() also clears lapsed rows of every process from the table.
+
+    def __init__(self, checkout, ttl=HOLD_TTL):
+        # checkout() must return a context manager yielding a database connection, e.g. db.connection.
+        self.checkout = checkout
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._holds = {}     # (flight_id, seat_number) -> (holder, expires_at)
+        self._expiry = []    # heap of (expires_at, flight_id, seat_number)
+        self._sweeper = None
+        self._stop = threading.Event()
+
+    def hold(self, holder, flight_id, seat_number):
+        flight_id = int(flight_id)
+        with self.checkout() as connection:
+            result, expires_at = place_hold(connection, holder, flight_id, seat_number, self.ttl)
+        if result == HELD:
+            with self._lock:
+                for key, (owner, _) in list(self._holds.items()):
+                    if owner == holder and key[0] == flight_id and key[1] != seat_number:
+                        del self._holds[key]
+                self._holds[(flight_id, seat_number)] = (holder, expires_at)
+                heapq.heappush(self._expiry, (expires_at, flight_id, seat_number))
+        return result
+
+    def release(self, holder, flight_id, seat_number):
+        # Gives the seat back, e.g. when the clerk cancels or the booking failed.
+        flight_id = int(flight_id)
+        with self._lock:
+            if self._holds.get((flight_id, seat_number), (None,))[0] == holder:
+                del self._holds[(flight_id, seat_number)]
+        with self.checkout() as connection:
+            return release_hold(connection, holder, flight_id, seat_number)
+
+    def confirmed(self, flight_id, seat_number):
+        # Forgets a hold that a booking has consumed (book_seat deletes the row itself).
+        with self._lock:
+            self._holds.pop((int(flight_id), seat_number), None)
+
+    def is_held(self, flight_id, seat_number):
+        with self._lock:
+            entry = self._holds.get((int(flight_id), seat_number))
+        return entry is not None and entry[1] > hold_clock()
+
+    def expire(self):
+        # Drops lapsed holds from memory and returns their (flight_id, seat_number) keys.
+        now = hold_clock()
+        expired = []
+        with self._lock:
+            while self._expiry and self._expiry[0][0] <= now:
+                expires_at, flight_id, seat_number = heapq.heappop(self._expiry)
+                entry = self._holds.get((flight_id, seat_number))
+                # A refreshed hold leaves a stale heap entry behind; only the current expiry counts.
+                if entry is not None and entry[1] == expires_at:
+                    del self._holds[(flight_id, seat_number)]
+                    expired.append((flight_id, seat_number))
+        return expired
+
+    def sweep(self):
+        self.expire()
+        with self.checkout() as connection:
+            return sweep_expired_holds(connection)
+
+    def start_sweeper(self, interval=SWEEP_INTERVAL):
+        # Sweeps on a daemon thread every `interval` seconds until stop_sweeper().
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Failed to sweep seat holds: {e}")
+
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=run, name="seat-hold-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
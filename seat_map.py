@@ -0,0 +1,176 @@
+import re
+import threading
+import time
+
+# Seat letters of one cabin row, left to right. Seat "12A" is row 12, first letter.
+SEAT_LETTERS = "ABCDEF"
+
+# Seconds a cached seat map is trusted before it is reloaded, so seats booked by other clerks or
+# processes stop being offered.
+SEAT_MAP_TTL = 30.0
+
+_SEAT_PATTERN = re.compile(r"\s*(\d{1,3})\s*([A-Za-z])\s*")
+
+
+def parse_seat(seat_number, letters=SEAT_LETTERS):
+    # Parses a seat code such as "12A" into (row, column); returns None if it is not a seat code.
+    match = _SEAT_PATTERN.fullmatch(str(seat_number))
+    if not match:
+        return None
+    row = int(match.group(1))
+    column = letters.find(match.group(2).upper())
+    if row < 1 or column < 0:
+        return None
+    return row, column
+
+
+def format_seat(row, column, letters=SEAT_LETTERS):
+    return f"{row}{letters[column]}"
+
+
+class SeatMap:
+    # Occupancy of one flight as a bitmap: bit (row - 1) * columns + column is set when the seat is taken.
+    # Only the first max_capacity seats exist on the map, and only those can be free. Seat codes
+    # outside the map (legacy data such as "Window") are remembered in a small set so they still
+    # count as taken.
+
+    def __init__(self, max_capacity, taken_seats=(), letters=SEAT_LETTERS):
+        self.letters = letters
+        self.columns = len(letters)
+        self.capacity = max_capacity
+        self.rows = -(-max_capacity // self.columns)
+        self.taken = 0
+        self.other = set()
+        for seat_number in taken_seats:
+            self.take(seat_number)
+
+    def _index(self, seat_number):
+        seat = parse_seat(seat_number, self.letters)
+        if seat is None:
+            return None
+        index = (seat[0] - 1) * self.columns + seat[1]
+        return index if index < self.capacity else None
+
+    def _seat_at(self, index):
+        return format_seat(index // self.columns + 1, index % self.columns, self.letters)
+
+    def is_free(self, seat_number):
+        index = self._index(seat_number)
+        return index is not None and not self.taken >> index & 1
+
+    def on_map(self, seat_number):
+        return self._index(seat_number) is not None
+
+    def take(self, seat_number):
+        index = self._index(seat_number)
+        if index is None:
+            self.other.add(str(seat_number).strip().upper())
+        else:
+            self.taken |= 1 << index
+
+    def release(self, seat_number):
+        index = self._index(seat_number)
+        if index is None:
+            self.other.discard(str(seat_number).strip().upper())
+        else:
+            self.taken &= ~(1 << index)
+
+    def _free_bits(self):
+        return ~self.taken & ((1 << self.capacity) - 1)
+
+    def next_free(self):
+        # Returns the first free seat in row order, or None if every seat on the map is taken.
+        free = self._free_bits()
+        if not free:
+            return None
+        return self._seat_at((free & -free).bit_length() - 1)
+
+    def free_seats(self):
+        # Returns every free seat code in row order.
+        free = self._free_bits()
+        seats = []
+        while free:
+            lowest = free & -free
+            seats.append(self._seat_at(lowest.bit_length() - 1))
+            free ^= lowest
+        return seats
+
+    def taken_count(self):
+        return bin(self.taken).count("1") + len(self.other)
+
+    def render(self):
+        # Draws the map as text, one line per row, with an aisle in the middle of the row.
+        aisle = self.columns // 2
+        header = "".join((" " if column == aisle else "") + f" {letter} " for column, letter in enumerate(self.letters))
+        lines = ["     " + header]
+        for row in range(self.rows):
+            cells = []
+            for column in range(self.columns):
+                index = row * self.columns + column
+                if index >= self.capacity:
+                    cell = "   "
+                else:
+                    cell = "[x]" if self.taken >> index & 1 else "[ ]"
+                cells.append((" " if column == aisle else "") + cell)
+            lines.append(f"{row + 1:>4} " + "".join(cells))
+        return "\n".join(lines)
+
+
+class SeatMapCache:
+    # Seat maps per flight, loaded from the database the first time a flight is asked about and
+    # then kept current by the booking paths instead of querying Reservations for every seat.
+    # Bookings made elsewhere are picked up when a map is reloaded, ttl seconds after it was loaded
+    # or straight away after forget().
+
+    def __init__(self, checkout, ttl=SEAT_MAP_TTL):
+        # checkout() must return a context manager yielding a database connection, e.g. db.connection.
+        # A connection is only taken when a flight's map has to be loaded.
+        self.checkout = checkout
+        self.ttl = ttl
+        self._maps = {}   # flight_id -> (loaded_at, seat map)
+        self._lock = threading.Lock()
+
+    def get(self, flight_id):
+        # Returns the seat map of a flight, or None if the flight does not exist.
+        flight_id = int(flight_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._maps.get(flight_id)
+        if entry is not None and now - entry[0] <= self.ttl:
+            return entry[1]
+
+        with self.checkout() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT max_capacity FROM Flights WHERE flight_id = %s;", (flight_id,))
+            flight = cursor.fetchone()
+            if flight is None:
+                return None
+            cursor.execute("SELECT seat_number FROM Reservations WHERE flight_id = %s;", (flight_id,))
+            seat_map = SeatMap(flight[0], (row[0] for row in cursor.fetchall()))
+        with self._lock:
+            entry = self._maps.get(flight_id)
+            if entry is None or now - entry[0] > self.ttl:
+                entry = self._maps[flight_id] = (now, seat_map)
+            return entry[1]
+
+    def is_free(self, flight_id, seat_number):
+        seat_map = self.get(flight_id)
+        return seat_map is not None and seat_map.is_free(seat_number)
+
+    def record_taken(self, flight_id, seat_number):
+        with self._lock:
+            entry = self._maps.get(int(flight_id))
+            if entry is not None:
+                entry[1].take(seat_number)
+
+    def record_released(self, flight_id, seat_number):
+        with self._lock:
+            entry = self._maps.get(int(flight_id))
+            if entry is not None:
+                entry[1].release(seat_number)
+
+    def forget(self, flight_id):
+        # Drops a flight's map so it is reloaded on next use (e.g. after the flight is removed, or
+        # when a booking finds a seat the map showed as free already taken).
+        with self._lock:
+            self._maps.pop(int(flight_id), None)
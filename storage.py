@@ -0,0 +1,343 @@
+import datetime
+import functools
+import re
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import db
+import metrics
+import schema
+from booking import book_seat, change_reservation, remove_reservation, held_by_others
+from flight_cache import FlightCache
+from flight_cancellation import cancel_flight
+from flight_search import search_flights, fetch_flight_page, PAGE_SIZE
+from import_flights import import_flights, BATCH_SIZE as IMPORT_BATCH_SIZE
+from passengers import upsert_passenger
+from records import Flight, Passenger, Reservation, ColumnarTable, RESERVATION_LISTING_TABLE
+from reservation_search import stream_reservations
+
+# Prepared statements kept per SQLite connection; every query of the program fits in this cache.
+SQLITE_STATEMENT_CACHE = 256
+SQLITE_BUSY_TIMEOUT = 10.0  # seconds a writer waits for the database lock
+
+
+@functools.lru_cache(maxsize=SQLITE_STATEMENT_CACHE)
+def _sqlite_sql(query):
+    # Translates the MySQL dialect used by the data-access code: %s placeholders become ?, and row
+    # locks are dropped because a SQLite write transaction already holds the database lock.
+    query = re.sub(r"\s+FOR UPDATE\b", "", query, flags=re.IGNORECASE)
+    return query.replace("%s", "?")
+
+
+# SQLite keeps datetimes as text in this format. They are converted by SQLiteCursor rather than
+# through sqlite3.register_adapter/register_converter, which would change every sqlite3 user in the process.
+SQLITE_DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Columns declared "datetime" in the schema; result columns with these names are read back as datetimes.
+_DATETIME_COLUMNS = frozenset(name for _, columns, _ in schema.TABLES for name, generic, _ in columns
+                              if generic == "datetime")
+
+
+def _sqlite_params(params):
+    return tuple(value.strftime(SQLITE_DATETIME_FORMAT) if isinstance(value, datetime.datetime)
+                 else value.isoformat() if isinstance(value, datetime.date) else value
+                 for value in params)
+
+
+def _sqlite_datetime(value):
+    if not isinstance(value, str):
+        return value
+    return datetime.datetime.strptime(value[:19], SQLITE_DATETIME_FORMAT)
+
+
+class SQLiteCursor:
+    # The subset of the mysql.connector cursor API the data-access modules use, over sqlite3.
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+        self._datetimes = ()  # positions of datetime columns in the current result
+
+    def _row(self, row):
+        if row is None:
+            return row
+        if self._datetimes:
+            row = list(row)
+            for position in self._datetimes:
+                row[position] = _sqlite_datetime(row[position])
+            row = tuple(row)
+        if not self._dictionary:
+            return row
+        return dict(zip((column[0] for column in self._cursor.description), row))
+
+    def execute(self, query, params=()):
+        self._cursor.execute(_sqlite_sql(query), _sqlite_params(params))
+        description = self._cursor.description or ()
+        self._datetimes = tuple(position for position, column in enumerate(description) if column[0] in _DATETIME_COLUMNS)
+        return self
+
+    def executemany(self, query, rows):
+        self._cursor.executemany(_sqlite_sql(query), (_sqlite_params(row) for row in rows))
+        self._datetimes = ()
+        return self
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    def __iter__(self):
+        return (self._row(row) for row in self._cursor)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    # A sqlite3 connection that behaves like a mysql.connector one: writes open an implicit
+    # transaction that lasts until commit(), and start_transaction() begins an explicit one.
+    # BEGIN IMMEDIATE takes the write lock up front, which is what SELECT ... FOR UPDATE
+    # achieves row by row in MySQL.
+
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path, timeout=SQLITE_BUSY_TIMEOUT, cached_statements=SQLITE_STATEMENT_CACHE,
+                                           check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode = WAL;")
+        self._connection.execute("PRAGMA synchronous = NORMAL;")
+        self._connection.execute("PRAGMA foreign_keys = ON;")
+
+    def cursor(self, dictionary=False, **_):
+        return SQLiteCursor(self._connection.cursor(), dictionary)
+
+    @property
+    def in_transaction(self):
+        return self._connection.in_transaction
+
+    def start_transaction(self, isolation_level=None):
+        self._connection.execute("BEGIN IMMEDIATE;")
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self._connection.close()
+
+
+class Storage(ABC):
+    # Flight, passenger and reservation operations over a database. Subclasses provide connection(),
+    # a context manager yielding a connection with the mysql.connector API; the operations themselves
+    # are the same functions the rest of the program uses, so both engines run identical logic.
+    dialect = None
+
+    @abstractmethod
+    def connection(self):
+        pass
+
+    def create_schema(self):
+        with self.connection() as connection:
+            return schema.create_schema(connection, self.dialect)
+
+    @functools.cached_property
+    def flights(self):
+        # Flight metadata, cached; every flight write below invalidates it.
+        return FlightCache(self.connection)
+
+    # Flights
+
+    def add_flight(self, airline_name, flight_number, departure_airport, arrival_airport,
+                   departure_datetime, arrival_datetime, max_capacity):
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("""
+            INSERT INTO Flights (
+                airline_name, flight_number, departure_airport, arrival_airport,
+                departure_datetime, arrival_datetime, max_capacity
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s);
+            """, (airline_name, flight_number, departure_airport, arrival_airport,
+                  departure_datetime, arrival_datetime, max_capacity))
+            connection.commit()
+        self.flights.invalidate(cursor.lastrowid)
+        return cursor.lastrowid
+
+    def import_flights(self, records, rejects, batch_size=IMPORT_BATCH_SIZE):
+        # Bulk-loads (line_number, record, raw_line) items; see import_flights.import_flights.
+        try:
+            with self.connection() as connection:
+                return import_flights(connection, records, rejects, batch_size)
+        finally:
+            self.flights.invalidate()
+
+    def get_flight(self, flight_id):
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {', '.join(Flight.__slots__)} FROM Flights WHERE flight_id = %s;", (flight_id,))
+            flight = Flight.from_row(cursor.fetchone())
+            connection.commit()
+            return flight
+
+    def delete_flight(self, flight_id):
+        # Returns True if the flight existed and was removed; see cancel_flight for its passengers.
+        return self.cancel_flight(flight_id)["deleted"]
+
+    def cancel_flight(self, flight_id, rebook=True, delete=True):
+        # Returns the summary of flight_cancellation.cancel_flight.
+        try:
+            with self.connection() as connection:
+                return cancel_flight(connection, flight_id, rebook=rebook, delete=delete)
+        finally:
+            self.flights.invalidate(flight_id)
+
+    def can_book_flight(self, flight_id):
+        # Same rule as can_book_flight/2 in backend.pl: the flight exists and its reservations plus
+        # unexpired seat holds leave a seat free.
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            holds, _ = held_by_others(cursor, flight_id, None)
+            cursor.execute("SELECT seats_booked, max_capacity FROM Flights WHERE flight_id = %s;", (flight_id,))
+            flight = cursor.fetchone()
+            connection.commit()
+            return flight is not None and flight[0] + holds < flight[1]
+
+    def airline_popularity(self):
+        # Returns (airline_name, reservations) for every airline, like airline_popularity/1 in backend.pl.
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT airline_name, SUM(seats_booked) FROM Flights GROUP BY airline_name;")
+            ranking = [(airline, int(count)) for airline, count in cursor.fetchall()]
+            connection.commit()
+            return ranking
+
+    def list_flights(self, after=None, before=None, limit=PAGE_SIZE):
+        with self.connection() as connection:
+            return fetch_flight_page(connection, after=after, before=before, limit=limit)
+
+    def search_flights(self, origin, destination, date_range, airline=None):
+        with self.connection() as connection:
+            return list(search_flights(connection, origin, destination, date_range, airline))
+
+    # Passengers
+
+    def add_passenger(self, first_name, last_name, email, phone_number):
+        # Returns the passenger_id, reusing the passenger registered under the same email.
+        with self.connection() as connection:
+            return upsert_passenger(connection, first_name, last_name, email, phone_number)[0]
+
+    def get_passenger(self, passenger_id):
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {', '.join(Passenger.__slots__)} FROM Passengers WHERE passenger_id = %s;", (passenger_id,))
+            passenger = Passenger.from_row(cursor.fetchone())
+            connection.commit()
+            return passenger
+
+    # Reservations
+
+    def book_seat(self, passenger_id, flight_id, seat_number, holder=None):
+        with self.connection() as connection:
+            return book_seat(connection, passenger_id, flight_id, seat_number, holder)
+
+    def change_reservation(self, reservation_id, new_flight_id, new_seat_number, holder=None):
+        with self.connection() as connection:
+            return change_reservation(connection, reservation_id, new_flight_id, new_seat_number, holder)
+
+    def remove_reservation(self, reservation_id):
+        with self.connection() as connection:
+            return remove_reservation(connection, reservation_id)
+
+    def get_reservation(self, reservation_id):
+        with self.connection() as connection:
+            cursor = connection.cursor()
+            cursor.execute(f"SELECT {', '.join(Reservation.__slots__)} FROM Reservations WHERE reservation_id = %s;",
+                           (reservation_id,))
+            reservation = Reservation.from_row(cursor.fetchone())
+            connection.commit()
+            return reservation
+
+    def list_reservations(self, filters=None):
+        # Returns the reservations matching filters (see reservation_search) with their passenger's
+        # name and email as a ColumnarTable of RESERVATION_LISTING_TABLE rows, streamed into the
+        # table a batch of rows at a time.
+        with self.connection() as connection:
+            reservations = ColumnarTable(RESERVATION_LISTING_TABLE)
+            reservations.extend(stream_reservations(connection, filters))
+            connection.commit()
+            return reservations
+
+    def close(self):
+        pass
+
+
+class MySQLStorage(Storage):
+    # The Air_Reserve_System MySQL database, through the shared connection pool in db.py.
+    dialect = "mysql"
+
+    def __init__(self, pool=None):
+        self.pool = pool or db.get_pool()
+
+    def connection(self):
+        return self.pool.connection()
+
+
+class SQLiteStorage(Storage):
+    # An embedded SQLite database file in WAL mode, so readers never wait for the writer. Each thread
+    # gets its own connection, kept open for the life of the storage so its prepared statements are
+    # reused; writers are serialised by the database lock. The schema is created on open.
+    dialect = "sqlite"
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self.create_schema()
+
+    @contextmanager
+    def connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = SQLiteConnection(self.path)
+            metrics.count_connection()
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        try:
+            yield metrics.instrument_connection(connection)
+        finally:
+            if connection.in_transaction:
+                connection.rollback()
+
+    def close(self):
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def open_storage(url=None):
+    # Opens the storage named by url: "mysql" (the default) or "sqlite:///path/to/file.db".
+    if not url or url == "mysql":
+        return MySQLStorage()
+    if url.startswith("sqlite:///"):
+        return SQLiteStorage(url[len("sqlite:///"):])
+    raise ValueError(f"Unknown storage {url!r}; use 'mysql' or 'sqlite:///path/to/file.db'")
@@ -0,0 +1,35 @@
+import os
+import sys
+import pytest
+
+# The modules live flat in the repository root.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from storage import SQLiteStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "airline.db"))
+    yield storage
+    storage.close()
+
+
+@pytest.fixture
+def add_flight(storage):
+    # Adds a flight and returns its flight_id; every argument has a default.
+    def add(airline_name="Delta", flight_number="DL1", departure_airport="JFK", arrival_airport="LAX",
+            departure_datetime="2030-01-01 10:00:00", arrival_datetime="2030-01-01 16:00:00", max_capacity=10):
+        return storage.add_flight(airline_name, flight_number, departure_airport, arrival_airport,
+                                  departure_datetime, arrival_datetime, max_capacity)
+    return add
+
+
+@pytest.fixture
+def add_passenger(storage):
+    # Adds a passenger with a unique email and returns its passenger_id.
+    count = iter(range(1, 1000000))
+
+    def add(first_name="Ada", last_name="Lovelace"):
+        return storage.add_passenger(first_name, last_name, f"passenger{next(count)}@example.com", "555-0100")
+    return add
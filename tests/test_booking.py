@@ -0,0 +1,47 @@
+from booking import BOOKED, UPDATED, DELETED, SEAT_TAKEN, FLIGHT_FULL, NO_SUCH_RESERVATION, run_overbooking_stress
+from inventory import find_seat_count_drift
+from storage import SQLiteConnection
+
+
+def _drift(storage):
+    with storage.connection() as connection:
+        return find_seat_count_drift(connection)
+
+
+def test_double_booking_a_seat_is_refused(storage, add_flight, add_passenger):
+    flight_id = add_flight()
+    assert storage.book_seat(add_passenger(), flight_id, "1A")[0] == BOOKED
+    assert storage.book_seat(add_passenger(), flight_id, "1A") == (SEAT_TAKEN, None)
+    assert storage.get_flight(flight_id).seats_booked == 1
+
+
+def test_full_flight_is_refused(storage, add_flight, add_passenger):
+    flight_id = add_flight(max_capacity=2)
+    for seat_number in ("1A", "1B"):
+        assert storage.book_seat(add_passenger(), flight_id, seat_number)[0] == BOOKED
+    assert storage.book_seat(add_passenger(), flight_id, "1C") == (FLIGHT_FULL, None)
+    assert not storage.can_book_flight(flight_id)
+
+
+def test_seat_counts_follow_edits_and_deletes(storage, add_flight, add_passenger):
+    first, second = add_flight(), add_flight(flight_number="DL2", max_capacity=1)
+    _, moved = storage.book_seat(add_passenger(), first, "1A")
+    _, kept = storage.book_seat(add_passenger(), first, "1B")
+
+    assert storage.change_reservation(moved, first, "2A") == UPDATED
+    assert storage.change_reservation(moved, second, "1A") == UPDATED
+    assert storage.change_reservation(kept, second, "1B") == FLIGHT_FULL
+    assert (storage.get_flight(first).seats_booked, storage.get_flight(second).seats_booked) == (1, 1)
+    assert _drift(storage) == []
+
+    assert storage.remove_reservation(moved) == DELETED
+    assert storage.remove_reservation(moved) == NO_SUCH_RESERVATION
+    assert storage.get_flight(second).seats_booked == 0
+    assert _drift(storage) == []
+
+
+def test_concurrent_bookers_never_overbook(tmp_path, storage):
+    path = str(tmp_path / "airline.db")
+    summary = run_overbooking_stress(lambda: SQLiteConnection(path), bookers=20, capacity=5)
+    assert summary["reservations"] == 5
+    assert not summary["overbooked"] and summary["double_assigned_seats"] == 0
@@ -0,0 +1,27 @@
+from flight_search import flight_key
+from flight_cache import FlightCache
+
+
+def test_found_flights_are_cached(storage, add_flight):
+    flight_id = add_flight()
+    cache = FlightCache(storage.connection)
+    assert cache.airline(flight_id) == "Delta"
+    assert cache.max_capacity(flight_id) == 10
+    assert cache.stats()["hits"] == 1
+
+
+def test_missing_flight_is_found_once_added_elsewhere(storage, add_flight):
+    cache = FlightCache(storage.connection, miss_ttl=0)
+    assert not cache.exists(1)
+    # Added through another path that does not invalidate this cache, like another process.
+    flight_id = add_flight()
+    assert cache.exists(flight_id)
+
+
+def test_list_flights_pages_in_departure_order(storage, add_flight):
+    flight_ids = [add_flight(flight_number=f"DL{day}", departure_datetime=f"2030-01-{day:02d} 10:00:00",
+                             arrival_datetime=f"2030-01-{day:02d} 16:00:00") for day in (3, 1, 2)]
+    first = storage.list_flights(limit=2)
+    assert [row[0] for row in first] == [flight_ids[1], flight_ids[2]]
+    rest = storage.list_flights(after=flight_key(first[-1]), limit=2)
+    assert [row[0] for row in rest] == [flight_ids[0]]
@@ -0,0 +1,43 @@
+from booking import BOOKED, FLIGHT_FULL
+from flight_cancellation import CANCELLED, REBOOKED
+
+
+def _capacities(storage, flight_id):
+    with storage.connection() as connection:
+        cursor = connection.cursor()
+        cursor.execute("SELECT max_capacity, original_capacity FROM Flights WHERE flight_id = %s;", (flight_id,))
+        row = cursor.fetchone()
+        connection.commit()
+        return row
+
+
+def test_rebooks_onto_the_next_flight_with_room(storage, add_flight, add_passenger):
+    cancelled = add_flight(max_capacity=3)
+    alternative = add_flight(flight_number="DL2", departure_datetime="2030-01-01 12:00:00",
+                             arrival_datetime="2030-01-01 18:00:00", max_capacity=1)
+    for seat_number in ("1A", "1B"):
+        assert storage.book_seat(add_passenger(), cancelled, seat_number)[0] == BOOKED
+
+    summary = storage.cancel_flight(cancelled)
+    assert summary["result"] == CANCELLED and summary["deleted"]
+    assert (summary["rebooked"], summary["cancelled"]) == (1, 1)
+    assert [entry["action"] for entry in summary["passengers"]] == [REBOOKED, CANCELLED]
+    assert summary["passengers"][0]["flight_id"] == alternative
+    assert summary["rebooked_onto"] == [alternative]
+    assert storage.get_flight(alternative).seats_booked == 1
+    assert storage.get_flight(cancelled) is None
+
+
+def test_kept_flight_stays_closed_and_keeps_its_capacity(storage, add_flight, add_passenger):
+    flight_id = add_flight(max_capacity=3)
+    storage.book_seat(add_passenger(), flight_id, "1A")
+
+    summary = storage.cancel_flight(flight_id, rebook=False, delete=False)
+    assert (summary["cancelled"], summary["max_capacity"], summary["deleted"]) == (1, 3, False)
+    assert _capacities(storage, flight_id) == (0, 3)
+    assert storage.get_flight(flight_id).seats_booked == 0
+    assert storage.book_seat(add_passenger(), flight_id, "1B") == (FLIGHT_FULL, None)
+
+    # Running the cancellation again must not record the zeroed capacity as the original.
+    assert storage.cancel_flight(flight_id, delete=False)["max_capacity"] == 3
+    assert _capacities(storage, flight_id) == (0, 3)
@@ -0,0 +1,32 @@
+import pytest
+
+tk = pytest.importorskip("tkinter")
+
+from flight_view import FlightListView
+
+
+@pytest.fixture
+def root():
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        pytest.skip(f"no display: {e}")
+    root.withdraw()
+    yield root
+    root.destroy()
+
+
+def test_window_lists_flights_from_sqlite(storage, add_flight, root):
+    flight_ids = [add_flight(flight_number=f"DL{number}", departure_datetime=f"2030-01-{number:02d} 10:00:00",
+                             arrival_datetime=f"2030-01-{number:02d} 16:00:00") for number in range(1, 6)]
+    window = tk.Toplevel(root)
+    with storage.connection() as connection:
+        view = FlightListView(window, connection=connection, page_size=2)
+        view.reload()
+        root.update()
+        shown = [int(view.tree.item(item, "values")[0]) for item in view.tree.get_children()]
+        assert shown == flight_ids[:2]
+
+        view.request_page(after=view.next_page_key())
+        shown = [int(view.tree.item(item, "values")[0]) for item in view.tree.get_children()]
+        assert shown == flight_ids[:4]
@@ -0,0 +1,44 @@
+import asyncio
+import json
+import pytest
+from http_service import BookingService
+from seat_holds import SeatHolds, HELD, new_holder
+
+
+@pytest.fixture
+def request_(storage):
+    # Sends one request through BookingService.dispatch and returns (status, payload).
+    service = BookingService(storage, workers=2)
+
+    def send(method, target, body=None):
+        async def run():
+            service._slots = asyncio.Semaphore(service.workers)
+            return await service.dispatch(method, target, json.dumps(body).encode() if body is not None else b"")
+        return asyncio.run(run())
+    yield send
+    service.close()
+
+
+def test_book_and_delete(request_, add_flight, add_passenger):
+    flight_id = add_flight()
+    status, result = request_("POST", "/reservations", {"flight_id": flight_id, "passenger_id": add_passenger()})
+    assert status == 201 and result["seat_number"] == "1A"
+    assert request_("DELETE", f"/reservations/{result['reservation_id']}")[0] == 200
+
+
+def test_held_seat_is_a_conflict(storage, request_, add_flight, add_passenger):
+    flight_id = add_flight()
+    assert SeatHolds(storage.connection).hold(new_holder(), flight_id, "1A") == HELD
+    status, _ = request_("POST", "/reservations", {"flight_id": flight_id, "seat_number": "1A",
+                                                   "passenger_id": add_passenger()})
+    assert status == 409
+
+
+@pytest.mark.parametrize("method, target, body, parameter", [
+    ("DELETE", "/reservations/abc", None, "reservation_id"),
+    ("GET", "/flights/x/seats", None, "flight_id"),
+    ("PUT", "/reservations/1", {"flight_id": "one", "seat_number": "1A"}, "flight_id"),
+    ("POST", "/reservations", {"flight_id": [1]}, "flight_id"),
+])
+def test_malformed_values_name_the_parameter(request_, method, target, body, parameter):
+    assert request_(method, target, body) == (400, {"ok": False, "error": f"{parameter} must be an integer"})
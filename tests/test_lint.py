@@ -0,0 +1,37 @@
+import builtins
+import glob
+import os
+import symtable
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = sorted(glob.glob(os.path.join(ROOT, "*.py")))
+
+
+def undefined_names(path):
+    # Names read as globals anywhere in the module that it neither defines, imports nor gets from builtins.
+    with open(path, encoding="utf-8") as source:
+        module = symtable.symtable(source.read(), path, "exec")
+    defined = {symbol.get_name() for symbol in module.get_symbols()
+               if symbol.is_assigned() or symbol.is_imported() or symbol.is_namespace()}
+    defined |= set(dir(builtins)) | {"__file__", "__name__"}
+    missing = {symbol.get_name() for symbol in module.get_symbols()
+               if symbol.is_referenced() and symbol.get_name() not in defined}
+
+    def walk(table):
+        for symbol in table.get_symbols():
+            # is_local() as well: symtable reports the locals of a function named "top" as global.
+            if (symbol.is_referenced() and symbol.is_global() and not symbol.is_local()
+                    and symbol.get_name() not in defined):
+                missing.add(symbol.get_name())
+        for child in table.get_children():
+            walk(child)
+
+    for child in module.get_children():
+        walk(child)
+    return sorted(missing)
+
+
+@pytest.mark.parametrize("path", MODULES, ids=os.path.basename)
+def test_no_undefined_names(path):
+    assert undefined_names(path) == []
@@ -0,0 +1,42 @@
+from booking import BOOKED, SEAT_HELD, FLIGHT_FULL
+from seat_holds import SeatHolds, HELD, new_holder
+
+
+def test_hold_blocks_another_booker(storage, add_flight, add_passenger):
+    flight_id = add_flight()
+    holds = SeatHolds(storage.connection)
+    holder = new_holder()
+    assert holds.hold(holder, flight_id, "1A") == HELD
+    assert holds.is_held(flight_id, "1A")
+
+    assert storage.book_seat(add_passenger(), flight_id, "1A") == (SEAT_HELD, None)
+    assert holds.hold(new_holder(), flight_id, "1A") == SEAT_HELD
+    result, _ = storage.book_seat(add_passenger(), flight_id, "1A", holder)
+    assert result == BOOKED
+    assert storage.get_flight(flight_id).seats_booked == 1
+
+
+def test_holds_count_against_capacity(storage, add_flight, add_passenger):
+    flight_id = add_flight(max_capacity=1)
+    holds = SeatHolds(storage.connection)
+    assert holds.hold(new_holder(), flight_id, "1A") == HELD
+    assert not storage.can_book_flight(flight_id)
+    assert storage.book_seat(add_passenger(), flight_id, "1B") == (FLIGHT_FULL, None)
+
+
+def test_released_hold_frees_the_seat(storage, add_flight, add_passenger):
+    flight_id = add_flight()
+    holds = SeatHolds(storage.connection)
+    holder = new_holder()
+    holds.hold(holder, flight_id, "1A")
+    assert holds.release(holder, flight_id, "1A")
+    assert not holds.is_held(flight_id, "1A")
+    assert storage.book_seat(add_passenger(), flight_id, "1A")[0] == BOOKED
+
+
+def test_expired_holds_are_swept(storage, add_flight):
+    flight_id = add_flight()
+    holds = SeatHolds(storage.connection, ttl=-1)
+    holds.hold(new_holder(), flight_id, "1A")
+    assert not holds.is_held(flight_id, "1A")
+    assert holds.sweep() == 1
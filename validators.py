@@ -0,0 +1,101 @@
+import argparse
+import datetime
+import random
+import re
+import time
+
+# Input validation done in Python rather than through Prolog queries. Datetimes are parsed once
+# into datetime values: the text must have the shape valid_datetime_format/1 in backend.pl
+# accepts, and it must also name a real calendar date and time of day, so "2024-02-30 10:00:00"
+# and "2024-99-99 99:99:99" are refused. Every string backend.pl accepts that is a real date and
+# time is accepted here too.
+
+DATETIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_DATETIME_SHAPE = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}:[0-9]{2}")
+
+
+def parse_datetime(value):
+    # Returns the datetime for a "YYYY-MM-DD HH:MM:SS" string, or None if it has another shape or
+    # is not a real date and time.
+    if not isinstance(value, str) or not _DATETIME_SHAPE.fullmatch(value):
+        return None
+    try:
+        # After the shape check, fromisoformat only has the calendar left to check.
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def valid_datetime_format(value):
+    return parse_datetime(value) is not None
+
+
+def departure_before_arrival(departure, arrival):
+    # Compares two instants given as datetimes or "YYYY-MM-DD HH:MM:SS" strings. Returns None if
+    # either is not a valid datetime.
+    if isinstance(departure, str):
+        departure = parse_datetime(departure)
+    if isinstance(arrival, str):
+        arrival = parse_datetime(arrival)
+    if departure is None or arrival is None:
+        return None
+    return departure < arrival
+
+
+def parse_datetimes(values):
+    # Parses many strings at once, e.g. a column of an import. A schedule repeats the same
+    # timestamps a lot, so each distinct string is parsed only once.
+    parsed = {}
+    results = []
+    for value in values:
+        result = parsed.get(value, parsed)
+        if result is parsed:
+            result = parsed[value] = parse_datetime(value)
+        results.append(result)
+    return results
+
+
+def validate_schedule(departures, arrivals):
+    # Batch check of (departure, arrival) columns. Returns one error message per row, or None for
+    # the rows that are valid.
+    errors = []
+    for departure, arrival in zip(parse_datetimes(departures), parse_datetimes(arrivals)):
+        if departure is None:
+            errors.append("departure_datetime is not a valid YYYY-MM-DD HH:MM:SS datetime")
+        elif arrival is None:
+            errors.append("arrival_datetime is not a valid YYYY-MM-DD HH:MM:SS datetime")
+        elif not departure < arrival:
+            errors.append("arrival is not after departure")
+        else:
+            errors.append(None)
+    return errors
+
+
+def main():
+    # Times validating a synthetic schedule column pair, one row at a time and as a batch.
+    parser = argparse.ArgumentParser(description="Benchmark the datetime validators on a synthetic schedule.")
+    parser.add_argument("--rows", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    start = datetime.datetime(2025, 1, 1)
+    departures, arrivals = [], []
+    for _ in range(args.rows):
+        departure = start + datetime.timedelta(minutes=15 * rng.randrange(4 * 24 * 90))
+        departures.append(departure.strftime(DATETIME_FORMAT))
+        arrivals.append((departure + datetime.timedelta(minutes=rng.randrange(45, 720))).strftime(DATETIME_FORMAT))
+
+    began = time.perf_counter()
+    single = [departure_before_arrival(d, a) for d, a in zip(departures, arrivals)]
+    row_seconds = time.perf_counter() - began
+    began = time.perf_counter()
+    errors = validate_schedule(departures, arrivals)
+    batch_seconds = time.perf_counter() - began
+    assert single.count(True) == errors.count(None)
+    print(f"{args.rows} rows: {args.rows / row_seconds:,.0f} rows/s one at a time, "
+          f"{args.rows / batch_seconds:,.0f} rows/s as a batch")
+
+
+if __name__ == "__main__":
+    main()